@@ -1,6 +1,7 @@
 # config.py
 
 import os
+import tempfile
 from dotenv import load_dotenv
 import urllib
 
@@ -16,6 +17,44 @@ class Config:
     TASK_SECRET_KEY = os.getenv("TASK_SECRET_KEY")
     AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
     ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
+    # Per-user result cache for reports and chart endpoints: "memory", "redis" or "null"
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    # Background CSV imports: where uploads are spooled and how many rows per commit
+    IMPORT_SPOOL_DIR = os.getenv(
+        "IMPORT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "finance_imports")
+    )
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+    IMPORT_JOB_EXECUTOR = "thread"
+    IMPORT_STAGING_TTL = int(os.getenv("IMPORT_STAGING_TTL", "3600"))  # seconds
+    # A queued or running import with no progress for this long has lost its worker
+    IMPORT_JOB_STALE_AFTER = int(os.getenv("IMPORT_JOB_STALE_AFTER", "600"))  # seconds
+    # Stock quotes: the provider's request budget (Alpha Vantage free tier by
+    # default), parallel fetches per page, and how long a fetch may wait
+    QUOTE_RATE_LIMIT_PER_MINUTE = int(os.getenv("QUOTE_RATE_LIMIT_PER_MINUTE", "5"))
+    QUOTE_RATE_LIMIT_BURST = int(os.getenv("QUOTE_RATE_LIMIT_BURST", "5"))
+    QUOTE_MAX_WORKERS = int(os.getenv("QUOTE_MAX_WORKERS", "4"))
+    QUOTE_MAX_WAIT = float(os.getenv("QUOTE_MAX_WAIT", "10"))  # seconds
+    # Market-data HTTP client: request timeout, retries of rate-limited calls
+    # (exponential backoff with jitter), and the circuit breaker's trip point
+    # and cool-off window
+    QUOTE_HTTP_TIMEOUT = float(os.getenv("QUOTE_HTTP_TIMEOUT", "10"))  # seconds
+    QUOTE_RETRY_ATTEMPTS = int(os.getenv("QUOTE_RETRY_ATTEMPTS", "3"))
+    QUOTE_BACKOFF_BASE = float(os.getenv("QUOTE_BACKOFF_BASE", "2"))  # seconds
+    QUOTE_BACKOFF_MAX = float(os.getenv("QUOTE_BACKOFF_MAX", "30"))  # seconds
+    QUOTE_BREAKER_THRESHOLD = int(os.getenv("QUOTE_BREAKER_THRESHOLD", "5"))
+    QUOTE_BREAKER_COOL_OFF = int(os.getenv("QUOTE_BREAKER_COOL_OFF", "300"))  # seconds
+    # Quote freshness: intraday quotes expire after QUOTE_INTRADAY_TTL seconds,
+    # the closing quote stays valid until the next open of this market
+    QUOTE_INTRADAY_TTL = int(os.getenv("QUOTE_INTRADAY_TTL", "900"))
+    QUOTE_FAILURE_TTL = int(os.getenv("QUOTE_FAILURE_TTL", "60"))
+    MARKET_TIMEZONE = os.getenv("MARKET_TIMEZONE", "America/New_York")
+    MARKET_OPEN = os.getenv("MARKET_OPEN", "09:30")
+    MARKET_CLOSE = os.getenv("MARKET_CLOSE", "16:00")
+    # Recurring job: rules per committed batch (also the checkpoint interval)
+    RECURRING_BATCH_SIZE = int(os.getenv("RECURRING_BATCH_SIZE", "500"))
 
 
 class DevelopmentConfig(Config):
@@ -49,6 +88,10 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     # Use a simpler password hasher in tests for speed
     BCRYPT_LOG_ROUNDS = 4
+    # Test users are recreated with reused ids, so never serve cached results
+    CACHE_BACKEND = "null"
+    # Run import jobs in the request so tests can assert on the result
+    IMPORT_JOB_EXECUTOR = "inline"
 
 
 # You could also add a ProductionConfig class here for production settings
@@ -56,6 +56,10 @@ def create_app(config_name="development"):
                 f"&TrustServerCertificate=yes"
             )
         app.config["SQLALCHEMY_DATABASE_URI"] = db_uri
+        if db_uri.startswith("mssql+pyodbc"):
+            # Send executemany batches (bulk imports) as one round trip
+            engine_options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+            engine_options.setdefault("fast_executemany", True)
 
     # Initialize extensions with the app
     db.init_app(app)
@@ -65,6 +69,9 @@ def create_app(config_name="development"):
 
     migrate.init_app(app, db)
     login_manager.init_app(app)
+    from .caching import cache
+
+    cache.init_app(app)
 
     # Configure logging and register blueprints
     app.logger.setLevel(logging.INFO)
@@ -3,7 +3,8 @@
 from flask import Blueprint, request, jsonify, g
 from functools import wraps
 from .models import User, Transaction, Account, Category, Tag, ActivityLog
-from . import db
+from . import db, rollups, search
+from .caching import bump_data_version
 from sqlalchemy import func, select
 import decimal
 from datetime import datetime, timezone, timedelta
@@ -136,6 +137,9 @@ def manage_transactions():
         else:  # expense
             account.balance -= amount
 
+        rollups.record(new_transaction)
+        search.index(new_transaction)
+
         # --- 5. Log Activity ---
         log_entry = ActivityLog(
             user_id=user.id,
@@ -144,6 +148,7 @@ def manage_transactions():
         db.session.add(log_entry)
 
         # --- 6. Commit and Respond ---
+        bump_data_version(user.id)
         db.session.commit()
 
         return (
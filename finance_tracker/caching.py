@@ -0,0 +1,192 @@
+# finance_tracker/caching.py
+
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, jsonify
+from flask_login import current_user
+
+logger = logging.getLogger(__name__)
+
+# Sentinel used to tell a cache miss apart from a cached None
+_MISSING = object()
+
+
+class NullCache:
+    """A backend that never stores anything (used by the testing config)."""
+
+    def get(self, key):
+        return _MISSING
+
+    def set(self, key, value, timeout):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryCache:
+    """
+    A thread-safe, in-process LRU cache with per-entry expiry.
+    Each gunicorn worker holds its own copy.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """A backend for a Redis-compatible server, shared by all workers."""
+
+    def __init__(self, url, key_prefix="pfa:"):
+        import redis  # Optional dependency, only needed for this backend
+
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.key_prefix + key)
+        except Exception as e:
+            logger.warning(f"Cache read failed, treating as a miss: {e}")
+            return _MISSING
+        return _MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, timeout):
+        try:
+            self.client.setex(self.key_prefix + key, int(timeout), pickle.dumps(value))
+        except Exception as e:
+            logger.warning(f"Cache write failed: {e}")
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.key_prefix}*"):
+            self.client.delete(key)
+
+
+class Cache:
+    """
+    Per-user result cache for reports and chart endpoints.
+
+    Entries are keyed by user, endpoint, the user's data version and the
+    normalized request arguments. Every write bumps the user's data version
+    (see bump_data_version), so stale entries are simply never read again
+    and age out through the TTL/LRU.
+    """
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.default_timeout = 300
+
+    def init_app(self, app):
+        backend_name = app.config.get("CACHE_BACKEND", "memory")
+        self.default_timeout = app.config.get("CACHE_DEFAULT_TIMEOUT", 300)
+
+        if backend_name == "redis":
+            try:
+                self.backend = RedisCache(app.config["CACHE_REDIS_URL"])
+            except Exception as e:
+                app.logger.warning(
+                    f"Redis cache unavailable ({e}); using the in-process cache."
+                )
+                backend_name = "memory"
+        if backend_name == "memory":
+            self.backend = MemoryCache(app.config.get("CACHE_MAX_ENTRIES", 1024))
+        elif backend_name == "null":
+            self.backend = NullCache()
+
+    def make_key(self, name, user, params):
+        normalized = "&".join(
+            f"{key}={value}" for key, value in sorted(params.items()) if value != ""
+        )
+        return f"{name}:{user.id}:{user.data_version or 0}:{normalized}"
+
+    def get_or_compute(self, name, compute, params=None, timeout=None):
+        """
+        Returns the cached result of compute() for the current user,
+        calling it and storing the result on a miss.
+
+        Args:
+            name: A name identifying the cached computation, e.g. the endpoint.
+            compute: A zero-argument callable producing a picklable result.
+            params: The arguments the result depends on (e.g. request.args).
+        """
+        key = self.make_key(name, current_user, params or {})
+        value = self.backend.get(key)
+        if value is _MISSING:
+            value = compute()
+            self.backend.set(key, value, timeout or self.default_timeout)
+        return value
+
+    def cached_json(self, timeout=None):
+        """
+        A decorator for JSON endpoints: successful payloads are cached per user
+        and request arguments, and replayed with jsonify() on a hit.
+        """
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                params = {**request.args.to_dict(), **kwargs}
+                key = self.make_key(request.endpoint, current_user, params)
+                payload = self.backend.get(key)
+                if payload is not _MISSING:
+                    return jsonify(payload)
+
+                response = f(*args, **kwargs)
+                if getattr(response, "status_code", None) == 200 and response.is_json:
+                    self.backend.set(
+                        key, response.get_json(), timeout or self.default_timeout
+                    )
+                return response
+
+            return decorated_function
+
+        return decorator
+
+
+cache = Cache()
+
+
+def bump_data_version(*user_ids):
+    """
+    Marks the given users' data as changed, invalidating all of their cached
+    results. Runs inside the caller's transaction, so it takes effect on commit.
+    """
+    from . import db
+    from .models import User
+
+    if not user_ids:
+        return
+    db.session.execute(
+        db.update(User)
+        .where(User.id.in_(set(user_ids)))
+        .values(data_version=User.data_version + 1)
+    )
@@ -0,0 +1,141 @@
+# finance_tracker/duplicates.py
+
+import decimal
+import hashlib
+from datetime import datetime
+from sqlalchemy import event, select, update
+from . import db
+from .models import Transaction
+
+# Keeps every IN list well below SQL Server's 2100 parameter limit
+LOOKUP_BATCH_SIZE = 1000
+REBUILD_BATCH_SIZE = 1000
+
+
+def normalize_description(description):
+    """Case-folds a description and collapses its whitespace."""
+    return " ".join((description or "").casefold().split())
+
+
+def content_hash(
+    user_id, account_id, transaction_date, amount, transaction_type, description
+):
+    """
+    Returns the duplicate-detection key of a transaction: a SHA-256 over the
+    user, account, calendar date, signed amount and normalized description.
+    The time of day is left out, since statements often omit or round it.
+    """
+    amount = decimal.Decimal(amount).quantize(decimal.Decimal("0.01"))
+    if transaction_type != "income":
+        amount = -amount
+    key = "|".join(
+        [
+            str(user_id),
+            str(account_id),
+            transaction_date.date().isoformat(),
+            str(amount),
+            normalize_description(description),
+        ]
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def hash_for(transaction):
+    """Computes the content hash of a Transaction instance."""
+    return content_hash(
+        transaction.user_id,
+        transaction.account_id,
+        transaction.transaction_date,
+        transaction.amount,
+        transaction.transaction_type,
+        transaction.description,
+    )
+
+
+@event.listens_for(Transaction, "before_insert")
+@event.listens_for(Transaction, "before_update")
+def _set_content_hash(mapper, connection, transaction):
+    # ORM writes keep the hash current; the bulk importer sets it itself.
+    # The column default would only apply after this hook, so apply it here.
+    if transaction.transaction_date is None:
+        transaction.transaction_date = datetime.utcnow()
+    transaction.content_hash = hash_for(transaction)
+
+
+def existing_hashes(user_id, hashes):
+    """
+    Returns the subset of hashes already stored for the user's transactions,
+    using one indexed IN lookup per LOOKUP_BATCH_SIZE hashes.
+    """
+    hashes = list(set(hashes))
+    found = set()
+    for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+        found.update(
+            db.session.execute(
+                select(Transaction.content_hash).where(
+                    Transaction.user_id == user_id,
+                    Transaction.content_hash.in_(
+                        hashes[start : start + LOOKUP_BATCH_SIZE]
+                    ),
+                )
+            ).scalars()
+        )
+    return found
+
+
+def find_duplicate_rows(user_id, parsed_rows):
+    """
+    Returns the row numbers of the ParsedRows that match a stored transaction,
+    with a single set-based lookup for the whole batch.
+    """
+    hashes = {
+        row.row_num: content_hash(
+            user_id,
+            row.account_id,
+            row.transaction_date,
+            row.amount,
+            row.transaction_type,
+            row.description,
+        )
+        for row in parsed_rows
+    }
+    existing = existing_hashes(user_id, hashes.values())
+    return {row_num for row_num, value in hashes.items() if value in existing}
+
+
+def rebuild(user_id=None):
+    """
+    Recomputes the content hash of existing transactions.
+
+    Args:
+        user_id: Restrict the rebuild to a single user. Rebuilds everyone if None.
+
+    Returns:
+        The number of transactions updated.
+    """
+    stmt = (
+        select(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.account_id,
+            Transaction.transaction_date,
+            Transaction.amount,
+            Transaction.transaction_type,
+            Transaction.description,
+        )
+        .order_by(Transaction.id)
+        .limit(REBUILD_BATCH_SIZE)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+
+    # Walk the table by id so no cursor stays open while updating
+    updated, last_id = 0, 0
+    while rows := db.session.execute(stmt.where(Transaction.id > last_id)).all():
+        db.session.execute(
+            update(Transaction),
+            [{"id": row.id, "content_hash": content_hash(*row[1:])} for row in rows],
+        )
+        updated += len(rows)
+        last_id = rows[-1].id
+    return updated
@@ -0,0 +1,117 @@
+# finance_tracker/forecast.py
+
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+import numpy as np
+from sqlalchemy import select
+from . import db
+from .models import Account, RecurringTransaction
+
+# Calendar months between occurrences of the month-based intervals
+MONTH_STEPS = {"monthly": 1, "yearly": 12}
+# Days between occurrences of the day-based intervals
+DAY_STEPS = {"daily": 1, "weekly": 7}
+
+
+def occurrence_days(start_date, recurrence_interval, until, since=None):
+    """
+    Expands a rule into a datetime64[D] array of its due dates between since
+    (default: start_date) and until, both inclusive, with the same calendar
+    rules as the recurring job: dates are counted from start_date, and
+    month-based ones are clamped to the end of shorter months. Unknown
+    intervals have no occurrences.
+    """
+    first, last = np.datetime64(start_date, "D"), np.datetime64(until, "D")
+    since = np.datetime64(since or start_date, "D")
+    if max(first, since) > last:
+        return np.array([], dtype="datetime64[D]")
+    if recurrence_interval in DAY_STEPS:
+        step = DAY_STEPS[recurrence_interval]
+        # Start at the first step on or after since
+        skipped = -(-max((since - first).astype(np.int64), 0) // step)
+        return np.arange(first + skipped * step, last + 1, step)
+    if recurrence_interval not in MONTH_STEPS:
+        return np.array([], dtype="datetime64[D]")
+
+    first_month = first.astype("datetime64[M]")
+    months = np.arange(
+        first_month,
+        last.astype("datetime64[M]") + 1,
+        MONTH_STEPS[recurrence_interval],
+    )
+    month_starts = months.astype("datetime64[D]")
+    month_lengths = (months + 1).astype("datetime64[D]") - month_starts
+    day_of_month = (first - first_month.astype("datetime64[D]")).astype(np.int64)
+    days = month_starts + np.minimum(day_of_month, month_lengths.astype(np.int64) - 1)
+    return days[(days >= since) & (days <= last)]
+
+
+def cashflow_forecast(user_id, start_date, months=12):
+    """
+    Projects the balance of each of the user's accounts on every day from
+    start_date over the next `months` months, from Account.balance and the
+    user's recurring rules.
+
+    Every rule is expanded into its occurrence dates with NumPy date
+    arithmetic; the signed amounts (in cents) are summed into a (days x
+    accounts) matrix, whose cumulative sum is added to the current balances.
+    Occurrences already overdue, which the recurring job has yet to
+    generate, count on start_date.
+
+    Returns:
+        A (days, accounts, balances) tuple: a datetime64[D] array, the
+        user's accounts, and a (days x accounts) float array of balances.
+    """
+    end_date = start_date + relativedelta(months=months) - timedelta(days=1)
+    days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+
+    accounts = (
+        db.session.execute(
+            select(Account).filter_by(user_id=user_id).order_by(Account.name)
+        )
+        .scalars()
+        .all()
+    )
+    columns = {account.id: index for index, account in enumerate(accounts)}
+    rules = db.session.execute(
+        select(
+            RecurringTransaction.account_id,
+            RecurringTransaction.amount,
+            RecurringTransaction.transaction_type,
+            RecurringTransaction.recurrence_interval,
+            RecurringTransaction.start_date,
+            RecurringTransaction.next_due_date,
+        ).where(
+            RecurringTransaction.user_id == user_id,
+            RecurringTransaction.next_due_date <= end_date,
+        )
+    ).all()
+
+    rows, cols, cents = [], [], []
+    for rule in rules:
+        if rule.account_id not in columns:
+            continue
+        due = occurrence_days(
+            rule.start_date,
+            rule.recurrence_interval,
+            end_date,
+            since=rule.next_due_date,
+        )
+        amount = int(rule.amount * 100)
+        if rule.transaction_type != "income":
+            amount = -amount
+        rows.append(np.clip((due - days[0]).astype(np.int64), 0, None))
+        cols.append(np.full(len(due), columns[rule.account_id]))
+        cents.append(np.full(len(due), amount, dtype=np.int64))
+
+    deltas = np.zeros((len(days), len(accounts)), dtype=np.int64)
+    if rows:
+        np.add.at(
+            deltas, (np.concatenate(rows), np.concatenate(cols)), np.concatenate(cents)
+        )
+
+    opening = np.array(
+        [int((account.balance or 0) * 100) for account in accounts], dtype=np.int64
+    )
+    balances = (opening + np.cumsum(deltas, axis=0)) / 100
+    return days, accounts, balances
@@ -0,0 +1,190 @@
+# finance_tracker/holdings.py
+
+import decimal
+from collections import defaultdict
+from sqlalchemy import select, delete, insert
+from . import db
+from .models import Asset, Holding, InvestmentTransaction
+
+ZERO = decimal.Decimal(0)
+# Matches the scale of Holding.cost_basis / realized_pnl
+MONEY = decimal.Decimal("0.0001")
+
+
+def apply_trade(position, transaction_type, quantity, price_per_unit):
+    """
+    Returns the (quantity, cost_basis, realized_pnl) position after one trade,
+    using the average-cost method: buys add their cost, sells remove the
+    average cost of the units sold and realize the difference to their price.
+    """
+    held, cost_basis, realized_pnl = position
+    quantity = decimal.Decimal(quantity)
+    price_per_unit = decimal.Decimal(price_per_unit)
+    if transaction_type == "buy":
+        held += quantity
+        cost_basis += quantity * price_per_unit
+    else:
+        average_cost = cost_basis / held if held > 0 else ZERO
+        held -= quantity
+        cost_basis = ZERO if held <= 0 else cost_basis - quantity * average_cost
+        realized_pnl += quantity * (price_per_unit - average_cost)
+    return held, cost_basis.quantize(MONEY), realized_pnl.quantize(MONEY)
+
+
+def _replay(transactions):
+    position = (ZERO, ZERO, ZERO)
+    for transaction in transactions:
+        position = apply_trade(
+            position,
+            transaction.transaction_type,
+            transaction.quantity,
+            transaction.price_per_unit,
+        )
+    return position
+
+
+def record(transaction):
+    """
+    Updates the holding for a newly added investment transaction. A trade
+    dated after every other one for the asset is applied incrementally; a
+    backdated one changes the average cost of later sells, so the position
+    is recalculated instead.
+    """
+    db.session.flush()
+    later_trade = db.session.execute(
+        select(InvestmentTransaction.id)
+        .where(
+            InvestmentTransaction.user_id == transaction.user_id,
+            InvestmentTransaction.asset_id == transaction.asset_id,
+            InvestmentTransaction.transaction_date > transaction.transaction_date,
+        )
+        .limit(1)
+    ).first()
+    holding = db.session.get(Holding, (transaction.user_id, transaction.asset_id))
+    if later_trade is not None or (holding is None and _has_other_trades(transaction)):
+        recalculate(transaction.user_id, transaction.asset_id)
+        return
+
+    if holding is None:
+        holding = Holding(
+            user_id=transaction.user_id,
+            asset_id=transaction.asset_id,
+            quantity=ZERO,
+            cost_basis=ZERO,
+            realized_pnl=ZERO,
+        )
+        db.session.add(holding)
+    holding.quantity, holding.cost_basis, holding.realized_pnl = apply_trade(
+        (holding.quantity, holding.cost_basis, holding.realized_pnl),
+        transaction.transaction_type,
+        transaction.quantity,
+        transaction.price_per_unit,
+    )
+
+
+def _has_other_trades(transaction):
+    # A missing holding row next to existing trades means it was never built
+    return (
+        db.session.execute(
+            select(InvestmentTransaction.id)
+            .where(
+                InvestmentTransaction.user_id == transaction.user_id,
+                InvestmentTransaction.asset_id == transaction.asset_id,
+                InvestmentTransaction.id != transaction.id,
+            )
+            .limit(1)
+        ).first()
+        is not None
+    )
+
+
+def recalculate(user_id, *asset_ids):
+    """
+    Rebuilds the user's holdings in the given assets from their transactions,
+    after an edit or delete. Positions with no transactions left are removed.
+    """
+    db.session.flush()
+    for asset_id in set(asset_ids):
+        transactions = (
+            db.session.execute(
+                select(InvestmentTransaction)
+                .filter_by(user_id=user_id, asset_id=asset_id)
+                .order_by(
+                    InvestmentTransaction.transaction_date, InvestmentTransaction.id
+                )
+            )
+            .scalars()
+            .all()
+        )
+        holding = db.session.get(Holding, (user_id, asset_id))
+        if not transactions:
+            if holding is not None:
+                db.session.delete(holding)
+            continue
+        if holding is None:
+            holding = Holding(user_id=user_id, asset_id=asset_id)
+            db.session.add(holding)
+        holding.quantity, holding.cost_basis, holding.realized_pnl = _replay(
+            transactions
+        )
+
+
+def open_positions(user_id):
+    """
+    Returns the user's holdings with a non-zero quantity, with their assets
+    loaded, ordered by ticker. This is a single read of the holding table.
+    """
+    return (
+        db.session.execute(
+            select(Holding)
+            .join(Holding.asset)
+            .where(Holding.user_id == user_id, Holding.quantity != 0)
+            .order_by(Asset.ticker_symbol)
+        )
+        .scalars()
+        .all()
+    )
+
+
+def rebuild(user_id=None):
+    """
+    Recomputes the holding table from the investment transactions.
+
+    Args:
+        user_id: Restrict the rebuild to a single user. Rebuilds everyone if None.
+
+    Returns:
+        The number of holding rows written.
+    """
+    clear_stmt = delete(Holding)
+    stmt = select(
+        InvestmentTransaction.user_id,
+        InvestmentTransaction.asset_id,
+        InvestmentTransaction.transaction_type,
+        InvestmentTransaction.quantity,
+        InvestmentTransaction.price_per_unit,
+    ).order_by(InvestmentTransaction.transaction_date, InvestmentTransaction.id)
+    if user_id is not None:
+        clear_stmt = clear_stmt.where(Holding.user_id == user_id)
+        stmt = stmt.where(InvestmentTransaction.user_id == user_id)
+    db.session.execute(clear_stmt)
+
+    trades = defaultdict(list)
+    for row in db.session.execute(stmt):
+        trades[(row.user_id, row.asset_id)].append(row)
+
+    rows = []
+    for (holder_id, asset_id), asset_trades in trades.items():
+        quantity, cost_basis, realized_pnl = _replay(asset_trades)
+        rows.append(
+            {
+                "user_id": holder_id,
+                "asset_id": asset_id,
+                "quantity": quantity,
+                "cost_basis": cost_basis,
+                "realized_pnl": realized_pnl,
+            }
+        )
+    if rows:
+        db.session.execute(insert(Holding), rows)
+    return len(rows)
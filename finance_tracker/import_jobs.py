@@ -0,0 +1,293 @@
+# finance_tracker/import_jobs.py
+
+import csv
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from flask import current_app
+from sqlalchemy import delete, func, update
+from werkzeug.utils import secure_filename
+from . import db
+from .caching import bump_data_version
+from .importer import BulkImporter
+from .import_parser import ImportRowError, ParsedRow
+from .models import ImportJob, ActivityLog
+
+# Only the first errors are kept on the job; the count covers all of them
+MAX_STORED_ERRORS = 50
+
+
+def create_job(user_id, file_storage):
+    """
+    Spools an uploaded CSV file to disk and records a queued ImportJob for it.
+
+    Args:
+        user_id: The owner of the import.
+        file_storage: The werkzeug FileStorage from request.files.
+
+    Returns:
+        The committed ImportJob.
+    """
+    spool_dir = current_app.config["IMPORT_SPOOL_DIR"]
+    os.makedirs(spool_dir, exist_ok=True)
+
+    job_id = uuid.uuid4().hex
+    spool_path = os.path.join(spool_dir, f"{job_id}.csv")
+    file_storage.save(spool_path)
+
+    job = ImportJob(
+        id=job_id,
+        user_id=user_id,
+        filename=secure_filename(file_storage.filename) or "upload.csv",
+        spool_path=spool_path,
+        status="queued",
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def start_job(job_id):
+    """
+    Runs an import job on a background thread, or inline when the
+    IMPORT_JOB_EXECUTOR config is "inline" (as in the testing config).
+    """
+    app = current_app._get_current_object()
+    if app.config.get("IMPORT_JOB_EXECUTOR") == "inline":
+        run_import_job(app, job_id)
+        return
+    threading.Thread(
+        target=run_import_job, args=(app, job_id), name=f"import-{job_id}", daemon=True
+    ).start()
+
+
+def iter_chunks(path, chunk_size):
+    """
+    Lazily reads a spooled CSV file, skipping the header, and yields lists of
+    up to chunk_size (row_number, fields) pairs.
+    """
+    with open(path, encoding="utf-8", newline="") as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader, None)
+        numbered_rows = ((index + 2, row) for index, row in enumerate(reader))
+        while chunk := list(islice(numbered_rows, chunk_size)):
+            yield chunk
+
+
+def run_import_job(app, job_id):
+    """
+    Imports a spooled file chunk by chunk. Every chunk is bulk-inserted and
+    committed together with its balance deltas and the job's progress, so a
+    failure only loses the chunk in flight. The spool file is removed once
+    the job's final status is committed.
+    """
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        if job is None or job.status != "queued":
+            return
+
+        job.status = "running"
+        job.started_at = job.heartbeat_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+        errors = []
+        chunk_size = app.config.get("IMPORT_CHUNK_SIZE", 1000)
+        try:
+            importer = BulkImporter(job.user_id)
+            for chunk in iter_chunks(job.spool_path, chunk_size):
+                for row_num, row in chunk:
+                    if not any(field.strip() for field in row):
+                        continue
+                    try:
+                        importer.add_csv_row(row, row_num)
+                    except ImportRowError as e:
+                        job.error_count += 1
+                        if len(errors) < MAX_STORED_ERRORS:
+                            errors.append(str(e))
+
+                job.rows_imported += importer.flush()
+                job.duplicate_count = importer.duplicates_skipped
+                job.rows_processed += len(chunk)
+                job.errors = json.dumps(errors)
+                job.heartbeat_at = datetime.now(timezone.utc)
+                bump_data_version(job.user_id)
+                db.session.commit()
+
+            job.status = "completed"
+            db.session.add(
+                ActivityLog(
+                    user_id=job.user_id,
+                    description=f"Imported {job.rows_imported} transactions from '{job.filename}'",
+                )
+            )
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Import job {job_id} failed: {e}")
+            job.status = "failed"
+            job.error_count += 1
+            errors.append(f"Import stopped after {job.rows_processed} rows: {e}")
+
+        job.errors = json.dumps(errors)
+        job.finished_at = datetime.now(timezone.utc)
+        # If this commit fails the job stays "running" with its file, and is
+        # failed by fail_if_stale() once its heartbeat is old enough
+        db.session.commit()
+        _remove_spool_file(job)
+
+
+def fail_if_stale(job):
+    """
+    Marks a queued or running import as failed when its worker has made no
+    progress for IMPORT_JOB_STALE_AFTER seconds, e.g. because the process
+    running it was restarted, and commits the change.
+
+    Returns:
+        True if the job was marked as failed.
+    """
+    stale_after = timedelta(
+        seconds=current_app.config.get("IMPORT_JOB_STALE_AFTER", 600)
+    )
+    cutoff = datetime.now(timezone.utc) - stale_after
+    # The conditional UPDATE loses to a worker that finishes at the same time
+    stale = db.session.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.id == job.id,
+            ImportJob.status.in_(("queued", "running")),
+            func.coalesce(ImportJob.heartbeat_at, ImportJob.created_at) < cutoff,
+        )
+        .values(
+            status="failed",
+            error_count=ImportJob.error_count + 1,
+            errors=json.dumps(
+                (json.loads(job.errors) if job.errors else [])
+                + [f"Import stopped responding after {job.rows_processed} rows."]
+            ),
+            finished_at=datetime.now(timezone.utc),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if stale.rowcount != 1:
+        return False
+
+    db.session.commit()
+    _remove_spool_file(job)
+    return True
+
+
+def _remove_spool_file(job):
+    if job.spool_path and os.path.exists(job.spool_path):
+        os.remove(job.spool_path)
+
+
+def stage_rows(user_id, filename, parsed_rows):
+    """
+    Keeps validated rows on the server until the user confirms the import,
+    so the commit step does not have to re-upload or re-parse them.
+
+    Returns:
+        The staging token to pass to claim_staged_rows().
+    """
+    # Validation is when staged rows pile up, so drop the abandoned ones here
+    purge_expired_staged_jobs()
+    job = ImportJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        filename=secure_filename(filename or "") or "upload.csv",
+        status="staged",
+        rows_processed=len(parsed_rows),
+        staged_rows=json.dumps([row.to_list() for row in parsed_rows]),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def claim_staged_rows(user_id, token):
+    """
+    Claims a staged import for committing. The claim is a conditional UPDATE,
+    so a token can only be committed once; it becomes final when the caller
+    commits the session together with the imported rows.
+
+    Returns:
+        The (job, [ParsedRow, ...]) pair, or None if the token is unknown,
+        expired, not the user's or already used.
+    """
+    claimed = db.session.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.id == token,
+            ImportJob.user_id == user_id,
+            ImportJob.status == "staged",
+            ImportJob.created_at >= _staging_cutoff(),
+        )
+        .values(status="running", started_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        return None
+
+    job = db.session.get(ImportJob, token)
+    db.session.refresh(job)
+    rows = [ParsedRow.from_list(values) for values in json.loads(job.staged_rows)]
+    # The rows live on in memory; rolling back the claim restores them
+    job.staged_rows = None
+    return job, rows
+
+
+def purge_expired_staged_jobs(user_id=None):
+    """
+    Deletes the staged imports that were never committed within
+    IMPORT_STAGING_TTL, together with their stored rows.
+
+    Args:
+        user_id: Restrict the purge to a single user. Purges everyone if None.
+
+    Returns:
+        The number of staged jobs deleted.
+    """
+    stmt = (
+        delete(ImportJob)
+        .where(ImportJob.status == "staged", ImportJob.created_at < _staging_cutoff())
+        .execution_options(synchronize_session=False)
+    )
+    if user_id is not None:
+        stmt = stmt.where(ImportJob.user_id == user_id)
+    return db.session.execute(stmt).rowcount
+
+
+def _staging_cutoff():
+    ttl = timedelta(seconds=current_app.config.get("IMPORT_STAGING_TTL", 3600))
+    return datetime.now(timezone.utc) - ttl
+
+
+def job_status(job):
+    """Returns the JSON-ready progress report of an ImportJob."""
+    rows_per_second = None
+    if job.started_at:
+        finished_at = job.finished_at or datetime.now(timezone.utc)
+        elapsed = (_as_utc(finished_at) - _as_utc(job.started_at)).total_seconds()
+        if elapsed > 0:
+            rows_per_second = round(job.rows_processed / elapsed, 1)
+
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "rows_processed": job.rows_processed,
+        "rows_imported": job.rows_imported,
+        "error_count": job.error_count,
+        "duplicate_count": job.duplicate_count,
+        "errors": json.loads(job.errors) if job.errors else [],
+        "rows_per_second": rows_per_second,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def _as_utc(value):
+    # DateTime columns come back naive from most drivers
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
@@ -0,0 +1,194 @@
+# finance_tracker/import_parser.py
+
+import decimal
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# The 10-column import format shared by the CSV export and every import path
+CSV_COLUMNS = [
+    "Date",
+    "Time",
+    "Description",
+    "Amount",
+    "DR/CR",
+    "Account",
+    "Is Expense?",
+    "Categories",
+    "Tags",
+    "Notes",
+]
+IMPORT_DATETIME_FORMAT = "%Y-%m-%d %I:%M %p"
+ACCOUNT_RE = re.compile(r"^(.*) \((.*)\)$")
+
+
+class ImportRowError(ValueError):
+    """
+    Raised for a CSV row that cannot be imported. `errors` lists every
+    problem found; the message prefixes them with the row number.
+    """
+
+    def __init__(self, row_num, errors):
+        self.row_num = row_num
+        self.errors = errors
+        super().__init__(f"Row {row_num}: {' '.join(errors)}")
+
+
+class ParsedRow:
+    """A validated import row, ready to be handed to the BulkImporter."""
+
+    __slots__ = (
+        "row_num",
+        "transaction_date",
+        "description",
+        "amount",
+        "transaction_type",
+        "affects_balance",
+        "account_id",
+        "notes",
+        "category_names",
+        "tag_names",
+    )
+
+    def __init__(
+        self,
+        row_num,
+        transaction_date,
+        description,
+        amount,
+        transaction_type,
+        affects_balance,
+        account_id,
+        notes,
+        category_names,
+        tag_names,
+    ):
+        self.row_num = row_num
+        self.transaction_date = transaction_date
+        self.description = description
+        self.amount = amount
+        self.transaction_type = transaction_type
+        self.affects_balance = affects_balance
+        self.account_id = account_id
+        self.notes = notes
+        self.category_names = category_names
+        self.tag_names = tag_names
+
+    def to_list(self):
+        """Serializes the row to JSON-safe values, for staged imports."""
+        return [
+            self.row_num,
+            self.transaction_date.isoformat(),
+            self.description,
+            str(self.amount),
+            self.transaction_type,
+            self.affects_balance,
+            self.account_id,
+            self.notes,
+            self.category_names,
+            self.tag_names,
+        ]
+
+    @classmethod
+    def from_list(cls, values):
+        """Rebuilds a row serialized by to_list()."""
+        row = cls(*values)
+        row.transaction_date = datetime.fromisoformat(row.transaction_date)
+        row.amount = decimal.Decimal(row.amount)
+        return row
+
+
+@lru_cache(maxsize=4096)
+def parse_datetime(date_str, time_str):
+    """
+    Parses the Date and Time columns. Statements repeat the same few dates
+    and times many times, so results are memoized.
+    """
+    return datetime.strptime(f"{date_str} {time_str}", IMPORT_DATETIME_FORMAT)
+
+
+def split_names(value):
+    """Splits a semicolon-separated Categories/Tags cell into clean names."""
+    return [name.strip() for name in value.split(";") if name.strip()]
+
+
+def parse_row(row, row_num, account_ids):
+    """
+    Parses and validates one row of the 10-column import format.
+
+    Args:
+        row: The list of CSV fields.
+        row_num: The 1-based line number of the row, for error messages.
+        account_ids: A {(name.lower(), type.lower()): account_id} mapping of
+            the user's accounts, e.g. BulkImporter.account_ids.
+
+    Returns:
+        A ParsedRow.
+
+    Raises:
+        ImportRowError: Listing every problem found in the row.
+    """
+    if len(row) != len(CSV_COLUMNS):
+        raise ImportRowError(
+            row_num,
+            [f"Invalid number of columns. Expected 10, got {len(row)}."],
+        )
+
+    (
+        date_str,
+        time_str,
+        desc,
+        amount_str,
+        dr_cr_str,
+        account_str,
+        is_expense_str,
+        cats_str,
+        tags_str,
+        notes,
+    ) = row
+    errors = []
+
+    dr_cr = dr_cr_str.strip().upper()
+    if dr_cr not in ("DR", "CR"):
+        errors.append("DR/CR column must be 'DR' or 'CR'.")
+
+    try:
+        transaction_date = parse_datetime(date_str.strip(), time_str.strip())
+        amount = decimal.Decimal(amount_str)
+    except (ValueError, decimal.InvalidOperation):
+        errors.append(
+            f"Invalid date/time ('{date_str} {time_str}') or amount ('{amount_str}')."
+        )
+
+    is_expense = is_expense_str.strip().lower()
+    if dr_cr == "DR" and is_expense not in ("yes", "no", ""):
+        errors.append("'Is Expense?' must be 'Yes', 'No', or empty.")
+
+    account_id = None
+    match = ACCOUNT_RE.match(account_str.strip())
+    if match:
+        acc_name, acc_type = match.groups()
+        account_id = account_ids.get((acc_name.lower(), acc_type.lower()))
+        if not account_id:
+            errors.append(f"Account '{acc_name}' ({acc_type}) not found.")
+    else:
+        errors.append(
+            f"Could not parse account format '{account_str}'. Expected 'Name (Type)'."
+        )
+
+    if errors:
+        raise ImportRowError(row_num, errors)
+
+    transaction_type = "expense" if dr_cr == "DR" else "income"
+    return ParsedRow(
+        row_num=row_num,
+        transaction_date=transaction_date,
+        description=desc.strip(),
+        amount=amount,
+        transaction_type=transaction_type,
+        affects_balance=not (transaction_type == "expense" and is_expense == "no"),
+        account_id=account_id,
+        notes=notes.strip(),
+        category_names=split_names(cats_str),
+        tag_names=split_names(tags_str),
+    )
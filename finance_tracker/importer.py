@@ -0,0 +1,312 @@
+# finance_tracker/importer.py
+
+import decimal
+from sqlalchemy import select, insert, update, func
+from . import db, duplicates, rollups, search
+from .import_parser import parse_row
+from .models import (
+    Account,
+    Category,
+    Tag,
+    Transaction,
+    transaction_categories,
+    transaction_tags,
+)
+
+
+class BulkImporter:
+    """
+    Writes imported transactions with set-based statements instead of one
+    ORM object per row.
+
+    Accounts, categories and tags are resolved once up front; flush() then
+    inserts the pending transactions and their association rows as
+    executemany batches, applies one balance UPDATE per account, and updates
+    the rollups and search documents from the same plain values.
+
+    With skip_duplicates, rows whose content hash matches a transaction the
+    user already has are dropped at flush() time and counted in
+    duplicates_skipped.
+    """
+
+    def __init__(self, user_id, skip_duplicates=True):
+        self.user_id = user_id
+        self.skip_duplicates = skip_duplicates
+        self.duplicates_skipped = 0
+        self.account_ids = account_id_map(user_id)
+        self.category_ids = self._name_map(Category)
+        self.tag_ids = self._name_map(Tag)
+        self._pending = []
+        self._imported_hashes = set()
+        self._category_labels = None
+
+    def _name_map(self, model):
+        return {
+            name.lower(): item_id
+            for item_id, name in db.session.execute(
+                select(model.id, model.name).filter_by(user_id=self.user_id)
+            )
+        }
+
+    def __len__(self):
+        return len(self._pending)
+
+    def account_id_for(self, name, account_type):
+        """Returns the id of the user's account with this name and type, or None."""
+        return self.account_ids.get((name.lower(), account_type.lower()))
+
+    def add(
+        self,
+        account_id,
+        transaction_date,
+        description,
+        amount,
+        transaction_type,
+        affects_balance,
+        notes="",
+        category_names=(),
+        tag_names=(),
+        category_ids=(),
+        recurring_transaction_id=None,
+        occurrence_date=None,
+    ):
+        """
+        Queues one row for the next flush(). Categories may be given by name,
+        as in import files, or by id, as on recurring rules.
+        """
+        self._pending.append(
+            {
+                "account_id": account_id,
+                "transaction_date": transaction_date,
+                "description": description,
+                "amount": amount,
+                "transaction_type": transaction_type,
+                "affects_balance": affects_balance,
+                "notes": notes,
+                "category_names": _unique_names(category_names),
+                "tag_names": _unique_names(tag_names),
+                "category_ids": list(category_ids),
+                "recurring_transaction_id": recurring_transaction_id,
+                "occurrence_date": occurrence_date,
+                "content_hash": duplicates.content_hash(
+                    self.user_id,
+                    account_id,
+                    transaction_date,
+                    amount,
+                    transaction_type,
+                    description,
+                ),
+            }
+        )
+
+    def add_parsed(self, parsed):
+        """Queues a ParsedRow from finance_tracker.import_parser."""
+        self.add(
+            account_id=parsed.account_id,
+            transaction_date=parsed.transaction_date,
+            description=parsed.description,
+            amount=parsed.amount,
+            transaction_type=parsed.transaction_type,
+            affects_balance=parsed.affects_balance,
+            notes=parsed.notes,
+            category_names=parsed.category_names,
+            tag_names=parsed.tag_names,
+        )
+
+    def add_csv_row(self, row, row_num):
+        """
+        Parses one row of the 10-column import format and queues it.
+
+        Raises:
+            ImportRowError: If the row is malformed or names an unknown account.
+        """
+        self.add_parsed(parse_row(row, row_num, self.account_ids))
+
+    def _resolve_names(self, model, id_map, key):
+        # Create any categories/tags not seen before, keeping the first spelling
+        missing = {}
+        for row in self._pending:
+            for name in row[key]:
+                if name.lower() not in id_map:
+                    missing.setdefault(name.lower(), name)
+        if not missing:
+            return
+
+        db.session.execute(
+            insert(model),
+            [{"name": name, "user_id": self.user_id} for name in missing.values()],
+        )
+        for item_id, name in db.session.execute(
+            select(model.id, model.name).where(
+                model.user_id == self.user_id,
+                func.lower(model.name).in_(list(missing)),
+            )
+        ):
+            id_map.setdefault(name.lower(), item_id)
+
+    def _category_label(self, category_id):
+        # Names of categories passed by id, for the search documents
+        if self._category_labels is None:
+            self._category_labels = dict(
+                db.session.execute(
+                    select(Category.id, Category.name).filter_by(user_id=self.user_id)
+                ).all()
+            )
+        return self._category_labels.get(category_id)
+
+    def _drop_duplicates(self):
+        # One lookup per batch. Hashes this importer wrote itself do not
+        # count, so repeats within one file survive chunked commits.
+        existing = (
+            duplicates.existing_hashes(
+                self.user_id, (row["content_hash"] for row in self._pending)
+            )
+            - self._imported_hashes
+        )
+        if existing:
+            kept = [row for row in self._pending if row["content_hash"] not in existing]
+            self.duplicates_skipped += len(self._pending) - len(kept)
+            self._pending = kept
+
+    def _insert_transactions(self, values):
+        insert_stmt = insert(Transaction)
+        if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+            return (
+                db.session.execute(
+                    insert_stmt.returning(Transaction.id, sort_by_parameter_order=True),
+                    values,
+                )
+                .scalars()
+                .all()
+            )
+        # Databases without ordered multi-row RETURNING insert row by row
+        return [
+            db.session.execute(insert_stmt.values(**row)).inserted_primary_key[0]
+            for row in values
+        ]
+
+    def flush(self):
+        """
+        Inserts every pending row in the current transaction. The caller is
+        responsible for bumping the data version and committing.
+
+        Returns:
+            The number of transactions inserted.
+        """
+        if self.skip_duplicates:
+            self._drop_duplicates()
+        if not self._pending:
+            return 0
+
+        self._resolve_names(Category, self.category_ids, "category_names")
+        self._resolve_names(Tag, self.tag_ids, "tag_names")
+
+        transaction_ids = self._insert_transactions(
+            [
+                {
+                    "user_id": self.user_id,
+                    "account_id": row["account_id"],
+                    "transaction_date": row["transaction_date"],
+                    "description": row["description"],
+                    "amount": row["amount"],
+                    "transaction_type": row["transaction_type"],
+                    "affects_balance": row["affects_balance"],
+                    "notes": row["notes"],
+                    "content_hash": row["content_hash"],
+                    "recurring_transaction_id": row["recurring_transaction_id"],
+                    "occurrence_date": row["occurrence_date"],
+                }
+                for row in self._pending
+            ]
+        )
+
+        category_links, tag_links, documents = [], [], []
+        balance_changes = {}
+        delta = rollups.RollupDelta()
+        for transaction_id, row in zip(transaction_ids, self._pending):
+            category_ids = [
+                self.category_ids[name.lower()] for name in row["category_names"]
+            ]
+            category_names = list(row["category_names"])
+            for category_id in row["category_ids"]:
+                if category_id not in category_ids:
+                    category_ids.append(category_id)
+                    category_names.append(self._category_label(category_id))
+            category_links += [
+                {"transaction_id": transaction_id, "category_id": category_id}
+                for category_id in category_ids
+            ]
+            tag_links += [
+                {"transaction_id": transaction_id, "tag_id": self.tag_ids[name.lower()]}
+                for name in row["tag_names"]
+            ]
+            documents.append(
+                {
+                    "transaction_id": transaction_id,
+                    "user_id": self.user_id,
+                    "document": search.document_for(
+                        row["description"],
+                        row["notes"],
+                        category_names,
+                        row["tag_names"],
+                    ),
+                }
+            )
+            delta.add(
+                user_id=self.user_id,
+                account_id=row["account_id"],
+                transaction_date=row["transaction_date"],
+                transaction_type=row["transaction_type"],
+                affects_balance=row["affects_balance"],
+                amount=row["amount"],
+                category_ids=category_ids,
+            )
+            if row["affects_balance"]:
+                change = row["amount"]
+                if row["transaction_type"] != "income":
+                    change = -change
+                balance_changes[row["account_id"]] = (
+                    balance_changes.get(row["account_id"], decimal.Decimal(0)) + change
+                )
+
+        if category_links:
+            db.session.execute(insert(transaction_categories), category_links)
+        if tag_links:
+            db.session.execute(insert(transaction_tags), tag_links)
+        search.insert_documents(documents)
+        rollups.apply(delta)
+
+        # One UPDATE per account, relative to the stored balance
+        for account_id, change in balance_changes.items():
+            db.session.execute(
+                update(Account)
+                .where(Account.id == account_id)
+                .values(balance=Account.balance + change)
+                .execution_options(synchronize_session=False)
+            )
+
+        inserted = len(transaction_ids)
+        self._imported_hashes.update(row["content_hash"] for row in self._pending)
+        self._pending = []
+        return inserted
+
+
+def account_id_map(user_id):
+    """Returns the user's accounts as a {(name.lower(), type.lower()): id} dict."""
+    return {
+        (name.lower(), account_type.lower()): account_id
+        for account_id, name, account_type in db.session.execute(
+            select(Account.id, Account.name, Account.account_type).filter_by(
+                user_id=user_id
+            )
+        )
+    }
+
+
+def _unique_names(names):
+    seen, unique = set(), []
+    for name in names:
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            unique.append(name)
+    return unique
@@ -8,6 +8,9 @@ transaction_tags = db.Table(
         "transaction_id", db.Integer, db.ForeignKey("transaction.id"), primary_key=True
     ),
     db.Column("tag_id", db.Integer, db.ForeignKey("tag.id"), primary_key=True),
+    # The primary key only covers (transaction_id, tag_id); this reverse index
+    # lets tag lookups seek straight to the matching transactions.
+    db.Index("ix_transaction_tags_tag_id_transaction_id", "tag_id", "transaction_id"),
 )
 
 # Association table for many-to-many relationship between transactions and categories
@@ -19,6 +22,11 @@ transaction_categories = db.Table(
     db.Column(
         "category_id", db.Integer, db.ForeignKey("category.id"), primary_key=True
     ),
+    db.Index(
+        "ix_transaction_categories_category_id_transaction_id",
+        "category_id",
+        "transaction_id",
+    ),
 )
 
 
@@ -29,6 +37,8 @@ class User(db.Model, UserMixin):
     password_hash = db.Column(db.String(150), nullable=False)
     api_key = db.Column(db.String(64), unique=True, nullable=True, index=True)
     avatar_url = db.Column(db.String(255), nullable=True)
+    # Bumped on every write to the user's financial data; part of every cache key
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     transactions = db.relationship(
         "Transaction", backref="user", lazy=True, cascade="all, delete-orphan"
     )
@@ -53,6 +63,18 @@ class User(db.Model, UserMixin):
     activity_logs = db.relationship(
         "ActivityLog", backref="user", lazy=True, cascade="all, delete-orphan"
     )
+    monthly_rollups = db.relationship(
+        "MonthlyRollup", backref="user", lazy=True, cascade="all, delete-orphan"
+    )
+    daily_rollups = db.relationship(
+        "DailyRollup", backref="user", lazy=True, cascade="all, delete-orphan"
+    )
+    import_jobs = db.relationship(
+        "ImportJob", backref="user", lazy=True, cascade="all, delete-orphan"
+    )
+    holdings = db.relationship(
+        "Holding", backref="user", lazy=True, cascade="all, delete-orphan"
+    )
     is_admin = db.Column(db.Boolean, nullable=False, default=False)
 
 
@@ -86,6 +108,12 @@ class Transaction(db.Model):
     )
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     account_id = db.Column(db.Integer, db.ForeignKey("account.id"), nullable=False)
+    # SHA-256 of (user, account, date, signed amount, normalized description),
+    # see finance_tracker.duplicates. Not unique: real repeats are allowed.
+    content_hash = db.Column(db.String(64), nullable=True)
+    # The due date a recurring rule generated this transaction for. Unlike
+    # transaction_date it never changes, so it keys the rule's occurrences.
+    occurrence_date = db.Column(db.Date, nullable=True)
     categories = db.relationship(
         "Category",
         secondary=transaction_categories,
@@ -98,6 +126,41 @@ class Transaction(db.Model):
         lazy="subquery",
         backref=db.backref("transactions", lazy=True),
     )
+    search_document = db.relationship(
+        "TransactionSearch", uselist=False, lazy=True, cascade="all, delete-orphan"
+    )
+
+    # Composite indexes backing the per-user date range scans used by the
+    # dashboard, transaction list, reports and chart APIs.
+    __table_args__ = (
+        db.Index(
+            "ix_transaction_user_id_transaction_date", "user_id", "transaction_date"
+        ),
+        db.Index(
+            "ix_transaction_user_type_balance_date",
+            "user_id",
+            "transaction_type",
+            "affects_balance",
+            "transaction_date",
+        ),
+        # Duplicate detection for imports looks up many hashes per user at once
+        db.Index("ix_transaction_user_content_hash", "user_id", "content_hash"),
+        # A recurring rule generates each occurrence at most once. Filtered,
+        # since SQL Server counts NULLs as equal in unique indexes; deleting a
+        # rule detaches its transactions but keeps their occurrence_date.
+        db.Index(
+            "ux_transaction_recurring_occurrence",
+            "recurring_transaction_id",
+            "occurrence_date",
+            unique=True,
+            mssql_where=db.text(
+                "recurring_transaction_id IS NOT NULL AND occurrence_date IS NOT NULL"
+            ),
+            sqlite_where=db.text(
+                "recurring_transaction_id IS NOT NULL AND occurrence_date IS NOT NULL"
+            ),
+        ),
+    )
 
 
 class Category(db.Model):
@@ -168,6 +231,26 @@ class RecurringTransaction(db.Model):
         "Transaction", backref="recurring_rule", lazy="dynamic"
     )
 
+    # The scheduled job scans due rules; /recurring lists a user's by due date
+    __table_args__ = (
+        db.Index("ix_recurring_transaction_next_due_date", "next_due_date"),
+        db.Index(
+            "ix_recurring_transaction_user_next_due_date", "user_id", "next_due_date"
+        ),
+    )
+
+
+class RecurringSchedule(db.Model):
+    """
+    A single row holding the earliest next_due_date of any recurring rule, so
+    the scheduled job can tell that nothing is due without scanning the rules.
+    A NULL next_wakeup means there are no rules; a missing row means unknown.
+    """
+
+    __tablename__ = "recurring_schedule"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    next_wakeup = db.Column(db.Date, nullable=True)
+
 
 class Asset(db.Model):
     __tablename__ = "asset"
@@ -182,6 +265,32 @@ class Asset(db.Model):
     transactions = db.relationship("InvestmentTransaction", backref="asset", lazy=True)
 
 
+class AssetPrice(db.Model):
+    """
+    The latest quote fetched for a ticker, shared by every worker and user.
+    finance_tracker.services decides from fetched_at whether it is still fresh.
+    """
+
+    __tablename__ = "asset_price"
+    ticker = db.Column(db.String(20), primary_key=True)
+    price = db.Column(db.Numeric(18, 4), nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False)
+    source = db.Column(db.String(50), nullable=False)
+
+
+class AssetPriceHistory(db.Model):
+    """
+    One closing price per ticker and day, loaded by finance_tracker.price_history
+    and read by the portfolio valuation engine.
+    """
+
+    __tablename__ = "asset_price_history"
+    ticker = db.Column(db.String(20), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    close = db.Column(db.Numeric(18, 4), nullable=False)
+    source = db.Column(db.String(50), nullable=False)
+
+
 class InvestmentTransaction(db.Model):
     __tablename__ = "investment_transaction"
     id = db.Column(db.Integer, primary_key=True)
@@ -206,3 +315,162 @@ class ActivityLog(db.Model):
     )
     description = db.Column(db.String(255), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+
+
+class MonthlyRollup(db.Model):
+    """
+    Pre-aggregated monthly totals per user/account/category/type, maintained
+    incrementally by finance_tracker.rollups whenever transactions change.
+    """
+
+    __tablename__ = "monthly_rollup"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)  # 1-12
+    account_id = db.Column(db.Integer, db.ForeignKey("account.id"), nullable=False)
+    category_id = db.Column(
+        db.Integer, db.ForeignKey("category.id"), nullable=True
+    )  # NULL holds uncategorized transactions
+    transaction_type = db.Column(db.String(20), nullable=False)
+    affects_balance = db.Column(db.Boolean, nullable=False)
+
+    # Sum for this category; a transaction with several categories counts in each.
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    # Sum counting every transaction once (on its lowest category id), for type totals.
+    distinct_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id",
+            "year",
+            "month",
+            "account_id",
+            "category_id",
+            "transaction_type",
+            "affects_balance",
+            name="_monthly_rollup_key_uc",
+        ),
+    )
+
+
+class Holding(db.Model):
+    """
+    A user's current position in an asset (average-cost method), maintained
+    by finance_tracker.holdings whenever investment transactions change.
+    """
+
+    __tablename__ = "holding"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    asset_id = db.Column(db.Integer, db.ForeignKey("asset.id"), primary_key=True)
+    quantity = db.Column(db.Numeric(18, 8), nullable=False, default=0)
+    # Cost of the units still held; sells remove their share at the average cost
+    cost_basis = db.Column(db.Numeric(18, 4), nullable=False, default=0)
+    realized_pnl = db.Column(db.Numeric(18, 4), nullable=False, default=0)
+
+    asset = db.relationship("Asset", lazy="joined")
+
+
+class DailyRollup(db.Model):
+    """
+    Pre-aggregated daily totals per user and transaction type, backing the
+    dashboard trend charts. Maintained by finance_tracker.rollups.
+    """
+
+    __tablename__ = "daily_rollup"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    transaction_type = db.Column(db.String(20), nullable=False)
+    affects_balance = db.Column(db.Boolean, nullable=False)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # The key doubles as the (user_id, day) range index for the chart queries
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id",
+            "day",
+            "transaction_type",
+            "affects_balance",
+            name="_daily_rollup_key_uc",
+        ),
+    )
+
+
+class TransactionSearch(db.Model):
+    """
+    A denormalized search document per transaction (description, notes,
+    category and tag names), maintained by finance_tracker.search on write.
+    It is indexed by SQL Server full-text or an SQLite FTS5 table.
+    """
+
+    __tablename__ = "transaction_search"
+    transaction_id = db.Column(
+        db.Integer, db.ForeignKey("transaction.id"), nullable=False
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    document = db.Column(db.Text, nullable=False, default="")
+
+    # The full-text index needs a named, single-column unique key to hang off
+    __table_args__ = (
+        db.PrimaryKeyConstraint("transaction_id", name="pk_transaction_search"),
+        db.Index("ix_transaction_search_user_id", "user_id"),
+    )
+
+
+class ImportJob(db.Model):
+    """
+    A background CSV import. The upload is spooled to disk and imported in
+    committed chunks by finance_tracker.import_jobs, which records progress here.
+    Validated-but-uncommitted uploads are kept as 'staged' jobs.
+    """
+
+    __tablename__ = "import_job"
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    spool_path = db.Column(db.String(500), nullable=True)
+    # 'staged', 'queued', 'running', 'completed' or 'failed'
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    rows_imported = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    duplicate_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    errors = db.Column(db.Text, nullable=True)  # JSON list of the first errors
+    # Validated rows of a 'staged' import, awaiting the commit (JSON)
+    staged_rows = db.Column(db.Text, nullable=True)
+    created_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    started_at = db.Column(db.DateTime, nullable=True)
+    # Refreshed by the worker after every committed chunk; a running job whose
+    # heartbeat stops is reported as failed
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
+class RecurringJobRun(db.Model):
+    """
+    Checkpoint of one day's recurring-transaction run for one shard, written by
+    finance_tracker.recurring after every committed batch. A retried run of
+    the same day and shard resumes after last_rule_id.
+    """
+
+    __tablename__ = "recurring_job_run"
+    run_date = db.Column(db.Date, primary_key=True)
+    shard_index = db.Column(db.Integer, primary_key=True)
+    shard_count = db.Column(db.Integer, primary_key=True)
+    last_rule_id = db.Column(db.Integer, nullable=False, default=0)
+    rules_processed = db.Column(db.Integer, nullable=False, default=0)
+    transactions_created = db.Column(db.Integer, nullable=False, default=0)
+    failed_rules = db.Column(db.Integer, nullable=False, default=0)
+    # 'running' or 'completed'
+    status = db.Column(db.String(20), nullable=False, default="running")
+    started_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    finished_at = db.Column(db.DateTime, nullable=True)
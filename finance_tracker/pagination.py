@@ -0,0 +1,111 @@
+# finance_tracker/pagination.py
+
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import and_, or_
+from . import db
+
+
+def encode_cursor(transaction_date, transaction_id):
+    """
+    Encodes a (transaction_date, id) position as an opaque, URL-safe token.
+    """
+    raw = f"{transaction_date.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decodes a token produced by encode_cursor().
+
+    Returns:
+        A (transaction_date, id) tuple, or None if the token is missing or invalid.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        date_str, id_str = raw.split("|", 1)
+        return datetime.fromisoformat(date_str), int(id_str)
+    except (ValueError, UnicodeError, binascii.Error):
+        return None
+
+
+class KeysetPage:
+    """
+    One page of a keyset (seek) paginated query. Exposes the same `items`,
+    `has_next`, `has_prev` and `total` attributes the templates use for
+    db.paginate() results, plus the cursor tokens for the neighbouring pages.
+    """
+
+    def __init__(self, items, has_next, has_prev, total=None):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.total = total
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.items:
+            return None
+        last = self.items[-1]
+        return encode_cursor(last.transaction_date, last.id)
+
+    @property
+    def prev_cursor(self):
+        if not self.has_prev or not self.items:
+            return None
+        first = self.items[0]
+        return encode_cursor(first.transaction_date, first.id)
+
+
+def keyset_paginate(stmt, model, after=None, before=None, per_page=15, total=None):
+    """
+    Paginates a select() on (model.transaction_date DESC, model.id DESC)
+    by seeking past a cursor instead of using OFFSET, so every page costs
+    the same index range scan no matter how deep the user has paged.
+
+    Args:
+        stmt: An unordered select() of `model` with all filters applied.
+        model: The mapped class whose transaction_date/id columns form the key.
+        after: A decoded cursor; returns the rows that come after it (older).
+        before: A decoded cursor; returns the rows that come before it (newer).
+        per_page: The page size.
+        total: An optional (cached or estimated) total row count to expose.
+
+    Returns:
+        A KeysetPage.
+    """
+    date_col, id_col = model.transaction_date, model.id
+
+    # SQL Server has no row-value comparison, so (date, id) < (d, i) is spelled out
+    if before is not None:
+        cursor_date, cursor_id = before
+        stmt = stmt.where(
+            or_(
+                date_col > cursor_date,
+                and_(date_col == cursor_date, id_col > cursor_id),
+            )
+        ).order_by(date_col.asc(), id_col.asc())
+    else:
+        if after is not None:
+            cursor_date, cursor_id = after
+            stmt = stmt.where(
+                or_(
+                    date_col < cursor_date,
+                    and_(date_col == cursor_date, id_col < cursor_id),
+                )
+            )
+        stmt = stmt.order_by(date_col.desc(), id_col.desc())
+
+    # Fetch one extra row to know whether there is another page in that direction
+    rows = db.session.execute(stmt.limit(per_page + 1)).scalars().all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if before is not None:
+        rows.reverse()
+        return KeysetPage(rows, has_next=True, has_prev=has_more, total=total)
+    return KeysetPage(rows, has_next=has_more, has_prev=after is not None, total=total)
@@ -0,0 +1,73 @@
+# finance_tracker/price_history.py
+
+import csv
+import decimal
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import delete, insert
+from . import db
+from .models import AssetPriceHistory
+
+FILE_SOURCE = "file"
+STORE_BATCH_SIZE = 1000
+
+
+def load_csv(path, source=FILE_SOURCE):
+    """
+    Loads daily closing prices from a CSV file with `ticker`, `date`
+    (YYYY-MM-DD) and `close` columns, such as a provider's bulk export.
+    Prices already stored for the same ticker and day are replaced.
+
+    Args:
+        path: The CSV file to read.
+        source: Recorded on every loaded row.
+
+    Returns:
+        The number of prices stored.
+
+    Raises:
+        ValueError: If a row is malformed; nothing is stored in that case.
+    """
+    closes = {}
+    with open(path, encoding="utf-8", newline="") as csv_file:
+        for line_num, row in enumerate(csv.DictReader(csv_file), start=2):
+            try:
+                ticker = row["ticker"].strip().upper()
+                day = datetime.strptime(row["date"].strip(), "%Y-%m-%d").date()
+                close = decimal.Decimal(row["close"].strip())
+            except (KeyError, AttributeError, ValueError, decimal.InvalidOperation):
+                raise ValueError(
+                    f"Line {line_num}: expected a ticker, a YYYY-MM-DD date and a close price."
+                )
+            closes[(ticker, day)] = close
+    return store_closes(closes, source)
+
+
+def store_closes(closes, source):
+    """
+    Upserts closing prices given as a {(ticker, day): close} dict, with one
+    DELETE per ticker and one executemany INSERT per batch. The caller commits.
+
+    Returns:
+        The number of prices stored.
+    """
+    items = list(closes.items())
+    for start in range(0, len(items), STORE_BATCH_SIZE):
+        batch = items[start : start + STORE_BATCH_SIZE]
+        days_by_ticker = defaultdict(list)
+        for (ticker, day), _ in batch:
+            days_by_ticker[ticker].append(day)
+        for ticker, days in days_by_ticker.items():
+            db.session.execute(
+                delete(AssetPriceHistory).where(
+                    AssetPriceHistory.ticker == ticker, AssetPriceHistory.day.in_(days)
+                )
+            )
+        db.session.execute(
+            insert(AssetPriceHistory),
+            [
+                {"ticker": ticker, "day": day, "close": close, "source": source}
+                for (ticker, day), close in batch
+            ],
+        )
+    return len(items)
@@ -0,0 +1,345 @@
+# finance_tracker/recurring.py
+
+from datetime import datetime, timezone
+from itertools import groupby
+from dateutil.relativedelta import relativedelta
+from flask import current_app
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .caching import bump_data_version
+from .importer import BulkImporter
+from .models import (
+    RecurringJobRun,
+    RecurringSchedule,
+    RecurringTransaction,
+    Transaction,
+)
+
+# Keeps every IN list well below SQL Server's 2100 parameter limit
+LOOKUP_BATCH_SIZE = 1000
+SCHEDULE_ID = 1
+
+INTERVALS = {
+    "daily": relativedelta(days=1),
+    "weekly": relativedelta(weeks=1),
+    "monthly": relativedelta(months=1),
+    "yearly": relativedelta(years=1),
+}
+
+
+def occurrences(start_date, recurrence_interval, until, since=None):
+    """
+    Returns the due dates of a rule between since (default: start_date) and
+    until, both inclusive. The n-th date is always start_date plus n
+    intervals, never the previous date plus one, so a monthly rule starting
+    on the 31st returns to the 31st after February however often it runs.
+    """
+    step = INTERVALS[recurrence_interval]
+    count = _first_index(start_date, step, since or start_date)
+    dates = []
+    while (due := start_date + step * count) <= until:
+        dates.append(due)
+        count += 1
+    return dates
+
+
+def next_occurrence(start_date, recurrence_interval, after):
+    """Returns the first due date of a rule that falls after `after`."""
+    step = INTERVALS[recurrence_interval]
+    count = _first_index(start_date, step, after)
+    while (due := start_date + step * count) <= after:
+        count += 1
+    return due
+
+
+def _first_index(start_date, step, since):
+    # Index of the first occurrence on or after since, estimated from the
+    # calendar distance and corrected by at most a step or two
+    if since <= start_date:
+        return 0
+    step_months = step.years * 12 + step.months
+    if step_months:
+        months = (since.year - start_date.year) * 12 + since.month - start_date.month
+        count = months // step_months
+    else:
+        count = (since - start_date).days // step.days
+    while start_date + step * count < since:
+        count += 1
+    return count
+
+
+def parse_shard(value):
+    """
+    Parses a shard given as "i/n" (the i-th of n shards, counting from 0).
+
+    Raises:
+        ValueError: If the value is malformed or i is not below n.
+    """
+    index, _, count = (value or "").partition("/")
+    shard_index, shard_count = int(index), int(count)
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard '{value}', expected i/n with 0 <= i < n.")
+    return shard_index, shard_count
+
+
+def run_job(today, shard_index=0, shard_count=1, batch_size=None):
+    """
+    Generates the due recurring transactions of one shard in committed batches.
+
+    Rules are paged by id, and a shard takes the rules of the users whose id
+    modulo shard_count equals shard_index, so replicas never share a user.
+    Every batch commits together with its RecurringJobRun checkpoint, so a
+    retried run for the same day resumes after the last committed batch. If
+    a batch fails, its rules are retried one by one and only the failing
+    rules are skipped.
+
+    The run returns at once, without reading the rules, when the
+    RecurringSchedule row shows that nothing is due yet.
+
+    Returns:
+        A JSON-ready report of this invocation.
+    """
+    if not is_due(today):
+        return {
+            "run_date": today.isoformat(),
+            "shard": f"{shard_index}/{shard_count}",
+            "skipped": True,
+            "transactions_created": 0,
+            "failed_rule_ids": [],
+        }
+
+    batch_size = batch_size or current_app.config.get("RECURRING_BATCH_SIZE", 500)
+    run = _checkpoint(today, shard_index, shard_count)
+    resumed_from = run.last_rule_id
+    run.status = "running"
+    db.session.commit()
+
+    stmt = (
+        select(RecurringTransaction)
+        .where(RecurringTransaction.next_due_date <= today)
+        .order_by(RecurringTransaction.id)
+        .limit(batch_size)
+    )
+    if shard_count > 1:
+        stmt = stmt.where(RecurringTransaction.user_id % shard_count == shard_index)
+
+    created, failed_rule_ids = 0, []
+    while rules := (
+        db.session.execute(stmt.where(RecurringTransaction.id > run.last_rule_id))
+        .scalars()
+        .all()
+    ):
+        rule_ids = [rule.id for rule in rules]
+        try:
+            batch_created = generate(rules, today)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(
+                f"Recurring batch {rule_ids[0]}-{rule_ids[-1]} failed, "
+                f"retrying its rules one by one: {e}"
+            )
+            batch_created, batch_failed = _generate_one_by_one(rule_ids, today)
+            failed_rule_ids += batch_failed
+            run.failed_rules += len(batch_failed)
+
+        created += batch_created
+        run.last_rule_id = rule_ids[-1]
+        run.rules_processed += len(rule_ids)
+        run.transactions_created += batch_created
+        db.session.commit()
+
+    run.status = "completed"
+    run.finished_at = datetime.now(timezone.utc)
+    refresh_wakeup()
+    db.session.commit()
+    return {
+        "run_date": today.isoformat(),
+        "shard": f"{shard_index}/{shard_count}",
+        "skipped": False,
+        "resumed_from": resumed_from,
+        "last_rule_id": run.last_rule_id,
+        "transactions_created": created,
+        "failed_rule_ids": failed_rule_ids,
+    }
+
+
+def is_due(today):
+    """
+    Tells from the RecurringSchedule row alone whether any rule may be due by
+    today. Without the row (before the first run) the answer is always yes.
+    """
+    schedule_row = db.session.execute(
+        select(RecurringSchedule.next_wakeup).filter_by(id=SCHEDULE_ID)
+    ).first()
+    if schedule_row is None:
+        return True
+    return schedule_row.next_wakeup is not None and schedule_row.next_wakeup <= today
+
+
+def schedule(due_date):
+    """
+    Brings the next wakeup forward to due_date for a new rule, if it is later.
+    Runs as one conditional UPDATE in the caller's transaction.
+    """
+    db.session.execute(
+        update(RecurringSchedule)
+        .where(
+            RecurringSchedule.id == SCHEDULE_ID,
+            or_(
+                RecurringSchedule.next_wakeup.is_(None),
+                RecurringSchedule.next_wakeup > due_date,
+            ),
+        )
+        .values(next_wakeup=due_date)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_wakeup():
+    """
+    Sets the next wakeup to the earliest next_due_date of all rules, read
+    from the next_due_date index inside the same UPDATE. The caller commits.
+    """
+    earliest = select(func.min(RecurringTransaction.next_due_date))
+    updated = db.session.execute(
+        update(RecurringSchedule)
+        .where(RecurringSchedule.id == SCHEDULE_ID)
+        .values(next_wakeup=earliest.scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    if updated.rowcount == 0:
+        db.session.add(
+            RecurringSchedule(
+                id=SCHEDULE_ID, next_wakeup=db.session.execute(earliest).scalar()
+            )
+        )
+
+
+def generate(rules, today):
+    """
+    Creates the transactions of the given due rules, including every
+    occurrence missed while the job was not running, and moves each rule's
+    next_due_date past today. The caller commits.
+
+    Each user's transactions are written by one BulkImporter, which
+    bulk-inserts them and applies one balance UPDATE per account; the rules'
+    account and category relationships are never loaded.
+
+    Occurrences that already have a transaction, for instance from an
+    overlapping run, are left out after one lookup for all the rules, and the
+    unique (recurring_transaction_id, occurrence_date) index rejects any that
+    a concurrent run inserts in the meantime.
+
+    Returns:
+        The number of transactions created.
+    """
+    created = 0
+    rules = sorted(rules, key=lambda rule: (rule.user_id, rule.id))
+    existing = existing_occurrences(rules)
+    for user_id, user_rules in groupby(rules, key=lambda rule: rule.user_id):
+        importer = BulkImporter(user_id, skip_duplicates=False)
+        for rule in user_rules:
+            if rule.recurrence_interval not in INTERVALS:
+                current_app.logger.warning(
+                    f"Skipping recurring rule {rule.id} with unknown interval "
+                    f"'{rule.recurrence_interval}'."
+                )
+                continue
+            dates = occurrences(
+                rule.start_date,
+                rule.recurrence_interval,
+                today,
+                since=rule.next_due_date,
+            )
+            if not dates:
+                continue
+            for due in dates:
+                if (rule.id, due) in existing:
+                    continue
+                importer.add(
+                    account_id=rule.account_id,
+                    transaction_date=datetime.combine(
+                        due, datetime.min.time(), tzinfo=timezone.utc
+                    ),
+                    description=rule.description,
+                    amount=rule.amount,
+                    transaction_type=rule.transaction_type,
+                    affects_balance=True,
+                    category_ids=[rule.category_id] if rule.category_id else (),
+                    recurring_transaction_id=rule.id,
+                    occurrence_date=due,
+                )
+            rule.last_processed_date = dates[-1]
+            rule.next_due_date = next_occurrence(
+                rule.start_date, rule.recurrence_interval, dates[-1]
+            )
+        created += importer.flush()
+        bump_data_version(user_id)
+    return created
+
+
+def existing_occurrences(rules):
+    """
+    Returns the (rule id, occurrence date) pairs already generated for the
+    rules from their current next_due_date on, with one indexed IN lookup per
+    LOOKUP_BATCH_SIZE rules.
+    """
+    if not rules:
+        return set()
+    since = min(rule.next_due_date for rule in rules)
+    rule_ids = [rule.id for rule in rules]
+    found = set()
+    for start in range(0, len(rule_ids), LOOKUP_BATCH_SIZE):
+        found.update(
+            db.session.execute(
+                select(
+                    Transaction.recurring_transaction_id, Transaction.occurrence_date
+                ).where(
+                    Transaction.recurring_transaction_id.in_(
+                        rule_ids[start : start + LOOKUP_BATCH_SIZE]
+                    ),
+                    Transaction.occurrence_date >= since,
+                )
+            ).tuples()
+        )
+    return found
+
+
+def _generate_one_by_one(rule_ids, today):
+    created, failed = 0, []
+    for rule_id in rule_ids:
+        try:
+            rule = db.session.get(RecurringTransaction, rule_id)
+            if rule is not None and rule.next_due_date <= today:
+                created += generate([rule], today)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Recurring rule {rule_id} failed: {e}")
+            failed.append(rule_id)
+    return created, failed
+
+
+def _checkpoint(today, shard_index, shard_count):
+    key = (today, shard_index, shard_count)
+    run = db.session.get(RecurringJobRun, key)
+    if run is not None:
+        return run
+    try:
+        db.session.add(
+            RecurringJobRun(
+                run_date=today,
+                shard_index=shard_index,
+                shard_count=shard_count,
+                last_rule_id=0,
+                rules_processed=0,
+                transactions_created=0,
+                failed_rules=0,
+            )
+        )
+        db.session.commit()
+    except IntegrityError:
+        # Another replica of the same shard created it first
+        db.session.rollback()
+    return db.session.get(RecurringJobRun, key)
@@ -0,0 +1,430 @@
+# finance_tracker/rollups.py
+
+import decimal
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import select, delete, insert, func, true, update
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import Transaction, MonthlyRollup, DailyRollup, transaction_categories
+
+ZERO = decimal.Decimal(0)
+
+
+class RollupDelta:
+    """
+    Accumulates the monthly and daily rollup changes caused by a set of
+    transactions, so each affected rollup row is written once.
+
+    It works on plain values so both ORM transactions and the bulk insert
+    paths (CSV import, recurring generation) can share it.
+    """
+
+    def __init__(self):
+        # (user, year, month, account, category, type, affects) -> [amount, distinct, count]
+        self.monthly = {}
+        # (user, day, type, affects) -> [amount, count]
+        self.daily = {}
+
+    def __bool__(self):
+        return bool(self.monthly or self.daily)
+
+    def add(
+        self,
+        user_id,
+        account_id,
+        transaction_date,
+        transaction_type,
+        affects_balance,
+        amount,
+        category_ids,
+        sign=1,
+    ):
+        """
+        Adds the contribution of a single transaction.
+
+        Args:
+            category_ids: The ids of the transaction's categories (may be empty).
+            sign: 1 to add the transaction, -1 to remove it.
+        """
+        amount = decimal.Decimal(amount) * sign
+        affects_balance = bool(affects_balance)
+
+        category_ids = sorted(set(category_ids)) or [None]
+        for index, category_id in enumerate(category_ids):
+            key = (
+                user_id,
+                transaction_date.year,
+                transaction_date.month,
+                account_id,
+                category_id,
+                transaction_type,
+                affects_balance,
+            )
+            entry = self.monthly.setdefault(key, [ZERO, ZERO, 0])
+            entry[0] += amount
+            # Only the first (lowest id) category carries the de-duplicated amount
+            if index == 0:
+                entry[1] += amount
+            entry[2] += sign
+
+        day_key = (
+            user_id,
+            _as_date(transaction_date),
+            transaction_type,
+            affects_balance,
+        )
+        day_entry = self.daily.setdefault(day_key, [ZERO, 0])
+        day_entry[0] += amount
+        day_entry[1] += sign
+
+    def add_transaction(self, transaction, sign=1):
+        """Adds an ORM Transaction in its current state."""
+        self.add(
+            user_id=transaction.user_id,
+            account_id=transaction.account_id,
+            transaction_date=transaction.transaction_date,
+            transaction_type=transaction.transaction_type,
+            affects_balance=transaction.affects_balance,
+            amount=transaction.amount,
+            category_ids=[category.id for category in transaction.categories],
+            sign=sign,
+        )
+
+
+def _as_date(value):
+    return value.date() if hasattr(value, "date") else value
+
+
+def entries_for(transaction, sign=1):
+    """
+    Returns the rollup delta for an ORM Transaction in its current state.
+    Take this snapshot *before* mutating a transaction to be able to revert it.
+    """
+    delta = RollupDelta()
+    delta.add_transaction(transaction, sign=sign)
+    return delta
+
+
+def apply(delta, sign=1):
+    """
+    Applies a RollupDelta to the rollup tables in the current session, with
+    one atomic UPDATE (or INSERT) per affected row. Rows whose transaction
+    count drops to zero are removed.
+
+    Args:
+        delta: A RollupDelta as built by entries_for() or by hand.
+        sign: Pass -1 to subtract the delta instead of adding it.
+    """
+    if delta.monthly:
+        _apply_monthly(delta.monthly, sign)
+    if delta.daily:
+        _apply_daily(delta.daily, sign)
+
+
+def _apply_monthly(entries, sign):
+    for key, (amount, distinct_amount, count) in _in_key_order(entries):
+        user_id, year, month, account_id, category_id, trans_type, affects = key
+        _increment(
+            MonthlyRollup,
+            {
+                "user_id": user_id,
+                "year": year,
+                "month": month,
+                "account_id": account_id,
+                "category_id": category_id,
+                "transaction_type": trans_type,
+                "affects_balance": affects,
+            },
+            {
+                "amount": amount * sign,
+                "distinct_amount": distinct_amount * sign,
+                "transaction_count": count * sign,
+            },
+        )
+
+
+def _apply_daily(entries, sign):
+    for key, (amount, count) in _in_key_order(entries):
+        user_id, day, trans_type, affects = key
+        _increment(
+            DailyRollup,
+            {
+                "user_id": user_id,
+                "day": day,
+                "transaction_type": trans_type,
+                "affects_balance": affects,
+            },
+            {"amount": amount * sign, "transaction_count": count * sign},
+        )
+
+
+def _in_key_order(entries):
+    # A fixed order keeps concurrent writers from locking rows in opposite
+    # orders; None (no category) sorts first
+    return sorted(
+        entries.items(),
+        key=lambda item: tuple((value is not None, value or 0) for value in item[0]),
+    )
+
+
+def _increment(model, key, changes):
+    """
+    Adds `changes` to the rollup row identified by `key` in the database
+    itself, so concurrent writers never overwrite each other's deltas.
+
+    The row is created if it does not exist yet; if another writer creates
+    it first, the unique key rejects the INSERT and the increment is
+    retried. A row whose transaction count drops to zero is deleted.
+    """
+    conditions = [
+        (
+            getattr(model, column).is_(None)
+            if value is None
+            else getattr(model, column) == value
+        )
+        for column, value in key.items()
+    ]
+    increment_stmt = (
+        update(model)
+        .where(*conditions)
+        .values(
+            {
+                column: getattr(model, column) + value
+                for column, value in changes.items()
+            }
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.session.execute(increment_stmt).rowcount == 0:
+        if changes["transaction_count"] <= 0:
+            # Removing a transaction the rollups never counted, e.g. one
+            # written before they were filled: there is nothing to subtract
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model).values(**key, **changes))
+        except IntegrityError:
+            db.session.execute(increment_stmt)
+
+    if changes["transaction_count"] < 0:
+        db.session.execute(
+            delete(model)
+            .where(*conditions, model.transaction_count <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def record_many(transactions):
+    """
+    Adds newly created ORM transactions to the rollups, one write per
+    affected rollup row.
+    """
+    # Make sure categories created alongside the transactions have ids
+    db.session.flush()
+    delta = RollupDelta()
+    for transaction in transactions:
+        delta.add_transaction(transaction)
+    apply(delta)
+
+
+def record(transaction):
+    """Adds a newly created transaction to the rollups."""
+    record_many([transaction])
+
+
+def unrecord(transaction):
+    """Removes a transaction that is about to be deleted from the rollups."""
+    apply(entries_for(transaction), sign=-1)
+
+
+def category_spending(user_id, year, month):
+    """
+    Returns a {category_id: total} dict of the balance-affecting expenses
+    for a single month, read from the rollups.
+    """
+    stmt = (
+        select(MonthlyRollup.category_id, func.sum(MonthlyRollup.amount))
+        .where(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.year == year,
+            MonthlyRollup.month == month,
+            MonthlyRollup.transaction_type == "expense",
+            MonthlyRollup.affects_balance == true(),
+            MonthlyRollup.category_id.is_not(None),
+        )
+        .group_by(MonthlyRollup.category_id)
+    )
+    return {row[0]: row[1] for row in db.session.execute(stmt).all()}
+
+
+def daily_totals(user_id, start_date, end_date, transaction_type=None):
+    """
+    Returns the balance-affecting daily totals between two dates (inclusive)
+    as a list of (day, transaction_type, amount) rows, read from the rollups.
+    """
+    stmt = (
+        select(DailyRollup.day, DailyRollup.transaction_type, DailyRollup.amount)
+        .where(
+            DailyRollup.user_id == user_id,
+            DailyRollup.day >= start_date,
+            DailyRollup.day <= end_date,
+            DailyRollup.affects_balance == true(),
+        )
+        .order_by(DailyRollup.day)
+    )
+    if transaction_type:
+        stmt = stmt.where(DailyRollup.transaction_type == transaction_type)
+    return db.session.execute(stmt).all()
+
+
+def rebuild(user_id=None):
+    """
+    Recomputes the monthly and daily rollup tables from the raw transactions.
+
+    Args:
+        user_id: Restrict the rebuild to a single user. Rebuilds everyone if None.
+
+    Returns:
+        The number of rollup rows written.
+    """
+    for model in (MonthlyRollup, DailyRollup):
+        clear_stmt = delete(model)
+        if user_id is not None:
+            clear_stmt = clear_stmt.where(model.user_id == user_id)
+        db.session.execute(clear_stmt)
+
+    return _rebuild_monthly(user_id) + _rebuild_daily(user_id)
+
+
+def _rebuild_monthly(user_id):
+    year_col = func.extract("year", Transaction.transaction_date)
+    month_col = func.extract("month", Transaction.transaction_date)
+    key_columns = [
+        Transaction.user_id,
+        year_col,
+        month_col,
+        Transaction.account_id,
+    ]
+    tail_columns = [Transaction.transaction_type, Transaction.affects_balance]
+
+    # 1. Per-category sums: a transaction counts once for each of its categories
+    per_category_stmt = (
+        select(
+            *key_columns,
+            transaction_categories.c.category_id,
+            *tail_columns,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id),
+        )
+        .outerjoin(
+            transaction_categories,
+            Transaction.id == transaction_categories.c.transaction_id,
+        )
+        .group_by(*key_columns, transaction_categories.c.category_id, *tail_columns)
+    )
+
+    # 2. De-duplicated sums: every transaction counts once, on its lowest category
+    first_category = (
+        select(
+            transaction_categories.c.transaction_id,
+            func.min(transaction_categories.c.category_id).label("category_id"),
+        )
+        .group_by(transaction_categories.c.transaction_id)
+        .subquery()
+    )
+    distinct_stmt = (
+        select(
+            *key_columns,
+            first_category.c.category_id,
+            *tail_columns,
+            func.sum(Transaction.amount),
+        )
+        .outerjoin(first_category, Transaction.id == first_category.c.transaction_id)
+        .group_by(*key_columns, first_category.c.category_id, *tail_columns)
+    )
+
+    if user_id is not None:
+        per_category_stmt = per_category_stmt.where(Transaction.user_id == user_id)
+        distinct_stmt = distinct_stmt.where(Transaction.user_id == user_id)
+
+    rows = defaultdict(dict)
+    for (
+        uid,
+        year,
+        month,
+        acc_id,
+        cat_id,
+        t_type,
+        affects,
+        total,
+        count,
+    ) in db.session.execute(per_category_stmt):
+        key = (uid, int(year), int(month), acc_id, cat_id, t_type, bool(affects))
+        rows[key].update(amount=total, transaction_count=count)
+    for uid, year, month, acc_id, cat_id, t_type, affects, total in db.session.execute(
+        distinct_stmt
+    ):
+        key = (uid, int(year), int(month), acc_id, cat_id, t_type, bool(affects))
+        rows[key]["distinct_amount"] = total
+
+    values = [
+        {
+            "user_id": key[0],
+            "year": key[1],
+            "month": key[2],
+            "account_id": key[3],
+            "category_id": key[4],
+            "transaction_type": key[5],
+            "affects_balance": key[6],
+            "amount": data.get("amount", 0),
+            "distinct_amount": data.get("distinct_amount", 0),
+            "transaction_count": data.get("transaction_count", 0),
+        }
+        for key, data in rows.items()
+    ]
+    if values:
+        db.session.execute(insert(MonthlyRollup), values)
+    return len(values)
+
+
+def _rebuild_daily(user_id):
+    # EXTRACT behaves the same on SQL Server and SQLite, unlike CAST(... AS DATE)
+    day_columns = [
+        func.extract("year", Transaction.transaction_date),
+        func.extract("month", Transaction.transaction_date),
+        func.extract("day", Transaction.transaction_date),
+    ]
+    stmt = select(
+        Transaction.user_id,
+        *day_columns,
+        Transaction.transaction_type,
+        Transaction.affects_balance,
+        func.sum(Transaction.amount),
+        func.count(Transaction.id),
+    ).group_by(
+        Transaction.user_id,
+        *day_columns,
+        Transaction.transaction_type,
+        Transaction.affects_balance,
+    )
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+
+    values = [
+        {
+            "user_id": uid,
+            "day": date(int(year), int(month), int(day)),
+            "transaction_type": t_type,
+            "affects_balance": bool(affects),
+            "amount": total,
+            "transaction_count": count,
+        }
+        for uid, year, month, day, t_type, affects, total, count in db.session.execute(
+            stmt
+        )
+    ]
+    if values:
+        db.session.execute(insert(DailyRollup), values)
+    return len(values)
@@ -12,6 +12,7 @@ from flask import (
     jsonify,
     Response,
     current_app,
+    stream_with_context,
 )
 from flask_login import login_user, logout_user, login_required, current_user
 from . import db, bcrypt
@@ -32,14 +33,31 @@ from .models import (
     RecurringTransaction,
     ActivityLog,
     Asset,
+    AssetPrice,
     InvestmentTransaction,
+    MonthlyRollup,
+    ImportJob,
 )
-from sqlalchemy import func, select, or_, text, case
+from . import (
+    rollups,
+    search,
+    import_jobs,
+    duplicates,
+    forecast,
+    holdings,
+    recurring,
+    valuation,
+)
+from .caching import cache, bump_data_version
+from .pagination import keyset_paginate, decode_cursor
+from .importer import BulkImporter, account_id_map
+from .import_parser import ImportRowError, parse_row
+from sqlalchemy import func, select, text, true
 from sqlalchemy.orm import selectinload
 import calendar
 from dateutil.relativedelta import relativedelta
 from .forms import TransactionForm
-from .services import get_stock_price
+from .services import get_stored_prices, refresh_prices
 import codecs
 from azure.storage.blob import BlobServiceClient, ContentSettings
 from werkzeug.utils import secure_filename
@@ -47,14 +65,22 @@ import mimetypes
 import os
 from functools import wraps
 from flask import abort
-from .utils import process_tags, parse_date_range
-import re
+from .utils import process_tags, parse_date_range, period_range
 
 # ===================================================================
 # BLUEPRINT DEFINITION
 # ===================================================================
 main_bp = Blueprint("main", __name__)
 
+# Number of months shown per page of the /reports expense breakdown
+REPORT_MONTHS_PER_PAGE = 12
+TRANSACTIONS_PER_PAGE = 15
+EXPORT_BATCH_SIZE = 1000
+# Upper bound on the days a portfolio value trend may cover
+MAX_TREND_DAYS = 3660
+# Upper bound on the months a cash-flow forecast may cover
+MAX_FORECAST_MONTHS = 24
+
 
 # ===================================================================
 # HELPER FUNCTION
@@ -242,23 +268,10 @@ def dashboard():
     )
     current_budgets = db.session.execute(current_budgets_stmt).scalars().all()
 
-    expenses_by_category_stmt = (
-        select(transaction_categories.c.category_id, func.sum(Transaction.amount))
-        .join(Transaction, Transaction.id == transaction_categories.c.transaction_id)
-        .where(
-            Transaction.user_id == current_user.id,
-            Transaction.transaction_type == "expense",
-            func.extract("month", Transaction.transaction_date) == current_month,
-            func.extract("year", Transaction.transaction_date) == current_year,
-            Transaction.affects_balance == True,
-        )
-        .group_by(transaction_categories.c.category_id)
+    spending_by_category = rollups.category_spending(
+        current_user.id, current_year, current_month
     )
 
-    spending_by_category = {
-        row[0]: row[1] for row in db.session.execute(expenses_by_category_stmt).all()
-    }
-
     budget_progress_data = []
     for budget in current_budgets:
         total_spent = spending_by_category.get(budget.category_id, decimal.Decimal(0))
@@ -307,6 +320,10 @@ def dashboard():
 @login_required
 def transactions():
     page = request.args.get("page", 1, type=int)
+    # Cursor (keyset) paging is opt-in; a cursor token implies it
+    paging_mode = request.args.get("paging", "").strip()
+    if request.args.get("after") or request.args.get("before"):
+        paging_mode = "cursor"
     # Get all potential filters from the URL query parameters
     search_query = request.args.get("q", "").strip()
     trans_type = request.args.get("type", "").strip()
@@ -356,24 +373,38 @@ def transactions():
             start_date_str, end_date_str = None, None
 
     if search_query:
-        search_term = f"%{search_query}%"
-        stmt = (
-            stmt.join(Transaction.categories, isouter=True)
-            .join(Transaction.tags, isouter=True)
-            .filter(
-                or_(
-                    Transaction.description.ilike(search_term),
-                    Transaction.notes.ilike(search_term),
-                    Category.name.ilike(search_term),
-                    Tag.name.ilike(search_term),
-                )
-            )
-            .distinct()
-        )
+        stmt = search.apply_filter(stmt, current_user.id, search_query)
 
     # --- Finalize and Execute Query ---
-    stmt = stmt.order_by(Transaction.transaction_date.desc())
-    all_transactions = db.paginate(stmt, page=page, per_page=15, error_out=False)
+    # The filters without any paging arguments, for the cache key and page links
+    filter_params = {
+        key: value
+        for key, value in request.args.items()
+        if key not in ("page", "paging", "after", "before")
+    }
+    if paging_mode == "cursor":
+        # Keyset mode: seek on (transaction_date, id) instead of OFFSET, and
+        # take the total from the per-user cache rather than counting per page.
+        total = cache.get_or_compute(
+            "transactions_count",
+            lambda: db.session.scalar(
+                select(func.count()).select_from(stmt.subquery())
+            ),
+            params=filter_params,
+        )
+        all_transactions = keyset_paginate(
+            stmt,
+            Transaction,
+            after=decode_cursor(request.args.get("after")),
+            before=decode_cursor(request.args.get("before")),
+            per_page=TRANSACTIONS_PER_PAGE,
+            total=total,
+        )
+    else:
+        stmt = stmt.order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+        all_transactions = db.paginate(
+            stmt, page=page, per_page=TRANSACTIONS_PER_PAGE, error_out=False
+        )
 
     # --- NEW: Fetch accounts and categories for the filter dropdowns ---
     user_accounts = (
@@ -406,6 +437,8 @@ def transactions():
         selected_account_id=account_id,
         selected_category_id=category_id,
         # --- END NEW ---
+        paging_mode=paging_mode,
+        filter_params=filter_params,
     )
 
 
@@ -452,7 +485,10 @@ def add_transaction():
         process_tags(new_transaction, form.tags.data)
 
         db.session.add(new_transaction)
+        rollups.record(new_transaction)
+        search.index(new_transaction)
         log_activity(f"Added transaction: '{new_transaction.description}'")
+        bump_data_version(current_user.id)
         db.session.commit()
 
         flash("Transaction added successfully!", "success")
@@ -479,6 +515,7 @@ def edit_transaction(transaction_id):
     original_type = transaction.transaction_type
     original_affects_balance = transaction.affects_balance
     original_account = transaction.account
+    original_rollup = rollups.entries_for(transaction)
 
     form = TransactionForm(obj=transaction)
     # Your logic to populate form choices for account/category is correct
@@ -522,7 +559,13 @@ def edit_transaction(transaction_id):
         if form.category.data:
             transaction.categories.append(form.category.data)
 
+        # Move the transaction's contribution in the monthly rollups
+        rollups.apply(original_rollup, sign=-1)
+        rollups.record(transaction)
+        search.index(transaction)
+
         log_activity(f"Updated transaction: '{transaction.description}'")
+        bump_data_version(current_user.id)
         db.session.commit()
         flash("Transaction updated successfully!", "success")
         return redirect(url_for("main.transactions"))
@@ -562,7 +605,9 @@ def delete_transaction(transaction_id):
         else:
             account.balance += transaction.amount
 
+    rollups.unrecord(transaction)
     db.session.delete(transaction)
+    bump_data_version(current_user.id)
     db.session.commit()
     flash("Transaction deleted successfully!", "success")
     return redirect(url_for("main.transactions"))
@@ -639,9 +684,12 @@ def transfer():
             to_account.balance += amount
 
             db.session.add_all([expense_trans, income_trans])
+            rollups.record_many([expense_trans, income_trans])
+            search.index_many([expense_trans, income_trans])
             log_activity(
                 f"Transferred ₹{amount:.2f} from '{from_account.name}' to '{to_account.name}'."
             )
+            bump_data_version(current_user.id)
             db.session.commit()
 
             flash("Transfer completed successfully!", "success")
@@ -681,154 +729,27 @@ def import_transactions():
             csv_reader = csv.reader(stream)
             header = next(csv_reader)  # Skip header row
 
-            transactions_to_add, accounts_to_update, errors = [], {}, []
-            success_count = 0
-
-            user_accounts = {
-                (acc.name.lower(), acc.account_type.lower()): acc
-                for acc in db.session.execute(
-                    select(Account).filter_by(user_id=current_user.id)
-                ).scalars()
-            }
-            user_categories = {
-                cat.name.lower(): cat
-                for cat in db.session.execute(
-                    select(Category).filter_by(user_id=current_user.id)
-                ).scalars()
-            }
-            user_tags = {
-                tag.name.lower(): tag
-                for tag in db.session.execute(
-                    select(Tag).filter_by(user_id=current_user.id)
-                ).scalars()
-            }
+            errors = []
+            # Resolves the user's accounts, categories and tags once up front
+            importer = BulkImporter(current_user.id)
 
             for i, row in enumerate(csv_reader):
-                row_num = i + 2
-
-                # --- THIS IS THE CORRECTED UNPACKING AND PARSING LOGIC ---
                 try:
-                    # 1. Unpack the 10 columns from the CSV row
-                    (
-                        date_str,
-                        time_str,
-                        desc,
-                        amount_str,
-                        dr_cr_str,
-                        account_str,
-                        is_expense_str,
-                        cats_str,
-                        tags_str,
-                        notes,
-                    ) = row
-                except ValueError:
-                    errors.append(
-                        f"Row {row_num}: Invalid number of columns. Expected 10, got {len(row)}."
-                    )
-                    continue
-
-                dr_cr = dr_cr_str.strip().upper()
-                if dr_cr not in ["DR", "CR"]:
-                    errors.append(f"Row {row_num}: DR/CR column must be 'DR' or 'CR'.")
-                    continue
-
-                # 2. Parse Date, Time, and Amount
-                try:
-                    combined_datetime_str = f"{date_str.strip()} {time_str.strip()}"
-                    trans_date = datetime.strptime(
-                        combined_datetime_str, "%Y-%m-%d %I:%M %p"
-                    )
-                    amount = decimal.Decimal(amount_str)
-                except (ValueError, decimal.InvalidOperation):
-                    errors.append(
-                        f"Row {row_num}: Invalid date/time ('{date_str} {time_str}') or amount ('{amount_str}')."
-                    )
-                    continue
-
-                # 3. Derive internal values from CSV strings
-                trans_type = "expense" if dr_cr == "DR" else "income"
-                affects_balance = True  # Default to true
-                if trans_type == "expense" and is_expense_str.strip().lower() == "no":
-                    affects_balance = False
-
-                # 4. Parse the combined Account string using Regex
-                acc_name, acc_type = None, None
-                match = re.match(r"^(.*) \((.*)\)$", account_str.strip())
-                if match:
-                    acc_name, acc_type = match.groups()
-                else:
-                    errors.append(
-                        f"Row {row_num}: Could not parse account format '{account_str}'. Expected 'Name (Type)'."
-                    )
-                    continue
-                # --- END OF CORRECTED LOGIC ---
-
-                account = user_accounts.get((acc_name.lower(), acc_type.lower()))
-                if not account:
-                    errors.append(
-                        f"Row {row_num}: Account '{acc_name}' ({acc_type}) not found."
-                    )
-                    continue
-
-                # Prepare transaction
-                new_trans = Transaction(
-                    user_id=current_user.id,
-                    transaction_date=trans_date,
-                    description=desc.strip(),
-                    amount=amount,
-                    transaction_type=trans_type,
-                    affects_balance=affects_balance,
-                    account_id=account.id,
-                    notes=notes.strip(),
-                )
-
-                # Process Categories
-                if cats_str:
-                    cat_names = [
-                        name.strip() for name in cats_str.split(";") if name.strip()
-                    ]
-                    for cat_name in cat_names:
-                        category = user_categories.get(cat_name.lower())
-                        if not category:
-                            category = Category(name=cat_name, user_id=current_user.id)
-                            db.session.add(category)
-                            user_categories[cat_name.lower()] = category
-                        new_trans.categories.append(category)
-
-                # Process Tags
-                if tags_str:
-                    tag_names = [
-                        name.strip() for name in tags_str.split(";") if name.strip()
-                    ]
-                    for tag_name in tag_names:
-                        tag = user_tags.get(tag_name.lower())
-                        if not tag:
-                            tag = Tag(name=tag_name, user_id=current_user.id)
-                            db.session.add(tag)
-                            user_tags[tag_name.lower()] = tag
-                        new_trans.tags.append(tag)
-
-                transactions_to_add.append(new_trans)
-
-                # Update balance only if the flag is set
-                if affects_balance:
-                    balance_change = amount if trans_type == "income" else -amount
-                    if account.id not in accounts_to_update:
-                        accounts_to_update[account.id] = {
-                            "account": account,
-                            "change": decimal.Decimal(0),
-                        }
-                    accounts_to_update[account.id]["change"] += balance_change
-
-                success_count += 1
+                    importer.add_csv_row(row, row_num=i + 2)
+                except ImportRowError as e:
+                    errors.append(str(e))
 
             # Atomic Database Operation
-            if transactions_to_add:
-                db.session.add_all(transactions_to_add)
-                for data in accounts_to_update.values():
-                    data["account"].balance += data["change"]
+            if len(importer):
+                success_count = importer.flush()
+                bump_data_version(current_user.id)
                 db.session.commit()
                 flash(f"Successfully imported {success_count} transactions.", "success")
+                if importer.duplicates_skipped:
+                    flash(
+                        f"Skipped {importer.duplicates_skipped} rows that duplicate existing transactions.",
+                        "info",
+                    )
 
             if errors:
                 flash("Some rows were skipped due to errors:", "warning")
@@ -845,6 +766,49 @@ def import_transactions():
     return render_template("import.html")
 
 
+@main_bp.route("/api/import/jobs", methods=["POST"])
+@login_required
+def start_import_job():
+    """
+    Starts a background import of a large CSV file. The file is spooled to
+    disk and imported in committed chunks; poll the returned status URL for
+    progress.
+    """
+    if (
+        "transaction_file" not in request.files
+        or not request.files["transaction_file"].filename
+    ):
+        return jsonify({"error": "No file selected."}), 400
+
+    file = request.files["transaction_file"]
+    if not file.filename.endswith(".csv"):
+        return jsonify({"error": "Invalid file type. Please upload a .csv file."}), 400
+
+    job = import_jobs.create_job(current_user.id, file)
+    import_jobs.start_job(job.id)
+    return (
+        jsonify(
+            {
+                "job_id": job.id,
+                "status_url": url_for("main.import_job_status", job_id=job.id),
+            }
+        ),
+        202,
+    )
+
+
+@main_bp.route("/api/import/status/<job_id>")
+@login_required
+def import_job_status(job_id):
+    """Reports the progress of one of the user's background import jobs."""
+    job = db.session.get(ImportJob, job_id)
+    if not job or job.user_id != current_user.id:
+        abort(404)
+    if import_jobs.fail_if_stale(job):
+        db.session.refresh(job)
+    return jsonify(import_jobs.job_status(job))
+
+
 @main_bp.route("/api/import/validate", methods=["POST"])
 @login_required
 def validate_import_file():
@@ -866,17 +830,19 @@ def validate_import_file():
     validation_report = {
         "valid_rows": [],
         "invalid_rows": [],
-        "summary": {"total_rows": 0, "valid_count": 0, "invalid_count": 0},
+        "duplicate_rows": [],
+        "summary": {
+            "total_rows": 0,
+            "valid_count": 0,
+            "invalid_count": 0,
+            "duplicate_count": 0,
+        },
+        "staging_token": None,
     }
 
     try:
         # Pre-fetch user's accounts for efficient lookups
-        user_accounts = {
-            (acc.name.lower(), acc.account_type.lower()): acc
-            for acc in db.session.execute(
-                select(Account).filter_by(user_id=current_user.id)
-            ).scalars()
-        }
+        account_ids = account_id_map(current_user.id)
 
         stream = codecs.iterdecode(file.stream, "utf-8")
         csv_reader = csv.reader(stream)
@@ -886,74 +852,42 @@ def validate_import_file():
         except StopIteration:
             return jsonify({"error": "CSV file is empty or missing a header."}), 400
 
+        parsed_rows = []
         for i, row in enumerate(csv_reader):
             row_num = i + 2
-            errors = []
             validation_report["summary"]["total_rows"] += 1
             if not any(field.strip() for field in row):
                 continue
 
-            # 1. Check for the correct 10-column format
-            if len(row) != 10:
-                errors.append(f"Invalid column count. Expected 10, got {len(row)}.")
+            try:
+                parsed_rows.append(parse_row(row, row_num, account_ids))
+            except ImportRowError as e:
                 validation_report["invalid_rows"].append(
-                    {"row_number": row_num, "data": row, "errors": errors}
+                    {"row_number": row_num, "data": row, "errors": e.errors}
                 )
                 validation_report["summary"]["invalid_count"] += 1
                 continue
 
-            (
-                date_str,
-                time_str,
-                desc,
-                amount_str,
-                dr_cr_str,
-                account_str,
-                is_expense_str,
-                cats_str,
-                tags_str,
-                notes,
-            ) = row
-            dr_cr = dr_cr_str.strip().upper()
-            # 2. Validate date, time, and amount
-            try:
-                datetime.strptime(
-                    f"{date_str.strip()} {time_str.strip()}", "%Y-%m-%d %I:%M %p"
-                )
-                decimal.Decimal(amount_str)
-            except (ValueError, decimal.InvalidOperation):
-                errors.append(
-                    f"Invalid date/time ('{date_str} {time_str}') or amount ('{amount_str}')."
-                )
+            validation_report["valid_rows"].append({"row_number": row_num, "data": row})
+            validation_report["summary"]["valid_count"] += 1
 
-            # 3. Validate DR/CR column
-            is_expense_val = is_expense_str.strip().lower()
-            if dr_cr == "DR" and is_expense_val not in ["yes", "no", ""]:
-                errors.append(f"'Is Expense?' must be 'Yes', 'No', or empty.")
-
-            # 4. Validate that the account can be parsed and exists
-            acc_name, acc_type = None, None
-            match = re.match(r"^(.*) \((.*)\)$", account_str.strip())
-            if match:
-                acc_name, acc_type = match.groups()
-                if not user_accounts.get((acc_name.lower(), acc_type.lower())):
-                    errors.append(f"Account '{acc_name}' ({acc_type}) not found.")
-            else:
-                errors.append(
-                    f"Could not parse account format '{account_str}'. Expected 'Name (Type)'."
-                )
-
-            # Finalize row validation
-            if errors:
-                validation_report["invalid_rows"].append(
-                    {"row_number": row_num, "data": row, "errors": errors}
-                )
-                validation_report["summary"]["invalid_count"] += 1
-            else:
-                validation_report["valid_rows"].append(
-                    {"row_number": row_num, "data": row}
-                )
-                validation_report["summary"]["valid_count"] += 1
+        # Valid rows that match stored transactions are reported, and skipped
+        # on commit unless the client asks to include them
+        duplicate_row_nums = duplicates.find_duplicate_rows(
+            current_user.id, parsed_rows
+        )
+        validation_report["duplicate_rows"] = [
+            row
+            for row in validation_report["valid_rows"]
+            if row["row_number"] in duplicate_row_nums
+        ]
+        validation_report["summary"]["duplicate_count"] = len(duplicate_row_nums)
+
+        # Keep the parsed rows server-side so the commit can reuse them
+        if parsed_rows:
+            validation_report["staging_token"] = import_jobs.stage_rows(
+                current_user.id, file.filename, parsed_rows
+            )
 
         return jsonify(validation_report)
 
@@ -969,128 +903,77 @@ def validate_import_file():
 @login_required
 def commit_import_data():
     """
-    Receives a finalized JSON payload of transaction data, creates the
-    transaction records, and commits them to the database.
+    Imports the rows staged by validate_import_file, identified by their
+    staging tokens. Clients that post the validated rows themselves under
+    "transactions" are still supported; those rows are parsed again.
+    Duplicates of existing transactions are skipped unless
+    "include_duplicates" is true.
     """
-    final_data = request.get_json()
-    if not final_data or "transactions" not in final_data:
+    final_data = request.get_json(silent=True)
+    if not final_data:
         return jsonify({"error": "Invalid or missing JSON payload."}), 400
 
-    transactions_to_import = final_data["transactions"]
+    tokens = list(final_data.get("staging_tokens") or [])
+    if final_data.get("staging_token"):
+        tokens.append(final_data["staging_token"])
+    if not tokens and "transactions" not in final_data:
+        return jsonify({"error": "Invalid or missing JSON payload."}), 400
 
     try:
-        # This logic is very similar to your original import function
-        transactions_to_add, accounts_to_update = [], {}
-        user_accounts = {
-            (acc.name.lower(), acc.account_type.lower()): acc
-            for acc in db.session.execute(
-                select(Account).filter_by(user_id=current_user.id)
-            ).scalars()
-        }
-        user_categories = {
-            cat.name.lower(): cat
-            for cat in db.session.execute(
-                select(Category).filter_by(user_id=current_user.id)
-            ).scalars()
-        }
-        user_tags = {
-            tag.name.lower(): tag
-            for tag in db.session.execute(
-                select(Tag).filter_by(user_id=current_user.id)
-            ).scalars()
-        }
-
-        for row_data in transactions_to_import:
-            # Unpack the row data
-            (
-                date_str,
-                time_str,
-                desc,
-                amount_str,
-                dr_cr_str,
-                account_str,
-                is_expense_str,
-                cats_str,
-                tags_str,
-                notes,
-            ) = row_data
-
-            # This block assumes data is already validated, but we perform light parsing
-            trans_date = datetime.strptime(
-                f"{date_str} {time_str}", "%Y-%m-%d %I:%M %p"
-            )
-            amount = decimal.Decimal(amount_str)
-            trans_type = "expense" if dr_cr_str.upper() == "DR" else "income"
-            affects_balance = (
-                False
-                if trans_type == "expense" and is_expense_str.lower() == "no"
-                else True
-            )
-
-            # Parse account
-            acc_name, acc_type = None, None
-            match = re.match(r"^(.*) \((.*)\)$", account_str.strip())
-            if match:
-                acc_name, acc_type = match.groups()
-
-            account = user_accounts.get((acc_name.lower(), acc_type.lower()))
-            if not account:
-                continue  # Skip if account not found (should not happen with validated data)
-
-            # Create the transaction object
-            new_trans = Transaction(
-                user_id=current_user.id,
-                transaction_date=trans_date,
-                description=desc,
-                amount=amount,
-                transaction_type=trans_type,
-                affects_balance=affects_balance,
-                account_id=account.id,
-                notes=notes,
-            )
-
-            # Process Categories and Tags
-            if cats_str:
-                for cat_name in [c.strip() for c in cats_str.split(";") if c.strip()]:
-                    category = user_categories.get(cat_name.lower())
-                    if not category:
-                        category = Category(name=cat_name, user_id=current_user.id)
-                        db.session.add(category)
-                        user_categories[cat_name.lower()] = category
-                    new_trans.categories.append(category)
-
-            if tags_str:
-                for tag_name in [t.strip() for t in tags_str.split(";") if t.strip()]:
-                    tag = user_tags.get(tag_name.lower())
-                    if not tag:
-                        tag = Tag(name=tag_name, user_id=current_user.id)
-                        db.session.add(tag)
-                        user_tags[tag_name.lower()] = tag
-                    new_trans.tags.append(tag)
-
-            transactions_to_add.append(new_trans)
-
-            # Tally balance changes
-            if affects_balance:
-                balance_change = amount if trans_type == "income" else -amount
-                if account.id not in accounts_to_update:
-                    accounts_to_update[account.id] = {
-                        "account": account,
-                        "change": decimal.Decimal(0),
-                    }
-                accounts_to_update[account.id]["change"] += balance_change
+        importer = BulkImporter(
+            current_user.id,
+            skip_duplicates=not final_data.get("include_duplicates", False),
+        )
+        valid_account_ids = set(importer.account_ids.values())
+
+        staged_jobs, imported_count = [], 0
+        for token in tokens:
+            claimed = import_jobs.claim_staged_rows(current_user.id, token)
+            if claimed is None:
+                db.session.rollback()
+                # An expired token's rows can never be committed, so drop them
+                import_jobs.purge_expired_staged_jobs(current_user.id)
+                db.session.commit()
+                return (
+                    jsonify(
+                        {
+                            "error": "This import has expired or was already saved. Please validate the file again."
+                        }
+                    ),
+                    409,
+                )
+            job, parsed_rows = claimed
+            for parsed in parsed_rows:
+                # Skip rows whose account was deleted since validation
+                if parsed.account_id in valid_account_ids:
+                    importer.add_parsed(parsed)
+            # Flush per staged file so each job records what it really inserted
+            skipped_before = importer.duplicates_skipped
+            job.rows_imported = importer.flush()
+            job.duplicate_count = importer.duplicates_skipped - skipped_before
+            imported_count += job.rows_imported
+            staged_jobs.append(job)
+
+        for i, row_data in enumerate(final_data.get("transactions") or []):
+            try:
+                importer.add_csv_row(row_data, row_num=i + 1)
+            except ImportRowError:
+                continue  # Validated data should not get here
 
         # Final atomic commit
-        if transactions_to_add:
-            db.session.add_all(transactions_to_add)
-            for data in accounts_to_update.values():
-                data["account"].balance += data["change"]
-            db.session.commit()
+        imported_count += importer.flush()
+        for job in staged_jobs:
+            job.status = "completed"
+            job.finished_at = datetime.now(timezone.utc)
+        if imported_count:
+            bump_data_version(current_user.id)
+        db.session.commit()
 
         return (
             jsonify(
                 {
-                    "message": f"Successfully imported {len(transactions_to_import)} transactions."
+                    "message": f"Successfully imported {imported_count} transactions.",
+                    "duplicates_skipped": importer.duplicates_skipped,
                 }
             ),
             200,
@@ -1160,6 +1043,7 @@ def add_account():
         )
         db.session.add(new_account)
         log_activity(f"Created new account: '{new_account.name}'")
+        bump_data_version(current_user.id)
         db.session.commit()
         flash("Account created successfully!", "success")
         return redirect(url_for("main.accounts"))
@@ -1179,6 +1063,7 @@ def edit_account(account_id):
     if request.method == "POST":
         account.name = request.form.get("name")
         account.account_type = request.form.get("account_type")
+        bump_data_version(current_user.id)
         db.session.commit()
         flash("Account updated successfully!", "success")
         return redirect(url_for("main.accounts"))
@@ -1200,6 +1085,7 @@ def delete_account(account_id):
         return redirect(url_for("main.accounts"))
 
     db.session.delete(account)
+    bump_data_version(current_user.id)
     db.session.commit()
     flash("Account deleted successfully!", "success")
     return redirect(url_for("main.accounts"))
@@ -1237,6 +1123,7 @@ def budgets():
                 year=int(year),
             )
             db.session.add(new_budget)
+            bump_data_version(current_user.id)
             db.session.commit()
             flash("Budget created successfully!", "success")
 
@@ -1288,6 +1175,7 @@ def edit_budget(budget_id):
         # but for simplicity, we'll focus on updating the amount.
         if new_amount:
             budget.amount = decimal.Decimal(new_amount)
+            bump_data_version(current_user.id)
             db.session.commit()
             flash("Budget updated successfully!", "success")
             return redirect(url_for("main.budgets"))
@@ -1318,6 +1206,7 @@ def delete_budget(budget_id):
         abort(403)
 
     db.session.delete(budget)
+    bump_data_version(current_user.id)
     db.session.commit()
     flash("Budget deleted successfully!", "success")
     return redirect(url_for("main.budgets"))
@@ -1342,6 +1231,7 @@ def manage_categories():
             if not existing_category:
                 new_category = Category(name=name, user_id=current_user.id)
                 db.session.add(new_category)
+                bump_data_version(current_user.id)
                 db.session.commit()
                 flash("Category added successfully!", "success")
             else:
@@ -1613,78 +1503,43 @@ def portfolio():
     Renders the main investment portfolio page, showing a summary of
     current holdings with live market values and a history of all transactions.
     """
-    holdings_query = (
-        db.session.query(
-            Asset.ticker_symbol,
-            func.sum(
-                case(
-                    (
-                        InvestmentTransaction.transaction_type == "buy",
-                        InvestmentTransaction.quantity,
-                    ),
-                    (
-                        InvestmentTransaction.transaction_type == "sell",
-                        -InvestmentTransaction.quantity,
-                    ),
-                    else_=0,
-                )
-            ).label("total_quantity"),
-            func.sum(
-                case(
-                    (
-                        InvestmentTransaction.transaction_type == "buy",
-                        InvestmentTransaction.quantity
-                        * InvestmentTransaction.price_per_unit,
-                    ),
-                    else_=0,
-                )
-            ).label("total_cost"),
-        )
-        .join(Asset, InvestmentTransaction.asset_id == Asset.id)
-        .filter(InvestmentTransaction.user_id == current_user.id)
-        .group_by(Asset.ticker_symbol)
-        .all()
-    )
+    # Positions are maintained in the holding table by the investment routes
+    positions = holdings.open_positions(current_user.id)
 
     holdings_data = []
     # --- FIX: Use decimal.Decimal ---
     grand_total_cost = decimal.Decimal("0.0")
     grand_total_market_value = decimal.Decimal("0.0")
 
-    from . import services
-
-    if hasattr(services, "price_cache"):
-        services.price_cache.clear()
-
-    for holding in holdings_query:
-        if holding.total_quantity > 0:
-            ticker = holding.ticker_symbol
+    # Quotes are refreshed by the scheduled price task; pages only read them
+    prices = get_stored_prices(
+        holding.asset.ticker_symbol for holding in positions if holding.quantity > 0
+    )
 
-            # --- FIX: Use decimal.Decimal ---
-            total_cost = holding.total_cost or decimal.Decimal("0.0")
-            average_cost_per_share = (
-                (total_cost / holding.total_quantity)
-                if holding.total_quantity > 0
-                else decimal.Decimal("0.0")
-            )
+    for holding in positions:
+        if holding.quantity > 0:
+            ticker = holding.asset.ticker_symbol
+            total_cost = holding.cost_basis
+            average_cost_per_share = total_cost / holding.quantity
 
-            current_price_float = get_stock_price(ticker)
+            current_price_float = prices[ticker]
 
             market_value = None
             if current_price_float is not None:
                 # --- FIX: Use decimal.Decimal ---
                 current_price_decimal = decimal.Decimal(str(current_price_float))
-                market_value = holding.total_quantity * current_price_decimal
+                market_value = holding.quantity * current_price_decimal
                 grand_total_market_value += market_value
 
             holdings_data.append(
                 {
                     "ticker": ticker,
-                    "quantity": holding.total_quantity,
+                    "quantity": holding.quantity,
                     "total_cost": total_cost,
                     "average_cost": average_cost_per_share,
                     "current_price": current_price_float,
                     "market_value": market_value,
+                    "realized_pnl": holding.realized_pnl,
                 }
             )
             grand_total_cost += total_cost
@@ -1736,12 +1591,13 @@ def calendar_view():
     month_calendar = cal.monthdayscalendar(year, month)
 
     # 2. Get a set of all days in this month that have transactions
+    month_start, month_end = period_range(year, month)
     stmt = (
         select(func.extract("day", Transaction.transaction_date))
         .where(
             Transaction.user_id == current_user.id,
-            func.extract("month", Transaction.transaction_date) == month,
-            func.extract("year", Transaction.transaction_date) == year,
+            Transaction.transaction_date >= month_start,
+            Transaction.transaction_date < month_end,
             Transaction.affects_balance == True,
         )
         .distinct()
@@ -1782,35 +1638,76 @@ def calendar_view():
 @main_bp.route("/reports")
 @login_required
 def reports():
-    stmt = (
-        select(Transaction)
-        .filter_by(user_id=current_user.id, transaction_type="expense")
-        .order_by(Transaction.transaction_date.desc())
-    )
-    expenses = db.session.execute(stmt).scalars().all()
-
-    monthly_summary_raw = defaultdict(lambda: defaultdict(float))
-    for expense in expenses:
-        month_key = expense.transaction_date.strftime("%Y-%m")
-        if not expense.categories:
-            monthly_summary_raw[month_key]["Uncategorized"] += float(expense.amount)
-        else:
-            for category in expense.categories:
-                monthly_summary_raw[month_key][category.name] += float(expense.amount)
-
-    monthly_summary_final = {}
-    for month_key in sorted(monthly_summary_raw.keys(), reverse=True):
-        month_name = datetime.strptime(month_key, "%Y-%m").strftime("%B %Y")
-        sorted_categories = sorted(
-            monthly_summary_raw[month_key].items(),
-            key=lambda item: item[1],
-            reverse=True,
+    page = max(request.args.get("page", 1, type=int), 1)
+    rollup_filter = (
+        MonthlyRollup.user_id == current_user.id,
+        MonthlyRollup.transaction_type == "expense",
+    )
+
+    def build_summary():
+        # 1. Find the month buckets for this page. We fetch one extra bucket
+        #    so we know whether an older page exists.
+        months_stmt = (
+            select(MonthlyRollup.year, MonthlyRollup.month)
+            .where(*rollup_filter)
+            .group_by(MonthlyRollup.year, MonthlyRollup.month)
+            .order_by(MonthlyRollup.year.desc(), MonthlyRollup.month.desc())
+            .limit(REPORT_MONTHS_PER_PAGE + 1)
+            .offset((page - 1) * REPORT_MONTHS_PER_PAGE)
         )
-        monthly_summary_final[month_name] = sorted_categories
+        month_buckets = db.session.execute(months_stmt).all()
+        has_older = len(month_buckets) > REPORT_MONTHS_PER_PAGE
+        month_buckets = [
+            tuple(bucket) for bucket in month_buckets[:REPORT_MONTHS_PER_PAGE]
+        ]
+
+        # 2. Sum the rolled-up spending per (month, category) for just those months.
+        #    Rollup rows without a category form the "Uncategorized" bucket.
+        monthly_summary_final = {}
+        if month_buckets:
+            oldest_year, oldest_month = month_buckets[-1]
+            newest_year, newest_month = month_buckets[0]
+            month_index = MonthlyRollup.year * 12 + MonthlyRollup.month
+            category_name = func.coalesce(Category.name, "Uncategorized")
+            summary_stmt = (
+                select(
+                    MonthlyRollup.year,
+                    MonthlyRollup.month,
+                    category_name,
+                    func.sum(MonthlyRollup.amount),
+                )
+                .outerjoin(Category, Category.id == MonthlyRollup.category_id)
+                .where(
+                    *rollup_filter,
+                    month_index >= oldest_year * 12 + oldest_month,
+                    month_index <= newest_year * 12 + newest_month,
+                )
+                .group_by(MonthlyRollup.year, MonthlyRollup.month, category_name)
+            )
+
+            summary_by_month = defaultdict(list)
+            for year, month, name, total in db.session.execute(summary_stmt):
+                summary_by_month[(year, month)].append((name, total))
+
+            for year, month in month_buckets:
+                month_name = datetime(year, month, 1).strftime("%B %Y")
+                monthly_summary_final[month_name] = sorted(
+                    summary_by_month[(year, month)],
+                    key=lambda item: item[1],
+                    reverse=True,
+                )
+
+        return monthly_summary_final, has_older
+
+    monthly_summary_final, has_older = cache.get_or_compute(
+        "reports", build_summary, params={"page": page}
+    )
 
     return render_template(
         "reports.html",
         monthly_summary=monthly_summary_final,
+        page=page,
+        has_older=has_older,
         now=datetime.now(timezone.utc),  # FIXED: Use timezone-aware datetime
     )
 
@@ -1822,51 +1719,56 @@ def yearly_report(year):
     Generates and displays a year-at-a-glance report showing total income,
     expenses, and net balance for each month.
     """
-    # 1. The SQLAlchemy query to get monthly totals grouped by transaction type
-    stmt = (
-        select(
-            func.extract("month", Transaction.transaction_date).label("month"),
-            Transaction.transaction_type,
-            func.sum(Transaction.amount).label("total_amount"),
-        )
-        .where(
-            Transaction.user_id == current_user.id,
-            func.extract("year", Transaction.transaction_date) == year,
-            Transaction.affects_balance == True,
-        )
-        .group_by(
-            func.extract("month", Transaction.transaction_date),
-            Transaction.transaction_type,
+
+    def build_report():
+        # 1. Read the monthly totals per transaction type from the rollups
+        stmt = (
+            select(
+                MonthlyRollup.month,
+                MonthlyRollup.transaction_type,
+                func.sum(MonthlyRollup.distinct_amount).label("total_amount"),
+            )
+            .where(
+                MonthlyRollup.user_id == current_user.id,
+                MonthlyRollup.year == year,
+                MonthlyRollup.affects_balance == true(),
+            )
+            .group_by(MonthlyRollup.month, MonthlyRollup.transaction_type)
         )
-    )
 
-    query_results = db.session.execute(stmt).all()
+        query_results = db.session.execute(stmt).all()
 
-    # 2. Process the query results into a structured dictionary
-    # Initialize data for all 12 months to ensure every month is displayed
-    report_data = {
-        month_num: {
-            "month_name": calendar.month_name[month_num],
-            "income": decimal.Decimal(0),
-            "expense": decimal.Decimal(0),
-            "net": decimal.Decimal(0),
+        # 2. Process the query results into a structured dictionary
+        # Initialize data for all 12 months to ensure every month is displayed
+        report_data = {
+            month_num: {
+                "month_name": calendar.month_name[month_num],
+                "income": decimal.Decimal(0),
+                "expense": decimal.Decimal(0),
+                "net": decimal.Decimal(0),
+            }
+            for month_num in range(1, 13)
         }
-        for month_num in range(1, 13)
-    }
 
-    for month_num, trans_type, total_amount in query_results:
-        if trans_type == "income":
-            report_data[month_num]["income"] = total_amount
-        else:  # 'expense'
-            report_data[month_num]["expense"] = total_amount
-
-    # 3. Calculate the net balance for each month and grand totals
-    grand_total = {"income": 0, "expense": 0, "net": 0}
-    for month_data in report_data.values():
-        month_data["net"] = month_data["income"] - month_data["expense"]
-        grand_total["income"] += month_data["income"]
-        grand_total["expense"] += month_data["expense"]
-    grand_total["net"] = grand_total["income"] - grand_total["expense"]
+        for month_num, trans_type, total_amount in query_results:
+            if trans_type == "income":
+                report_data[month_num]["income"] = total_amount
+            else:  # 'expense'
+                report_data[month_num]["expense"] = total_amount
+
+        # 3. Calculate the net balance for each month and grand totals
+        grand_total = {"income": 0, "expense": 0, "net": 0}
+        for month_data in report_data.values():
+            month_data["net"] = month_data["income"] - month_data["expense"]
+            grand_total["income"] += month_data["income"]
+            grand_total["expense"] += month_data["expense"]
+        grand_total["net"] = grand_total["income"] - grand_total["expense"]
+
+        return report_data, grand_total
+
+    report_data, grand_total = cache.get_or_compute(
+        "yearly_report", build_report, params={"year": year}
+    )
 
     return render_template(
         "yearly_report.html",
@@ -1887,45 +1789,43 @@ def budget_report():
     selected_year = request.args.get("year", default=now_utc.year, type=int)
     selected_month = request.args.get("month", default=now_utc.month, type=int)
 
-    # --- Data Fetching and Processing ---
-    # 1. Get all budgets for the selected period
-    budgets_stmt = select(Budget).filter_by(
-        user_id=current_user.id, month=selected_month, year=selected_year
-    )
-    budgets_for_period = db.session.execute(budgets_stmt).scalars().all()
+    def build_report():
+        # --- Data Fetching and Processing ---
+        # 1. Get all budgets for the selected period
+        budgets_stmt = select(Budget).filter_by(
+            user_id=current_user.id, month=selected_month, year=selected_year
+        )
+        budgets_for_period = db.session.execute(budgets_stmt).scalars().all()
 
-    # 2. Get all categorized expenses for the selected period in one query
-    expenses_stmt = (
-        select(transaction_categories.c.category_id, func.sum(Transaction.amount))
-        .join(Transaction, Transaction.id == transaction_categories.c.transaction_id)
-        .where(
-            Transaction.user_id == current_user.id,
-            Transaction.transaction_type == "expense",
-            func.extract("month", Transaction.transaction_date) == selected_month,
-            func.extract("year", Transaction.transaction_date) == selected_year,
-            Transaction.affects_balance == True,
+        # 2. Get the categorized expenses for the selected period from the rollups
+        spending_by_category = rollups.category_spending(
+            current_user.id, selected_year, selected_month
         )
-        .group_by(transaction_categories.c.category_id)
-    )
 
-    spending_by_category = {
-        row[0]: row[1] for row in db.session.execute(expenses_stmt).all()
-    }
+        # 3. Process the data for the template
+        report_data = []
+        for budget in budgets_for_period:
+            actual_spent = spending_by_category.get(
+                budget.category_id, decimal.Decimal(0)
+            )
+            difference = budget.amount - actual_spent
 
-    # 3. Process the data for the template
-    report_data = []
-    for budget in budgets_for_period:
-        actual_spent = spending_by_category.get(budget.category_id, decimal.Decimal(0))
-        difference = budget.amount - actual_spent
+            report_data.append(
+                {
+                    "category_name": budget.category.name,
+                    "budgeted_amount": budget.amount,
+                    "actual_spent": actual_spent,
+                    "difference": difference,
+                }
+            )
 
-        report_data.append(
-            {
-                "category_name": budget.category.name,
-                "budgeted_amount": budget.amount,
-                "actual_spent": actual_spent,
-                "difference": difference,
-            }
-        )
+        return report_data
+
+    report_data = cache.get_or_compute(
+        "budget_report",
+        build_report,
+        params={"year": selected_year, "month": selected_month},
+    )
 
     # Data for the dropdown selectors
     years = range(now_utc.year + 1, now_utc.year - 5, -1)
@@ -1965,58 +1865,48 @@ def net_worth_report():
         .all()
     )
 
-    # --- 2. Calculate Total Investment Value (adapted from portfolio route) ---
-    holdings_query = (
-        db.session.query(
-            Asset.ticker_symbol,
-            Asset.name,
-            func.sum(
-                case(
-                    (
-                        InvestmentTransaction.transaction_type == "buy",
-                        InvestmentTransaction.quantity,
-                    ),
-                    (
-                        InvestmentTransaction.transaction_type == "sell",
-                        -InvestmentTransaction.quantity,
-                    ),
-                    else_=0,
-                )
-            ).label("total_quantity"),
-        )
-        .join(Asset, InvestmentTransaction.asset_id == Asset.id)
-        .filter(InvestmentTransaction.user_id == current_user.id)
-        .group_by(Asset.ticker_symbol, Asset.name)
-        .all()
-    )
+    # The valuation is cached alongside the reports. Quotes are refreshed
+    # outside the user's own writes, so the entry is also keyed on the time
+    # of the newest stored quote: a price refresh starts a new entry.
+    prices_as_of = db.session.execute(select(func.max(AssetPrice.fetched_at))).scalar()
 
-    investment_details = []
-    total_investment_value = decimal.Decimal("0.0")
+    def build_investments():
+        # --- 2. Calculate Total Investment Value (adapted from portfolio route) ---
+        positions = holdings.open_positions(current_user.id)
 
-    # Clear the API price cache for a fresh fetch
-    from . import services
+        investment_details = []
+        total_investment_value = decimal.Decimal("0.0")
 
-    if hasattr(services, "price_cache"):
-        services.price_cache.clear()
+        prices = get_stored_prices(
+            holding.asset.ticker_symbol for holding in positions if holding.quantity > 0
+        )
 
-    for holding in holdings_query:
-        if holding.total_quantity > 0:
-            current_price_float = get_stock_price(holding.ticker_symbol)
-            market_value = decimal.Decimal("0.0")
+        for holding in positions:
+            if holding.quantity > 0:
+                current_price_float = prices[holding.asset.ticker_symbol]
+                market_value = decimal.Decimal("0.0")
+
+                if current_price_float is not None:
+                    current_price_decimal = decimal.Decimal(str(current_price_float))
+                    market_value = holding.quantity * current_price_decimal
+                    total_investment_value += market_value
+
+                investment_details.append(
+                    {
+                        "ticker": holding.asset.ticker_symbol,
+                        "name": holding.asset.name,
+                        "quantity": holding.quantity,
+                        "market_value": market_value,
+                    }
+                )
 
-            if current_price_float is not None:
-                current_price_decimal = decimal.Decimal(str(current_price_float))
-                market_value = holding.total_quantity * current_price_decimal
-                total_investment_value += market_value
+        return investment_details, total_investment_value
 
-            investment_details.append(
-                {
-                    "ticker": holding.ticker_symbol,
-                    "name": holding.name,
-                    "quantity": holding.total_quantity,
-                    "market_value": market_value,
-                }
-            )
+    investment_details, total_investment_value = cache.get_or_compute(
+        "net_worth_investments",
+        build_investments,
+        params={"prices_as_of": prices_as_of.isoformat() if prices_as_of else ""},
+    )
 
     # --- 3. Calculate Final Net Worth ---
     total_net_worth = total_cash + total_investment_value
@@ -2068,6 +1958,7 @@ def category_trend_report():
 
 @main_bp.route("/api/monthly_spending")
 @login_required
+@cache.cached_json()
 def monthly_spending_api():
     """
     API endpoint that returns the total monthly spending for a given
@@ -2079,27 +1970,21 @@ def monthly_spending_api():
     if not category_id or not year:
         return jsonify({"error": "A category_id and year are required."}), 400
 
-    # --- THIS IS THE CORRECTED QUERY ---
     spending_data = (
         db.session.query(
-            func.extract("month", Transaction.transaction_date).label("month"),
-            func.sum(Transaction.amount).label("total"),
+            MonthlyRollup.month,
+            func.sum(MonthlyRollup.amount).label("total"),
         )
-        .join(transaction_categories)
         .filter(
-            Transaction.user_id == current_user.id,
-            Transaction.transaction_type == "expense",
-            Transaction.affects_balance == True,
-            transaction_categories.c.category_id == category_id,
-            func.extract("year", Transaction.transaction_date) == year,
-        )
-        .group_by(
-            # The fix is here: We group by the function call itself, not the alias 'month'.
-            func.extract("month", Transaction.transaction_date)
+            MonthlyRollup.user_id == current_user.id,
+            MonthlyRollup.year == year,
+            MonthlyRollup.category_id == category_id,
+            MonthlyRollup.transaction_type == "expense",
+            MonthlyRollup.affects_balance == true(),
         )
+        .group_by(MonthlyRollup.month)
         .all()
     )
-    # --- END OF CORRECTED QUERY ---
 
     # Initialize a list of 12 zeros, one for each month
     monthly_totals = [0] * 12
@@ -2162,20 +2047,7 @@ def export_transactions():
         if category_id:
             stmt = stmt.where(Transaction.categories.any(id=category_id))
         if search_query:
-            search_term = f"%{search_query}%"
-            stmt = (
-                stmt.join(Transaction.categories, isouter=True)
-                .join(Transaction.tags, isouter=True)
-                .filter(
-                    or_(
-                        Transaction.description.ilike(search_term),
-                        Transaction.notes.ilike(search_term),
-                        Category.name.ilike(search_term),
-                        Tag.name.ilike(search_term),
-                    )
-                )
-                .distinct()
-            )
+            stmt = search.apply_filter(stmt, current_user.id, search_query)
         if start_date_str and end_date_str:
             start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
             end_date_inclusive = datetime.combine(
@@ -2186,54 +2058,83 @@ def export_transactions():
             )
         # --- END OF FIX ---
 
-        # Execute the (now filtered) query to get all matching results
-        stmt = stmt.order_by(Transaction.transaction_date.desc())
-        transactions_to_export = db.session.execute(stmt).scalars().all()
-
-        # Generate the CSV file in memory
-        string_io = io.StringIO()
-        csv_writer = csv.writer(string_io)
-        csv_writer.writerow(
-            [
-                "Date",
-                "Time",
-                "Description",
-                "Amount",
-                "DR/CR",
-                "Account",
-                "Is Expense?",
-                "Categories",
-                "Tags",
-                "Notes",
-            ]
-        )
+        # Stream the (now filtered) results one keyset page at a time, newest
+        # first; each page is read in full (with its accounts/categories/tags)
+        # before it is written, so no result stays open between batches
 
-        for t in transactions_to_export:
-            category_names = ";".join(sorted([c.name for c in t.categories]))
-            tag_names = ";".join(sorted([tag.name for tag in t.tags]))
-            dr_cr = "DR" if t.transaction_type == "expense" else "CR"
-            is_expense = ""
-            if t.transaction_type == "expense":
-                is_expense = "Yes" if t.affects_balance else "No"
+        def generate_csv():
+            buffer = io.StringIO()
+            csv_writer = csv.writer(buffer)
             csv_writer.writerow(
                 [
-                    t.transaction_date.strftime("%Y-%m-%d"),
-                    t.transaction_date.strftime("%I:%M %p"),
-                    t.description,
-                    t.amount,
-                    dr_cr,
-                    f"{t.account.name} ({t.account.account_type})" if t.account else "",
-                    is_expense,
-                    category_names,
-                    tag_names,
-                    t.notes or "",
+                    "Date",
+                    "Time",
+                    "Description",
+                    "Amount",
+                    "DR/CR",
+                    "Account",
+                    "Is Expense?",
+                    "Categories",
+                    "Tags",
+                    "Notes",
                 ]
             )
 
-        output = string_io.getvalue()
+            try:
+                cursor = None
+                while True:
+                    page = keyset_paginate(
+                        stmt, Transaction, after=cursor, per_page=EXPORT_BATCH_SIZE
+                    )
+                    for t in page.items:
+                        category_names = ";".join(
+                            sorted([c.name for c in t.categories])
+                        )
+                        tag_names = ";".join(sorted([tag.name for tag in t.tags]))
+                        dr_cr = "DR" if t.transaction_type == "expense" else "CR"
+                        is_expense = ""
+                        if t.transaction_type == "expense":
+                            is_expense = "Yes" if t.affects_balance else "No"
+                        csv_writer.writerow(
+                            [
+                                t.transaction_date.strftime("%Y-%m-%d"),
+                                t.transaction_date.strftime("%I:%M %p"),
+                                t.description,
+                                t.amount,
+                                dr_cr,
+                                (
+                                    f"{t.account.name} ({t.account.account_type})"
+                                    if t.account
+                                    else ""
+                                ),
+                                is_expense,
+                                category_names,
+                                tag_names,
+                                t.notes or "",
+                            ]
+                        )
+
+                    # Hand the batch to the client and start the buffer afresh
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+
+                    if not page.has_next:
+                        break
+                    last = page.items[-1]
+                    cursor = (last.transaction_date, last.id)
+            except Exception as e:
+                # The headers are already sent, so abort the response instead of
+                # ending it cleanly: the client must not mistake a cut-off file
+                # for a complete export
+                current_app.logger.error(f"Export stream failed: {e}")
+                raise
+
+            yield buffer.getvalue()
+
         filename = f"transactions_export_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv"
         return Response(
-            output,
+            stream_with_context(generate_csv()),
             mimetype="text/csv",
             headers={"Content-disposition": f"attachment; filename={filename}"},
         )
@@ -2246,6 +2147,7 @@ def export_transactions():
 
 @main_bp.route("/api/transaction-summary")
 @login_required
+@cache.cached_json()
 def transaction_summary_api():
     start_date_str = request.args.get("start_date")
     end_date_str = request.args.get("end_date")
@@ -2284,6 +2186,7 @@ def transaction_summary_api():
 
 @main_bp.route("/api/daily_expense_trend")
 @login_required
+@cache.cached_json()
 def daily_expense_trend():
     start_date_str = request.args.get("start_date")
     end_date_str = request.args.get("end_date")
@@ -2293,23 +2196,10 @@ def daily_expense_trend():
 
     start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
     end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-    end_date_inclusive = datetime.combine(end_date, datetime.max.time())
 
-    stmt = (
-        select(
-            func.cast(Transaction.transaction_date, db.Date).label("date"),
-            func.sum(Transaction.amount).label("total_expenses"),
-        )
-        .where(
-            Transaction.user_id == current_user.id,
-            Transaction.transaction_type == "expense",
-            Transaction.transaction_date.between(start_date, end_date_inclusive),
-            Transaction.affects_balance == True,
-        )
-        .group_by(func.cast(Transaction.transaction_date, db.Date))
-        .order_by(func.cast(Transaction.transaction_date, db.Date))
+    daily_expenses = rollups.daily_totals(
+        current_user.id, start_date, end_date, transaction_type="expense"
     )
-    daily_expenses_query = db.session.execute(stmt).all()
 
     # Build a complete date range to ensure all days are represented
     date_range = (
@@ -2317,8 +2207,8 @@ def daily_expense_trend():
     )
     trend_data = {dt.strftime("%Y-%m-%d"): 0 for dt in date_range}
 
-    for day in daily_expenses_query:
-        trend_data[day.date.strftime("%Y-%m-%d")] = float(day.total_expenses)
+    for day, _, total in daily_expenses:
+        trend_data[day.strftime("%Y-%m-%d")] = float(total)
 
     return jsonify(
         {"labels": list(trend_data.keys()), "data": list(trend_data.values())}
@@ -2366,6 +2256,7 @@ def check_email():
 
 @main_bp.route("/api/financial_trend")
 @login_required
+@cache.cached_json()
 def financial_trend():
     """
     Provides data for a line chart comparing total daily income vs. expenses
@@ -2380,29 +2271,11 @@ def financial_trend():
     try:
         start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-        end_date_inclusive = datetime.combine(end_date, datetime.max.time())
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
 
-    # A single, efficient query to get daily totals for both types
-    daily_totals_query = (
-        db.session.query(
-            db.func.cast(Transaction.transaction_date, db.Date),
-            Transaction.transaction_type,
-            db.func.sum(Transaction.amount),
-        )
-        .filter(
-            Transaction.user_id == current_user.id,
-            Transaction.transaction_date.between(start_date, end_date_inclusive),
-            Transaction.affects_balance == True,
-        )
-        .group_by(
-            db.func.cast(Transaction.transaction_date, db.Date),
-            Transaction.transaction_type,
-        )
-        .order_by(db.func.cast(Transaction.transaction_date, db.Date))
-        .all()
-    )
+    # Daily totals for both types come straight from the daily rollups
+    daily_totals_query = rollups.daily_totals(current_user.id, start_date, end_date)
 
     # Initialize dictionaries with all dates in the range set to zero
     date_range = [
@@ -2412,8 +2285,8 @@ def financial_trend():
     expense_data = {dt.strftime("%Y-%m-%d"): 0 for dt in date_range}
 
     # Populate the dictionaries with data from the query
-    for date, trans_type, total in daily_totals_query:
-        date_str = date.strftime("%Y-%m-%d")
+    for day, trans_type, total in daily_totals_query:
+        date_str = day.strftime("%Y-%m-%d")
         if trans_type == "income":
             income_data[date_str] = float(total)
         elif trans_type == "expense":
@@ -2428,6 +2301,158 @@ def financial_trend():
     return jsonify(response_data)
 
 
+@main_bp.route("/api/portfolio_value_trend")
+@login_required
+@cache.cached_json()
+def portfolio_value_trend():
+    """
+    Provides data for a line chart of the portfolio's daily market value over
+    a specified date range, valued from the stored daily price history.
+    """
+    start_date_str = request.args.get("start_date")
+    end_date_str = request.args.get("end_date")
+
+    if not start_date_str or not end_date_str:
+        return jsonify({"error": "start_date and end_date are required"}), 400
+
+    try:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    if not 0 <= (end_date - start_date).days < MAX_TREND_DAYS:
+        return (
+            jsonify(
+                {
+                    "error": f"end_date must be on or after start_date, at most {MAX_TREND_DAYS} days later."
+                }
+            ),
+            400,
+        )
+
+    days, values, unpriced_tickers = valuation.value_trend(
+        current_user.id, start_date, end_date
+    )
+    return jsonify(
+        {
+            "labels": [str(day) for day in days],
+            "data": [round(value, 2) for value in values.tolist()],
+            "unpriced_tickers": unpriced_tickers,
+        }
+    )
+
+
+@main_bp.route("/api/cashflow_forecast")
+@login_required
+@cache.cached_json()
+def cashflow_forecast():
+    """
+    Provides data for a line chart of each account's projected daily balance
+    over the next `months` months (12 by default), from the current balances
+    and the user's recurring transaction rules.
+    """
+    try:
+        months = int(request.args.get("months", 12))
+    except ValueError:
+        months = 0
+    if not 1 <= months <= MAX_FORECAST_MONTHS:
+        return (
+            jsonify({"error": f"months must be between 1 and {MAX_FORECAST_MONTHS}."}),
+            400,
+        )
+
+    today = datetime.now(timezone.utc).date()
+    days, accounts, balances = forecast.cashflow_forecast(
+        current_user.id, today, months
+    )
+    return jsonify(
+        {
+            "labels": [str(day) for day in days],
+            "accounts": [
+                {
+                    "id": account.id,
+                    "name": account.name,
+                    "data": balances[:, column].round(2).tolist(),
+                }
+                for column, account in enumerate(accounts)
+            ],
+            "total": balances.sum(axis=1).round(2).tolist(),
+        }
+    )
+
+
+@main_bp.route("/api/dashboard_data")
+@login_required
+@cache.cached_json()
+def dashboard_data():
+    """
+    Provides all of the dashboard chart data in one response: the expense
+    breakdown by category, the daily expense trend and the daily income vs.
+    expense trend for the selected date range.
+    """
+    start_date_str = request.args.get("start_date")
+    end_date_str = request.args.get("end_date")
+
+    if not start_date_str or not end_date_str:
+        return jsonify({"error": "start_date and end_date are required"}), 400
+
+    try:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    # 1. Category breakdown for the range
+    category_stmt = (
+        select(Category.name, func.sum(Transaction.amount))
+        .join(
+            transaction_categories, Category.id == transaction_categories.c.category_id
+        )
+        .join(Transaction, Transaction.id == transaction_categories.c.transaction_id)
+        .where(
+            Transaction.user_id == current_user.id,
+            Transaction.transaction_type == "expense",
+            Transaction.transaction_date >= start_date,
+            Transaction.transaction_date < end_date + timedelta(days=1),
+            Transaction.affects_balance == true(),
+        )
+        .group_by(Category.name)
+    )
+    category_summary = db.session.execute(category_stmt).all()
+
+    # 2. One pass over the daily rollups feeds both trend series
+    labels = [
+        (start_date + timedelta(days=d)).strftime("%Y-%m-%d")
+        for d in range((end_date - start_date).days + 1)
+    ]
+    income_data = dict.fromkeys(labels, 0)
+    expense_data = dict.fromkeys(labels, 0)
+    for day, trans_type, total in rollups.daily_totals(
+        current_user.id, start_date, end_date
+    ):
+        series = income_data if trans_type == "income" else expense_data
+        series[day.strftime("%Y-%m-%d")] = float(total)
+
+    return jsonify(
+        {
+            "category_breakdown": {
+                "labels": [row[0] for row in category_summary],
+                "data": [float(row[1]) for row in category_summary],
+            },
+            "daily_expense": {
+                "labels": labels,
+                "data": list(expense_data.values()),
+            },
+            "financial_trend": {
+                "labels": labels,
+                "income_data": list(income_data.values()),
+                "expense_data": list(expense_data.values()),
+            },
+        }
+    )
+
+
 @main_bp.route("/recurring", methods=["GET", "POST"])
 @login_required
 def recurring_transactions():
@@ -2455,6 +2480,8 @@ def recurring_transactions():
             ),
         )
         db.session.add(new_recurring)
+        recurring.schedule(start_date)
+        bump_data_version(current_user.id)
         db.session.commit()
         flash("Recurring transaction scheduled successfully!", "success")
         return redirect(url_for("main.recurring_transactions"))
@@ -2494,7 +2521,8 @@ def recurring_transactions():
 def generate_recurring_transactions():
     """
     A protected task endpoint to generate transactions from recurring rules.
-    This should only be triggered by a secured, scheduled job.
+    This should only be triggered by a secured, scheduled job. An optional
+    ?shard=i/n query parameter splits the rules across n callers.
     """
     # 1. Security Check: Verify the secret key from the request header
     task_secret_key = current_app.config.get("TASK_SECRET_KEY")
@@ -2507,63 +2535,64 @@ def generate_recurring_transactions():
         )
         abort(403)  # Use abort(403) for "Forbidden"
 
-    # 2. Get today's date
-    today = datetime.now(timezone.utc).date()
-    current_app.logger.info(f"Running recurring transaction job on {today}...")
+    # 2. Work out which shard of the rules this call handles ("i/n")
+    try:
+        shard_index, shard_count = recurring.parse_shard(
+            request.args.get("shard", "0/1")
+        )
+    except ValueError:
+        return jsonify({"status": "error", "message": "shard must be i/n."}), 400
 
-    # 3. Find all due recurring rules
-    due_rules_stmt = select(RecurringTransaction).where(
-        RecurringTransaction.next_due_date <= today
+    today = datetime.now(timezone.utc).date()
+    current_app.logger.info(
+        f"Running recurring transaction job on {today} "
+        f"(shard {shard_index}/{shard_count})..."
     )
-    due_rules = db.session.execute(due_rules_stmt).scalars().all()
 
-    if not due_rules:
-        current_app.logger.info("No recurring transactions are due today.")
-        return jsonify({"status": "success", "message": "No transactions to generate."})
+    # 3. Create every occurrence due up to today in committed, resumable batches
+    report = recurring.run_job(today, shard_index, shard_count)
+    transactions_created = report["transactions_created"]
 
-    transactions_created = 0
-    for rule in due_rules:
-        transaction_datetime = datetime.combine(
-            rule.next_due_date, datetime.min.time(), tzinfo=timezone.utc
-        )
-        new_transaction = Transaction(
-            description=rule.description,
-            amount=rule.amount,
-            transaction_type=rule.transaction_type,
-            transaction_date=transaction_datetime,
-            user_id=rule.user_id,
-            account_id=rule.account_id,
-            recurring_transaction_id=rule.id,
+    if not transactions_created:
+        current_app.logger.info("No recurring transactions are due today.")
+        message = "No transactions to generate."
+    else:
+        message = f"Successfully generated {transactions_created} transaction(s)."
+        current_app.logger.info(message)
+    if report["failed_rule_ids"]:
+        current_app.logger.warning(
+            f"Recurring rules that failed: {report['failed_rule_ids']}"
         )
-        if rule.category:
-            new_transaction.categories.append(rule.category)
-
-        # 5. Update account balance
-        if rule.account:
-            if new_transaction.transaction_type == "income":
-                rule.account.balance += new_transaction.amount
-            else:
-                rule.account.balance -= new_transaction.amount
+    return jsonify({"status": "success", "message": message, **report})
 
-        # 6. Calculate the next due date
-        if rule.recurrence_interval == "daily":
-            rule.next_due_date += timedelta(days=1)
-        elif rule.recurrence_interval == "weekly":
-            rule.next_due_date += timedelta(weeks=1)
-        elif rule.recurrence_interval == "monthly":
-            rule.next_due_date += relativedelta(months=1)
-        elif rule.recurrence_interval == "yearly":
-            rule.next_due_date += relativedelta(years=1)
 
-        db.session.add(new_transaction)
-        transactions_created += 1
+@main_bp.route("/tasks/refresh_prices", methods=["POST"])
+def refresh_asset_prices():
+    """
+    A protected task endpoint that refreshes the stored quotes of every held
+    ticker, so page views never wait for the market-data API.
+    This should only be triggered by a secured, scheduled job.
+    """
+    task_secret_key = current_app.config.get("TASK_SECRET_KEY")
+    request_secret = request.headers.get("X-App-Key")
 
-    # 7. Commit all changes to the database
-    db.session.commit()
+    # Abort if secrets are missing or do not match
+    if not task_secret_key or request_secret != task_secret_key:
+        current_app.logger.warning(
+            "Unauthorized attempt to access price refresh task endpoint."
+        )
+        abort(403)
 
-    success_message = f"Successfully generated {transactions_created} transaction(s)."
+    result = refresh_prices()
+    success_message = (
+        f"Refreshed {len(result['refreshed'])} of {result['tickers']} held ticker(s)."
+    )
     current_app.logger.info(success_message)
-    return jsonify({"status": "success", "message": success_message})
+    if result["failed"]:
+        current_app.logger.warning(
+            f"Could not refresh prices for: {', '.join(result['failed'])}"
+        )
+    return jsonify({"status": "success", "message": success_message, **result})
 
 
 @main_bp.route("/recurring/<int:recurring_id>/transactions")
@@ -2610,6 +2639,7 @@ def edit_recurring(recurring_id):
             else None
         )
 
+        bump_data_version(current_user.id)
         db.session.commit()
         flash("Recurring transaction rule updated successfully!", "success")
         return redirect(url_for("main.recurring_transactions"))
@@ -2642,6 +2672,7 @@ def delete_recurring(recurring_id):
     # The 'cascade' option on the model will handle generated transactions if set up,
     # otherwise, we simply delete the rule itself.
     db.session.delete(rule)
+    bump_data_version(current_user.id)
     db.session.commit()
     flash("Recurring transaction rule deleted successfully.", "success")
     return redirect(url_for("main.recurring_transactions"))
@@ -2655,7 +2686,8 @@ def run_recurring_now(recurring_id):
         abort(403)
 
     try:
-        # 1. Create the new Transaction record
+        # 1. Create the transaction of the rule's next due occurrence
+        due = rule.next_due_date
         now_utc = datetime.now(timezone.utc)
         new_transaction = Transaction(
             description=f"{rule.description} (Manual Run)",
@@ -2665,6 +2697,7 @@ def run_recurring_now(recurring_id):
             user_id=rule.user_id,
             account_id=rule.account_id,
             recurring_transaction_id=rule.id,
+            occurrence_date=due,
         )
         if rule.category:
             new_transaction.categories.append(rule.category)
@@ -2676,11 +2709,17 @@ def run_recurring_now(recurring_id):
             else:
                 rule.account.balance -= new_transaction.amount
 
-        # 3. Update the rule's last processed date
-        rule.last_processed_date = now_utc.date()
+        # 3. Move the rule past the occurrence, so the scheduled job skips it
+        rule.last_processed_date = due
+        rule.next_due_date = recurring.next_occurrence(
+            rule.start_date, rule.recurrence_interval, due
+        )
 
         db.session.add(new_transaction)
+        rollups.record(new_transaction)
+        search.index(new_transaction)
         log_activity(f"Manually ran recurring transaction: '{rule.description}'")
+        bump_data_version(current_user.id)
         db.session.commit()
 
         flash("Recurring transaction generated successfully!", "success")
@@ -2736,6 +2775,8 @@ def add_investment():
         )
 
         db.session.add(new_investment_trans)
+        holdings.record(new_investment_trans)
+        bump_data_version(current_user.id)
         db.session.commit()
 
         flash("Investment transaction recorded successfully!", "success")
@@ -2756,6 +2797,8 @@ def edit_investment_transaction(transaction_id):
         abort(403)
 
     if request.method == "POST":
+        original_asset_id = trans.asset_id
+
         # --- 1. Handle Ticker Symbol Change (Find or Create Asset) ---
         new_ticker = request.form.get("ticker_symbol", "").strip().upper()
         if new_ticker:
@@ -2784,6 +2827,9 @@ def edit_investment_transaction(transaction_id):
         # --- END OF FIX ---
 
         log_activity(f"Updated investment transaction for {trans.asset.ticker_symbol}.")
+        # A changed trade shifts the average cost of every later one
+        holdings.recalculate(current_user.id, original_asset_id, trans.asset_id)
+        bump_data_version(current_user.id)
         db.session.commit()
         flash("Investment transaction updated successfully!", "success")
         return redirect(url_for("main.portfolio"))
@@ -2807,6 +2853,8 @@ def delete_investment_transaction(transaction_id):
         f"Deleted {trans.transaction_type} of {trans.quantity} {trans.asset.ticker_symbol} from portfolio."
     )
     db.session.delete(trans)
+    holdings.recalculate(current_user.id, trans.asset_id)
+    bump_data_version(current_user.id)
     db.session.commit()
     flash("Investment transaction deleted.", "success")
     return redirect(url_for("main.portfolio"))
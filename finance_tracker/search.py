@@ -0,0 +1,242 @@
+# finance_tracker/search.py
+
+import re
+from sqlalchemy import (
+    DDL,
+    event,
+    select,
+    insert,
+    delete,
+    text,
+    table,
+    column,
+    literal_column,
+)
+from sqlalchemy.orm import selectinload
+from . import db
+from .models import Transaction, TransactionSearch
+
+FTS_TABLE = "transaction_search_fts"
+
+# Search terms are runs of word characters; extra terms are ignored
+_TERM_RE = re.compile(r"\w+")
+MAX_TERMS = 8
+
+REBUILD_BATCH_SIZE = 500
+
+# SQLite (dev/test): an external-content FTS5 table over transaction_search,
+# kept in sync by triggers so every write path is covered.
+SQLITE_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "document, content='transaction_search', content_rowid='transaction_id')",
+    f"CREATE TRIGGER IF NOT EXISTS transaction_search_ai AFTER INSERT ON "
+    f"transaction_search BEGIN INSERT INTO {FTS_TABLE}(rowid, document) "
+    f"VALUES (new.transaction_id, new.document); END",
+    f"CREATE TRIGGER IF NOT EXISTS transaction_search_ad AFTER DELETE ON "
+    f"transaction_search BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) "
+    f"VALUES ('delete', old.transaction_id, old.document); END",
+    f"CREATE TRIGGER IF NOT EXISTS transaction_search_au AFTER UPDATE ON "
+    f"transaction_search BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) "
+    f"VALUES ('delete', old.transaction_id, old.document); "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) "
+    f"VALUES (new.transaction_id, new.document); END",
+]
+
+for _statement in SQLITE_FTS_DDL:
+    event.listen(
+        TransactionSearch.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite"),
+    )
+event.listen(
+    TransactionSearch.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"),
+)
+
+# The detected backend per engine: "fts5", "fulltext" or "like"
+_backends = {}
+
+
+def _detect_backend(dialect_name):
+    if dialect_name == "sqlite":
+        found = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        return "fts5" if found else "like"
+    if dialect_name == "mssql":
+        found = db.session.execute(
+            text(
+                "SELECT 1 FROM sys.fulltext_indexes "
+                "WHERE object_id = OBJECT_ID('transaction_search')"
+            )
+        ).first()
+        return "fulltext" if found else "like"
+    return "like"
+
+
+def backend():
+    """Returns the search backend available on the current database."""
+    engine = db.engine
+    if engine not in _backends:
+        _backends[engine] = _detect_backend(engine.dialect.name)
+    return _backends[engine]
+
+
+def document_for(description, notes, category_names, tag_names):
+    """
+    Builds the searchable text of a transaction from its description, notes,
+    category names and tag names.
+    """
+    parts = [description, notes, *category_names, *tag_names]
+    return " ".join(part for part in parts if part).lower()
+
+
+def build_document(transaction):
+    """Builds the searchable text of an ORM Transaction."""
+    return document_for(
+        transaction.description,
+        transaction.notes,
+        [category.name for category in transaction.categories],
+        [tag.name for tag in transaction.tags],
+    )
+
+
+def index_many(transactions):
+    """
+    Creates or refreshes the search documents of the given transactions,
+    with a single read of the existing documents.
+    """
+    # New transactions need their ids before they can be indexed
+    db.session.flush()
+    ids = [transaction.id for transaction in transactions]
+    existing = {
+        row.transaction_id: row
+        for row in db.session.execute(
+            select(TransactionSearch).where(TransactionSearch.transaction_id.in_(ids))
+        ).scalars()
+    }
+    for transaction in transactions:
+        document = build_document(transaction)
+        row = existing.get(transaction.id)
+        if row is None:
+            db.session.add(
+                TransactionSearch(
+                    transaction_id=transaction.id,
+                    user_id=transaction.user_id,
+                    document=document,
+                )
+            )
+        elif row.document != document:
+            row.document = document
+
+
+def insert_documents(documents):
+    """
+    Bulk-inserts the documents of newly inserted transactions.
+
+    Args:
+        documents: A list of {"transaction_id", "user_id", "document"} dicts.
+    """
+    if documents:
+        db.session.execute(insert(TransactionSearch), documents)
+
+
+def index(transaction):
+    """Creates or refreshes the search document of a single transaction."""
+    index_many([transaction])
+
+
+def parse_terms(query):
+    """Splits a user's search box input into lowercase search terms."""
+    return [term.lower() for term in _TERM_RE.findall(query)][:MAX_TERMS]
+
+
+def matching_ids(user_id, query):
+    """
+    Returns a select() of the ids of the user's transactions whose search
+    document contains every term of the query. Terms are matched as word
+    prefixes by the full-text backends, and as substrings by the fallback.
+
+    Args:
+        user_id: The owner of the transactions to search.
+        query: The raw search box input.
+    """
+    stmt = select(TransactionSearch.transaction_id).where(
+        TransactionSearch.user_id == user_id
+    )
+    terms = parse_terms(query)
+    search_backend = backend() if terms else "like"
+
+    if search_backend == "fts5":
+        fts = table(FTS_TABLE, column("rowid"))
+        match = " ".join(f'"{term}"*' for term in terms)
+        return stmt.where(
+            TransactionSearch.transaction_id.in_(
+                select(fts.c.rowid).where(literal_column(FTS_TABLE).op("MATCH")(match))
+            )
+        )
+    if search_backend == "fulltext":
+        contains = " AND ".join(f'"{term}*"' for term in terms)
+        return stmt.where(
+            text("CONTAINS(transaction_search.document, :search_terms)").bindparams(
+                search_terms=contains
+            )
+        )
+
+    for term in terms or [query.strip().lower()]:
+        stmt = stmt.where(TransactionSearch.document.contains(term, autoescape=True))
+    return stmt
+
+
+def apply_filter(stmt, user_id, query):
+    """
+    Restricts a select() of Transaction to the rows matching a search query.
+    Shared by the transactions list and the CSV export.
+    """
+    return stmt.where(Transaction.id.in_(matching_ids(user_id, query)))
+
+
+def rebuild(user_id=None):
+    """
+    Rebuilds the search documents from the transactions.
+
+    Args:
+        user_id: Restrict the rebuild to a single user. Rebuilds everyone if None.
+
+    Returns:
+        The number of documents written.
+    """
+    clear_stmt = delete(TransactionSearch)
+    if user_id is not None:
+        clear_stmt = clear_stmt.where(TransactionSearch.user_id == user_id)
+    db.session.execute(clear_stmt)
+
+    stmt = (
+        select(Transaction)
+        .options(selectinload(Transaction.categories), selectinload(Transaction.tags))
+        .order_by(Transaction.id)
+        .limit(REBUILD_BATCH_SIZE)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+
+    # Walk the table by id so no cursor stays open while inserting
+    written, last_id = 0, 0
+    while batch := (
+        db.session.execute(stmt.where(Transaction.id > last_id)).scalars().all()
+    ):
+        insert_documents(
+            [
+                {
+                    "transaction_id": transaction.id,
+                    "user_id": transaction.user_id,
+                    "document": build_document(transaction),
+                }
+                for transaction in batch
+            ]
+        )
+        written += len(batch)
+        last_id = batch[-1].id
+    return written
@@ -1,9 +1,22 @@
 # finance_tracker/services.py
+import decimal
 import os
+import random
 import requests
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from flask import current_app
+from prometheus_client import Counter, Gauge
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from . import db, price_history
+from .models import Asset, AssetPrice, Holding
 
 # Set up a logger for this module
 logger = logging.getLogger(__name__)
@@ -11,60 +24,536 @@ logger = logging.getLogger(__name__)
 # Alpha Vantage API base URL
 ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
 
-# A small cache to avoid re-fetching the same ticker in a single request
-# For a production app, a more robust solution like Redis or Flask-Caching would be ideal.
-price_cache = {}
+PRICE_SOURCE = "alpha_vantage"
 
+_MISSING = object()
+_DEFAULT = object()
 
-def get_stock_price(ticker_symbol):
+
+class PriceCache:
     """
-    Fetches the latest stock price for a given ticker symbol from Alpha Vantage.
-    Includes basic caching and rate-limit handling.
+    The in-process layer in front of the AssetPrice table: a thread-safe
+    {ticker: (price, expires_at)} dict, so repeated page views in one worker
+    do not even query the database.
     """
-    if ticker_symbol in price_cache:
-        return price_cache[ticker_symbol]
 
-    api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
-    if not api_key:
-        logger.error("ALPHA_VANTAGE_API_KEY not set in environment.")
-        return None
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
 
-    params = {"function": "GLOBAL_QUOTE", "symbol": ticker_symbol, "apikey": api_key}
+    def get(self, ticker, now):
+        with self._lock:
+            entry = self._entries.get(ticker)
+        if entry is None or entry[1] <= now:
+            return _MISSING
+        return entry[0]
 
-    try:
-        # Introduce a small delay to be considerate to the API's free tier limits
-        time.sleep(1)  # A 1-second delay between requests
+    def set(self, ticker, price, expires_at):
+        with self._lock:
+            self._entries[ticker] = (price, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+price_cache = PriceCache()
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket. Tokens refill continuously at `rate` per
+    second up to `capacity`; every API request takes one.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Takes a token, waiting for one to refill if necessary.
+
+        Args:
+            timeout: The longest to wait in seconds, or None to wait forever.
+
+        Returns:
+            True if a token was taken, False if the timeout ran out first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+# One bucket per process, shared by every request thread and quote worker
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def _get_rate_limiter():
+    global _rate_limiter
+    per_minute = current_app.config.get("QUOTE_RATE_LIMIT_PER_MINUTE", 5)
+    burst = current_app.config.get("QUOTE_RATE_LIMIT_BURST", per_minute)
+    with _rate_limiter_lock:
+        if (
+            _rate_limiter is None
+            or _rate_limiter.rate != per_minute / 60
+            or _rate_limiter.capacity != burst
+        ):
+            _rate_limiter = TokenBucket(per_minute / 60, burst)
+        return _rate_limiter
+
+
+# Exposed on /metrics by the app's PrometheusMetrics exporter
+QUOTE_REQUESTS = Counter(
+    "market_data_requests_total",
+    "Quote requests to the market-data provider, by outcome.",
+    ["outcome"],
+)
+QUOTE_RETRIES = Counter(
+    "market_data_retries_total",
+    "Quote requests retried after a rate-limit response.",
+)
+CIRCUIT_STATE = Gauge(
+    "market_data_circuit_state",
+    "State of the market-data circuit breaker: 0 closed, 1 half-open, 2 open.",
+)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing provider. After `failure_threshold` consecutive
+    failures the circuit opens and every call is refused for `reset_timeout`
+    seconds; then one trial call is let through (half-open), which either
+    closes the circuit again or re-opens it.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    _GAUGE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0)
+
+    def allow_request(self):
+        """Returns True if a call may be made now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def release(self):
+        """Gives back a permitted call that was never made."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._set_state(self.CLOSED)
 
-        response = requests.get(
-            ALPHA_VANTAGE_BASE_URL, params=params, timeout=10
-        )  # 10-second timeout
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
 
-        data = response.json()
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning(f"Market-data circuit breaker is now {state}")
+        self.state = state
+        CIRCUIT_STATE.set(self._GAUGE_VALUES[state])
 
-        # Check for API-specific error messages or rate limit notifications
-        if "Note" in data:
-            logger.warning(
-                f"Alpha Vantage API note for {ticker_symbol}: {data['Note']}"
+
+_circuit_breaker = None
+_http_session = None
+_client_lock = threading.Lock()
+
+
+def _get_circuit_breaker():
+    global _circuit_breaker
+    with _client_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker(
+                current_app.config.get("QUOTE_BREAKER_THRESHOLD", 5),
+                current_app.config.get("QUOTE_BREAKER_COOL_OFF", 300),
             )
-            # This indicates we might be hitting the rate limit, so we stop trying for now.
-            return None
+        return _circuit_breaker
+
+
+def _get_http_session():
+    # One pooled session per process keeps TLS connections to the provider
+    # open between quotes; urllib3 retries connection errors and 5xx replies.
+    global _http_session
+    with _client_lock:
+        if _http_session is None:
+            pool_size = current_app.config.get("QUOTE_MAX_WORKERS", 4)
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=pool_size,
+                max_retries=Retry(
+                    total=2,
+                    backoff_factor=0.5,
+                    status_forcelist=[500, 502, 503, 504],
+                    allowed_methods=["GET"],
+                    raise_on_status=False,
+                ),
+            )
+            _http_session = requests.Session()
+            _http_session.mount("https://", adapter)
+            _http_session.mount("http://", adapter)
+        return _http_session
 
-        # Check if the required data is in the response
-        if "Global Quote" not in data or "05. price" not in data["Global Quote"]:
-            logger.warning(f"Unexpected API response for {ticker_symbol}: {data}")
-            price_cache[ticker_symbol] = None  # Cache the failure to avoid retries
+
+class QuoteClient:
+    """
+    Fetches single quotes from Alpha Vantage for the quote worker threads.
+    Rate-limit replies (HTTP 429, or a "Note"/"Information" body) are retried
+    with exponential backoff and full jitter, each attempt taking a token
+    from the rate limiter, and every call goes through the circuit breaker.
+    """
+
+    def __init__(self, api_key, session, limiter, breaker, max_wait, config):
+        self.api_key = api_key
+        self.session = session
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_wait = max_wait
+        self.timeout = config.get("QUOTE_HTTP_TIMEOUT", 10)
+        self.retry_attempts = config.get("QUOTE_RETRY_ATTEMPTS", 3)
+        self.backoff_base = config.get("QUOTE_BACKOFF_BASE", 2.0)
+        self.backoff_max = config.get("QUOTE_BACKOFF_MAX", 30.0)
+
+    def backoff(self, attempt):
+        """Returns the jittered delay in seconds before retry number `attempt`."""
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        )
+
+    def fetch(self, ticker_symbol):
+        """Returns the latest price of one ticker, or None."""
+        if not self.breaker.allow_request():
+            QUOTE_REQUESTS.labels(outcome="short_circuited").inc()
             return None
 
-        price_str = data["Global Quote"]["05. price"]
-        price = float(price_str)
+        outcome, price = "skipped", None
+        for attempt in range(self.retry_attempts + 1):
+            if attempt:
+                QUOTE_RETRIES.inc()
+                time.sleep(self.backoff(attempt))
+            if not self.limiter.acquire(timeout=self.max_wait):
+                logger.warning(f"Quote rate limit reached, skipping {ticker_symbol}")
+                break
+            outcome, price = self._request(ticker_symbol)
+            if outcome != "rate_limited":
+                break
 
-        price_cache[ticker_symbol] = price  # Cache the successful result
+        QUOTE_REQUESTS.labels(outcome=outcome).inc()
+        if outcome == "skipped":
+            self.breaker.release()
+        elif outcome in ("rate_limited", "error"):
+            self.breaker.record_failure()
+        else:
+            # An unknown ticker is still a healthy answer from the provider
+            self.breaker.record_success()
         return price
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching stock price for {ticker_symbol}: {e}")
-        return None
-    except (ValueError, KeyError) as e:
-        logger.error(f"Error parsing stock price data for {ticker_symbol}: {e}")
-        return None
+    def _request(self, ticker_symbol):
+        params = {
+            "function": "GLOBAL_QUOTE",
+            "symbol": ticker_symbol,
+            "apikey": self.api_key,
+        }
+        try:
+            response = self.session.get(
+                ALPHA_VANTAGE_BASE_URL, params=params, timeout=self.timeout
+            )
+            if response.status_code == 429:
+                logger.warning(f"Alpha Vantage returned 429 for {ticker_symbol}")
+                return "rate_limited", None
+            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+
+            data = response.json()
+
+            # Check for API-specific rate limit notifications
+            note = data.get("Note") or data.get("Information")
+            if note:
+                logger.warning(f"Alpha Vantage API note for {ticker_symbol}: {note}")
+                return "rate_limited", None
+
+            # Check if the required data is in the response
+            if "Global Quote" not in data or "05. price" not in data["Global Quote"]:
+                logger.warning(f"Unexpected API response for {ticker_symbol}: {data}")
+                return "invalid", None
+
+            return "success", float(data["Global Quote"]["05. price"])
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching stock price for {ticker_symbol}: {e}")
+            return "error", None
+        except (ValueError, KeyError) as e:
+            logger.error(f"Error parsing stock price data for {ticker_symbol}: {e}")
+            return "invalid", None
+
+
+def quote_expires_at(fetched_at):
+    """
+    Returns when a quote fetched at `fetched_at` (an aware datetime) goes stale.
+
+    During market hours a quote lives QUOTE_INTRADAY_TTL seconds, but never
+    past the close, so the end-of-day price is fetched once the market shuts.
+    Outside market hours the last quote is valid until the next weekday open.
+    Exchange holidays are not modelled; they only cost a few extra fetches.
+    """
+    config = current_app.config
+    market_tz = ZoneInfo(config.get("MARKET_TIMEZONE", "America/New_York"))
+    open_time = _clock(config.get("MARKET_OPEN", "09:30"))
+    close_time = _clock(config.get("MARKET_CLOSE", "16:00"))
+
+    local = fetched_at.astimezone(market_tz)
+    is_weekday = local.weekday() < 5
+    today_open = datetime.combine(local.date(), open_time, market_tz)
+    today_close = datetime.combine(local.date(), close_time, market_tz)
+    if is_weekday and today_open <= local < today_close:
+        intraday_ttl = timedelta(seconds=config.get("QUOTE_INTRADAY_TTL", 900))
+        return min(fetched_at + intraday_ttl, today_close)
+
+    next_open_day = local.date()
+    if not (is_weekday and local < today_open):
+        next_open_day += timedelta(days=1)
+    while next_open_day.weekday() >= 5:
+        next_open_day += timedelta(days=1)
+    return datetime.combine(next_open_day, open_time, market_tz)
+
+
+def get_stored_prices(ticker_symbols):
+    """
+    Returns the last known prices of several tickers without calling the API,
+    for page views. Quotes are kept current by refresh_prices().
+
+    Args:
+        ticker_symbols: An iterable of ticker symbols.
+
+    Returns:
+        A {ticker: price} dict. Stale quotes are returned as they are; tickers
+        that were never fetched map to None.
+    """
+    tickers = list(dict.fromkeys(ticker_symbols))
+    now = datetime.now(timezone.utc)
+    prices, stored = _lookup_prices(tickers, now)
+
+    # Look again shortly, since the refresher may store a newer quote
+    recheck_at = now + timedelta(
+        seconds=current_app.config.get("QUOTE_FAILURE_TTL", 60)
+    )
+    for ticker in tickers:
+        if ticker not in prices:
+            price = float(stored[ticker].price) if ticker in stored else None
+            price_cache.set(ticker, price, recheck_at)
+            prices[ticker] = price
+    return prices
+
+
+def get_stock_prices(ticker_symbols, max_wait=_DEFAULT):
+    """
+    Returns the latest prices of several tickers at once.
+
+    Quotes are looked up in the in-process price_cache, then in the shared
+    AssetPrice table, and only tickers with no fresh quote in either are
+    fetched from the API. Those are requested in parallel on a small thread
+    pool; every request waits for the shared token bucket, so the provider's
+    rate limit is honoured across all concurrent callers.
+
+    Args:
+        ticker_symbols: An iterable of ticker symbols. Duplicates are fetched once.
+        max_wait: How long a fetch may wait for the rate limiter, in seconds.
+            Defaults to QUOTE_MAX_WAIT; None waits as long as needed.
+
+    Returns:
+        A {ticker: price} dict. If a fetch fails, the last stored quote is
+        returned even if stale, or None when there is none.
+    """
+    tickers = list(dict.fromkeys(ticker_symbols))
+    now = datetime.now(timezone.utc)
+    prices, stored = _lookup_prices(tickers, now)
+    missing = [ticker for ticker in tickers if ticker not in prices]
+    if not missing:
+        return prices
+
+    if max_wait is _DEFAULT:
+        max_wait = current_app.config.get("QUOTE_MAX_WAIT", 10)
+    fetched = _fetch_stock_prices(missing, max_wait)
+    _store_prices(
+        {ticker: price for ticker, price in fetched.items() if price is not None},
+        now,
+    )
+
+    failure_expires_at = now + timedelta(
+        seconds=current_app.config.get("QUOTE_FAILURE_TTL", 60)
+    )
+    for ticker, price in fetched.items():
+        if price is not None:
+            price_cache.set(ticker, price, quote_expires_at(now))
+        else:
+            # Retry a failed ticker only after a pause, serving the stale quote meanwhile
+            if ticker in stored:
+                price = float(stored[ticker].price)
+            price_cache.set(ticker, price, failure_expires_at)
+        prices[ticker] = price
+    return prices
+
+
+def held_tickers():
+    """Returns the distinct tickers that any user holds a non-zero quantity of."""
+    stmt = (
+        select(Asset.ticker_symbol)
+        .join(Holding, Holding.asset_id == Asset.id)
+        .where(Holding.quantity != 0)
+        .distinct()
+    )
+    return sorted(db.session.execute(stmt).scalars())
+
+
+def refresh_prices():
+    """
+    Fetches and stores fresh quotes for every held ticker whose stored quote
+    has gone stale. Meant for the scheduled task and CLI command, so it waits
+    for the rate limiter instead of skipping tickers.
+
+    Returns:
+        A dict with the number of held tickers, the tickers refreshed and the
+        tickers that could not be fetched.
+    """
+    tickers = held_tickers()
+    fresh, _ = _lookup_prices(tickers, datetime.now(timezone.utc))
+    stale = [ticker for ticker in tickers if ticker not in fresh]
+
+    prices = get_stock_prices(stale, max_wait=None)
+    refreshed = [ticker for ticker in stale if prices[ticker] is not None]
+    failed = [ticker for ticker in stale if prices[ticker] is None]
+    return {"tickers": len(tickers), "refreshed": refreshed, "failed": failed}
+
+
+def _lookup_prices(tickers, now):
+    # Fresh quotes from the in-process cache or the AssetPrice table, plus
+    # the stored rows of the rest (which may hold stale quotes)
+    prices = {}
+    for ticker in tickers:
+        price = price_cache.get(ticker, now)
+        if price is not _MISSING:
+            prices[ticker] = price
+    missing = [ticker for ticker in tickers if ticker not in prices]
+    if not missing:
+        return prices, {}
+
+    # Quotes fetched by any worker are shared through the AssetPrice table
+    stored = {
+        row.ticker: row
+        for row in db.session.execute(
+            select(AssetPrice).where(AssetPrice.ticker.in_(missing))
+        ).scalars()
+    }
+    for ticker, row in stored.items():
+        expires_at = quote_expires_at(_as_utc(row.fetched_at))
+        if expires_at > now:
+            prices[ticker] = float(row.price)
+            price_cache.set(ticker, prices[ticker], expires_at)
+    return prices, stored
+
+
+def _fetch_stock_prices(tickers, max_wait):
+    api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
+    if not api_key:
+        logger.error("ALPHA_VANTAGE_API_KEY not set in environment.")
+        return dict.fromkeys(tickers)
+
+    client = QuoteClient(
+        api_key,
+        _get_http_session(),
+        _get_rate_limiter(),
+        _get_circuit_breaker(),
+        max_wait,
+        current_app.config,
+    )
+    max_workers = min(current_app.config.get("QUOTE_MAX_WORKERS", 4), len(tickers))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(tickers, executor.map(client.fetch, tickers)))
+
+
+def _store_prices(prices, fetched_at):
+    if not prices:
+        return
+    try:
+        for ticker, price in prices.items():
+            db.session.merge(
+                AssetPrice(
+                    ticker=ticker,
+                    price=decimal.Decimal(str(price)),
+                    fetched_at=fetched_at,
+                    source=PRICE_SOURCE,
+                )
+            )
+        # The last quote of a trading day doubles as its daily close
+        market_tz = ZoneInfo(
+            current_app.config.get("MARKET_TIMEZONE", "America/New_York")
+        )
+        market_day = _as_utc(fetched_at).astimezone(market_tz).date()
+        price_history.store_closes(
+            {
+                (ticker, market_day): decimal.Decimal(str(price))
+                for ticker, price in prices.items()
+            },
+            PRICE_SOURCE,
+        )
+        db.session.commit()
+    except SQLAlchemyError as e:
+        # Usually another worker stored the same ticker first
+        db.session.rollback()
+        logger.warning(f"Could not store fetched prices: {e}")
+
+
+def get_stock_price(ticker_symbol):
+    """
+    Fetches the latest stock price for a given ticker symbol from Alpha Vantage.
+    Includes basic caching and rate-limit handling.
+    """
+    return get_stock_prices([ticker_symbol])[ticker_symbol]
+
+
+def _clock(value):
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def _as_utc(value):
+    # DateTime columns come back naive from most drivers
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
@@ -72,6 +72,33 @@ def parse_date_range(request_args):
     return start_date, end_date, start_date_str, end_date_str
 
 
+def period_range(year, month=None):
+    """
+    Converts a calendar year, or a (year, month) pair, into a half-open
+    [start, end) datetime range.
+
+    Filtering with `transaction_date >= start AND transaction_date < end`
+    instead of EXTRACT(year/month) keeps the predicate sargable, so the
+    database can range-seek the transaction_date indexes.
+
+    Args:
+        year: The calendar year, e.g. 2025.
+        month: An optional month number (1-12). If omitted, the whole year is covered.
+
+    Returns:
+        A tuple containing (start_datetime, end_datetime).
+    """
+    if month is None:
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+    start = datetime(year, month, 1)
+    if month == 12:
+        end = datetime(year + 1, 1, 1)
+    else:
+        end = datetime(year, month + 1, 1)
+    return start, end
+
+
 def format_datetime(value):
     """
     A custom Jinja2 filter to format a datetime object into an
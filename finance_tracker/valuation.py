@@ -0,0 +1,102 @@
+# finance_tracker/valuation.py
+
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from . import db
+from .models import Asset, AssetPriceHistory, InvestmentTransaction
+
+# How far before the start date to look for a close to carry forward, so a
+# range starting on a weekend or holiday is priced from its first day
+PRICE_LOOKBACK_DAYS = 10
+
+
+def value_trend(user_id, start_date, end_date):
+    """
+    Values the user's portfolio on every day from start_date to end_date.
+
+    Trades become a (days x assets) matrix of signed quantity deltas, with
+    trades before the range counted on its first day; its cumulative sum
+    over the days is the quantity held each day. That is multiplied with a
+    (days x assets) matrix of closing prices, carried forward over weekends
+    and gaps, and summed per day.
+
+    Returns:
+        A (days, values, unpriced_tickers) tuple: a datetime64[D] array of the
+        days, a float array of the portfolio value on each day, and the
+        tickers that were held on some day with no known price (valued at 0).
+    """
+    days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+    trades = db.session.execute(
+        select(
+            Asset.ticker_symbol,
+            InvestmentTransaction.transaction_type,
+            InvestmentTransaction.quantity,
+            InvestmentTransaction.transaction_date,
+        )
+        .join(Asset, InvestmentTransaction.asset_id == Asset.id)
+        .where(
+            InvestmentTransaction.user_id == user_id,
+            InvestmentTransaction.transaction_date
+            < datetime.combine(end_date + timedelta(days=1), datetime.min.time()),
+        )
+    ).all()
+    if not trades:
+        return days, np.zeros(len(days)), []
+
+    tickers = sorted({trade.ticker_symbol for trade in trades})
+    columns = {ticker: index for index, ticker in enumerate(tickers)}
+
+    trade_days = np.array(
+        [trade.transaction_date.date() for trade in trades], dtype="datetime64[D]"
+    )
+    rows = np.clip((trade_days - days[0]).astype(np.int64), 0, None)
+    cols = np.array([columns[trade.ticker_symbol] for trade in trades])
+    signed_quantities = np.array(
+        [
+            float(trade.quantity) * (1.0 if trade.transaction_type == "buy" else -1.0)
+            for trade in trades
+        ]
+    )
+    deltas = np.zeros((len(days), len(tickers)))
+    np.add.at(deltas, (rows, cols), signed_quantities)
+    quantities = np.cumsum(deltas, axis=0)
+
+    prices = _price_matrix(tickers, start_date, end_date)
+    priced = ~np.isnan(prices)
+    values = np.where(priced, quantities * np.nan_to_num(prices), 0.0).sum(axis=1)
+
+    unpriced = (~priced & (quantities != 0)).any(axis=0)
+    return days, values, [tickers[col] for col in np.flatnonzero(unpriced)]
+
+
+def _price_matrix(tickers, start_date, end_date):
+    # (days x tickers) closes for start_date..end_date, NaN where unknown
+    seed_date = start_date - timedelta(days=PRICE_LOOKBACK_DAYS)
+    seed_day = np.datetime64(seed_date, "D")
+    span = (end_date - seed_date).days + 1
+    columns = {ticker: index for index, ticker in enumerate(tickers)}
+
+    history = db.session.execute(
+        select(
+            AssetPriceHistory.ticker, AssetPriceHistory.day, AssetPriceHistory.close
+        ).where(
+            AssetPriceHistory.ticker.in_(tickers),
+            AssetPriceHistory.day >= seed_date,
+            AssetPriceHistory.day <= end_date,
+        )
+    ).all()
+
+    prices = np.full((span, len(tickers)), np.nan)
+    if history:
+        rows = (
+            np.array([row.day for row in history], dtype="datetime64[D]") - seed_day
+        ).astype(np.int64)
+        cols = np.array([columns[row.ticker] for row in history])
+        prices[rows, cols] = [float(row.close) for row in history]
+
+    # Carry the last known close forward: index of the latest priced row so far
+    latest = np.where(~np.isnan(prices), np.arange(span)[:, None], 0)
+    np.maximum.accumulate(latest, axis=0, out=latest)
+    prices = prices[latest, np.arange(len(tickers))]
+    return prices[PRICE_LOOKBACK_DAYS:]
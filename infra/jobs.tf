@@ -33,4 +33,42 @@ resource "azurerm_container_app_job" "migration_job" {
       }
     }
   }
-}
\ No newline at end of file
+}
+
+# One scheduled job per shard of the recurring rules. Each replica handles the
+# users whose id modulo recurring_job_shards equals its index, commits in
+# batches, and resumes from its checkpoint when retried.
+resource "azurerm_container_app_job" "recurring_job" {
+  count                        = var.recurring_job_shards
+  name                         = "pfa-recurring-job-${count.index}"
+  location                     = module.resource_group.location
+  resource_group_name          = module.resource_group.name
+  container_app_environment_id = azurerm_container_app_environment.aca_env.id
+
+  replica_timeout_in_seconds = 1800
+  replica_retry_limit        = 2
+  schedule_trigger_config {
+    cron_expression          = "0 5 * * *"
+    parallelism              = 1
+    replica_completion_count = 1
+  }
+
+  template {
+    container {
+      name    = "recurring-container"
+      image   = var.docker_image_to_deploy
+      cpu     = 0.25
+      memory  = "0.5Gi"
+      command = ["flask", "generate-recurring", "--shard", "${count.index}/${var.recurring_job_shards}"]
+
+      env {
+        name  = "DATABASE_URL"
+        value = "mssql+pyodbc://${var.db_admin_login}:${urlencode(var.db_admin_password)}@${azurerm_mssql_server.pfa_sql_server.fully_qualified_domain_name}:1433/${azurerm_mssql_database.pfa_db_free.name}?driver=ODBC+Driver+18+for+SQL+Server&Encrypt=yes&TrustServerCertificate=no&ConnectionTimeout=30"
+      }
+      env {
+        name  = "FLASK_APP"
+        value = "run:app"
+      }
+    }
+  }
+}
@@ -52,4 +52,10 @@ variable "task_secret_key" {
   description = "The secret key to authorize the recurring transaction job."
   type        = string
   sensitive   = true
-}
\ No newline at end of file
+}
+
+variable "recurring_job_shards" {
+  description = "How many scheduled jobs split the daily recurring-transaction run."
+  type        = number
+  default     = 2
+}
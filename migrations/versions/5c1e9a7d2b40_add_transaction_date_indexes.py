@@ -0,0 +1,57 @@
+"""Add composite indexes for per-user transaction date scans
+
+Revision ID: 5c1e9a7d2b40
+Revises: ac831458beb3
+Create Date: 2026-10-17 09:12:44.318205
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5c1e9a7d2b40"
+down_revision = "ac831458beb3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("transaction", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_transaction_user_id_transaction_date",
+            ["user_id", "transaction_date"],
+            unique=False,
+        )
+        batch_op.create_index(
+            "ix_transaction_user_type_balance_date",
+            ["user_id", "transaction_type", "affects_balance", "transaction_date"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("transaction_categories", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_transaction_categories_category_id_transaction_id",
+            ["category_id", "transaction_id"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("transaction_tags", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_transaction_tags_tag_id_transaction_id",
+            ["tag_id", "transaction_id"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("transaction_tags", schema=None) as batch_op:
+        batch_op.drop_index("ix_transaction_tags_tag_id_transaction_id")
+
+    with op.batch_alter_table("transaction_categories", schema=None) as batch_op:
+        batch_op.drop_index("ix_transaction_categories_category_id_transaction_id")
+
+    with op.batch_alter_table("transaction", schema=None) as batch_op:
+        batch_op.drop_index("ix_transaction_user_type_balance_date")
+        batch_op.drop_index("ix_transaction_user_id_transaction_date")
@@ -0,0 +1,38 @@
+"""Add recurring_job_run table
+
+Revision ID: a6d3f81c2e47
+Revises: f2c7a9e05d13
+Create Date: 2026-10-18 13:12:37.516092
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a6d3f81c2e47"
+down_revision = "f2c7a9e05d13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "recurring_job_run",
+        sa.Column("run_date", sa.Date(), nullable=False),
+        sa.Column("shard_index", sa.Integer(), nullable=False),
+        sa.Column("shard_count", sa.Integer(), nullable=False),
+        sa.Column("last_rule_id", sa.Integer(), nullable=False),
+        sa.Column("rules_processed", sa.Integer(), nullable=False),
+        sa.Column("transactions_created", sa.Integer(), nullable=False),
+        sa.Column("failed_rules", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("run_date", "shard_index", "shard_count"),
+    )
+
+
+def downgrade():
+    op.drop_table("recurring_job_run")
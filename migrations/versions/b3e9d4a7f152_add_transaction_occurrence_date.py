@@ -0,0 +1,78 @@
+"""Add transaction.occurrence_date and its unique index
+
+Existing generated transactions get the date of their transaction_date. If a
+rule already generated the same date more than once, only the oldest copy is
+keyed, so the unique index can be built; the others stay as they are.
+
+Revision ID: b3e9d4a7f152
+Revises: a6d3f81c2e47
+Create Date: 2026-10-18 13:58:02.641733
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b3e9d4a7f152"
+down_revision = "a6d3f81c2e47"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table("transaction", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("occurrence_date", sa.Date(), nullable=True))
+
+    transaction = sa.table(
+        "transaction",
+        sa.column("id", sa.Integer),
+        sa.column("recurring_transaction_id", sa.Integer),
+        sa.column("transaction_date", sa.DateTime),
+        sa.column("occurrence_date", sa.Date),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(
+            transaction.c.id,
+            transaction.c.recurring_transaction_id,
+            transaction.c.transaction_date,
+        )
+        .where(transaction.c.recurring_transaction_id.isnot(None))
+        .order_by(transaction.c.id)
+    ).all()
+    keyed, updates = set(), []
+    for row in rows:
+        key = (row.recurring_transaction_id, row.transaction_date.date())
+        if key not in keyed:
+            keyed.add(key)
+            updates.append({"row_id": row.id, "day": key[1]})
+    stmt = (
+        sa.update(transaction)
+        .where(transaction.c.id == sa.bindparam("row_id"))
+        .values(occurrence_date=sa.bindparam("day"))
+    )
+    for start in range(0, len(updates), BACKFILL_BATCH_SIZE):
+        bind.execute(stmt, updates[start : start + BACKFILL_BATCH_SIZE])
+
+    with op.batch_alter_table("transaction", schema=None) as batch_op:
+        batch_op.create_index(
+            "ux_transaction_recurring_occurrence",
+            ["recurring_transaction_id", "occurrence_date"],
+            unique=True,
+            mssql_where=sa.text(
+                "recurring_transaction_id IS NOT NULL AND occurrence_date IS NOT NULL"
+            ),
+            sqlite_where=sa.text(
+                "recurring_transaction_id IS NOT NULL AND occurrence_date IS NOT NULL"
+            ),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("transaction", schema=None) as batch_op:
+        batch_op.drop_index("ux_transaction_recurring_occurrence")
+        batch_op.drop_column("occurrence_date")
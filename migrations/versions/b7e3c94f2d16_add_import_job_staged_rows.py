@@ -0,0 +1,27 @@
+"""Add staged_rows to import_job
+
+Revision ID: b7e3c94f2d16
+Revises: a4d7e2b95c18
+Create Date: 2026-10-17 17:41:09.518204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7e3c94f2d16"
+down_revision = "a4d7e2b95c18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("import_job", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("staged_rows", sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("import_job", schema=None) as batch_op:
+        batch_op.drop_column("staged_rows")
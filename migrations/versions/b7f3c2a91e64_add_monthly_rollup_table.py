@@ -0,0 +1,186 @@
+"""Add monthly_rollup table
+
+The table is filled from the existing transactions as part of the upgrade.
+
+Revision ID: b7f3c2a91e64
+Revises: 5c1e9a7d2b40
+Create Date: 2026-10-17 11:40:02.774310
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7f3c2a91e64"
+down_revision = "5c1e9a7d2b40"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.create_table(
+        "monthly_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=True),
+        sa.Column("transaction_type", sa.String(length=20), nullable=False),
+        sa.Column("affects_balance", sa.Boolean(), nullable=False),
+        sa.Column("amount", sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column("distinct_amount", sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column("transaction_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["account_id"], ["account.id"]),
+        sa.ForeignKeyConstraint(["category_id"], ["category.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "user_id",
+            "year",
+            "month",
+            "account_id",
+            "category_id",
+            "transaction_type",
+            "affects_balance",
+            name="_monthly_rollup_key_uc",
+        ),
+    )
+    _backfill()
+
+
+def _backfill():
+    transaction = sa.table(
+        "transaction",
+        sa.column("id", sa.Integer),
+        sa.column("user_id", sa.Integer),
+        sa.column("account_id", sa.Integer),
+        sa.column("transaction_date", sa.DateTime),
+        sa.column("transaction_type", sa.String),
+        sa.column("affects_balance", sa.Boolean),
+        sa.column("amount", sa.Numeric),
+    )
+    links = sa.table(
+        "transaction_categories",
+        sa.column("transaction_id", sa.Integer),
+        sa.column("category_id", sa.Integer),
+    )
+    rollup = sa.table(
+        "monthly_rollup",
+        sa.column("user_id", sa.Integer),
+        sa.column("year", sa.Integer),
+        sa.column("month", sa.Integer),
+        sa.column("account_id", sa.Integer),
+        sa.column("category_id", sa.Integer),
+        sa.column("transaction_type", sa.String),
+        sa.column("affects_balance", sa.Boolean),
+        sa.column("amount", sa.Numeric),
+        sa.column("distinct_amount", sa.Numeric),
+        sa.column("transaction_count", sa.Integer),
+    )
+    key_columns = [
+        transaction.c.user_id,
+        sa.extract("year", transaction.c.transaction_date),
+        sa.extract("month", transaction.c.transaction_date),
+        transaction.c.account_id,
+    ]
+    tail_columns = [transaction.c.transaction_type, transaction.c.affects_balance]
+
+    # A transaction counts once for each of its categories, and its
+    # de-duplicated amount only on the lowest one
+    per_category = (
+        sa.select(
+            *key_columns,
+            links.c.category_id,
+            *tail_columns,
+            sa.func.sum(transaction.c.amount),
+            sa.func.count(transaction.c.id),
+        )
+        .select_from(
+            transaction.outerjoin(links, transaction.c.id == links.c.transaction_id)
+        )
+        .group_by(*key_columns, links.c.category_id, *tail_columns)
+    )
+    first_category = (
+        sa.select(
+            links.c.transaction_id,
+            sa.func.min(links.c.category_id).label("category_id"),
+        )
+        .group_by(links.c.transaction_id)
+        .subquery()
+    )
+    distinct = (
+        sa.select(
+            *key_columns,
+            first_category.c.category_id,
+            *tail_columns,
+            sa.func.sum(transaction.c.amount),
+        )
+        .select_from(
+            transaction.outerjoin(
+                first_category, transaction.c.id == first_category.c.transaction_id
+            )
+        )
+        .group_by(*key_columns, first_category.c.category_id, *tail_columns)
+    )
+
+    bind = op.get_bind()
+    rows = {}
+    for (
+        user_id,
+        year,
+        month,
+        account_id,
+        category_id,
+        t_type,
+        affects,
+        total,
+        count,
+    ) in bind.execute(per_category):
+        key = (user_id, int(year), int(month), account_id, category_id, t_type)
+        rows[key + (bool(affects),)] = {
+            "amount": total,
+            "distinct_amount": 0,
+            "transaction_count": count,
+        }
+    for (
+        user_id,
+        year,
+        month,
+        account_id,
+        category_id,
+        t_type,
+        affects,
+        total,
+    ) in bind.execute(distinct):
+        key = (user_id, int(year), int(month), account_id, category_id, t_type)
+        rows[key + (bool(affects),)]["distinct_amount"] = total
+
+    values = [
+        dict(
+            zip(
+                (
+                    "user_id",
+                    "year",
+                    "month",
+                    "account_id",
+                    "category_id",
+                    "transaction_type",
+                    "affects_balance",
+                ),
+                key,
+            ),
+            **data,
+        )
+        for key, data in rows.items()
+    ]
+    for start in range(0, len(values), BACKFILL_BATCH_SIZE):
+        bind.execute(sa.insert(rollup), values[start : start + BACKFILL_BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_table("monthly_rollup")
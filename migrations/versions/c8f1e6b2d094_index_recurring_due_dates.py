@@ -0,0 +1,55 @@
+"""Index recurring_transaction due dates and add recurring_schedule
+
+The schedule row starts out with the earliest due date of the existing rules.
+
+Revision ID: c8f1e6b2d094
+Revises: b3e9d4a7f152
+Create Date: 2026-10-18 14:41:19.083526
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c8f1e6b2d094"
+down_revision = "b3e9d4a7f152"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("recurring_transaction", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_recurring_transaction_next_due_date", ["next_due_date"], unique=False
+        )
+        batch_op.create_index(
+            "ix_recurring_transaction_user_next_due_date",
+            ["user_id", "next_due_date"],
+            unique=False,
+        )
+
+    recurring_schedule = op.create_table(
+        "recurring_schedule",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("next_wakeup", sa.Date(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    recurring_transaction = sa.table(
+        "recurring_transaction", sa.column("next_due_date", sa.Date)
+    )
+    earliest = (
+        op.get_bind()
+        .execute(sa.select(sa.func.min(recurring_transaction.c.next_due_date)))
+        .scalar()
+    )
+    op.bulk_insert(recurring_schedule, [{"id": 1, "next_wakeup": earliest}])
+
+
+def downgrade():
+    op.drop_table("recurring_schedule")
+
+    with op.batch_alter_table("recurring_transaction", schema=None) as batch_op:
+        batch_op.drop_index("ix_recurring_transaction_user_next_due_date")
+        batch_op.drop_index("ix_recurring_transaction_next_due_date")
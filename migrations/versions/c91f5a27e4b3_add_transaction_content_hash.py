@@ -0,0 +1,96 @@
+"""Add transaction.content_hash and import_job.duplicate_count
+
+Existing transactions are hashed as part of the upgrade, in batches of
+transaction ids.
+
+Revision ID: c91f5a27e4b3
+Revises: b7e3c94f2d16
+Create Date: 2026-10-18 09:12:36.274915
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from finance_tracker.duplicates import content_hash
+
+
+# revision identifiers, used by Alembic.
+revision = "c91f5a27e4b3"
+down_revision = "b7e3c94f2d16"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table("transaction", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("content_hash", sa.String(length=64), nullable=True)
+        )
+        batch_op.create_index(
+            "ix_transaction_user_content_hash",
+            ["user_id", "content_hash"],
+            unique=False,
+        )
+
+    _backfill()
+
+    with op.batch_alter_table("import_job", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "duplicate_count", sa.Integer(), server_default="0", nullable=False
+            )
+        )
+
+
+def _backfill():
+    transaction = sa.table(
+        "transaction",
+        sa.column("id", sa.Integer),
+        sa.column("user_id", sa.Integer),
+        sa.column("account_id", sa.Integer),
+        sa.column("transaction_date", sa.DateTime),
+        sa.column("amount", sa.Numeric),
+        sa.column("transaction_type", sa.String),
+        sa.column("description", sa.String),
+        sa.column("content_hash", sa.String),
+    )
+    page = (
+        sa.select(
+            transaction.c.id,
+            transaction.c.user_id,
+            transaction.c.account_id,
+            transaction.c.transaction_date,
+            transaction.c.amount,
+            transaction.c.transaction_type,
+            transaction.c.description,
+        )
+        .order_by(transaction.c.id)
+        .limit(BACKFILL_BATCH_SIZE)
+    )
+    stmt = (
+        sa.update(transaction)
+        .where(transaction.c.id == sa.bindparam("row_id"))
+        .values(content_hash=sa.bindparam("hash"))
+    )
+
+    # Walk the table by id so no cursor stays open while updating
+    bind = op.get_bind()
+    last_id = 0
+    while rows := bind.execute(page.where(transaction.c.id > last_id)).all():
+        bind.execute(
+            stmt,
+            [{"row_id": row.id, "hash": content_hash(*row[1:])} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table("import_job", schema=None) as batch_op:
+        batch_op.drop_column("duplicate_count")
+
+    with op.batch_alter_table("transaction", schema=None) as batch_op:
+        batch_op.drop_index("ix_transaction_user_content_hash")
+        batch_op.drop_column("content_hash")
@@ -0,0 +1,102 @@
+"""Add daily_rollup table
+
+The table is filled from the existing transactions as part of the upgrade.
+
+Revision ID: d2a86e4f1c37
+Revises: b7f3c2a91e64
+Create Date: 2026-10-17 13:05:51.209884
+
+"""
+
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d2a86e4f1c37"
+down_revision = "b7f3c2a91e64"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.create_table(
+        "daily_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("transaction_type", sa.String(length=20), nullable=False),
+        sa.Column("affects_balance", sa.Boolean(), nullable=False),
+        sa.Column("amount", sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column("transaction_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "user_id",
+            "day",
+            "transaction_type",
+            "affects_balance",
+            name="_daily_rollup_key_uc",
+        ),
+    )
+    _backfill()
+
+
+def _backfill():
+    transaction = sa.table(
+        "transaction",
+        sa.column("id", sa.Integer),
+        sa.column("user_id", sa.Integer),
+        sa.column("transaction_date", sa.DateTime),
+        sa.column("transaction_type", sa.String),
+        sa.column("affects_balance", sa.Boolean),
+        sa.column("amount", sa.Numeric),
+    )
+    rollup = sa.table(
+        "daily_rollup",
+        sa.column("user_id", sa.Integer),
+        sa.column("day", sa.Date),
+        sa.column("transaction_type", sa.String),
+        sa.column("affects_balance", sa.Boolean),
+        sa.column("amount", sa.Numeric),
+        sa.column("transaction_count", sa.Integer),
+    )
+    # EXTRACT behaves the same on SQL Server and SQLite, unlike CAST(... AS DATE)
+    group_columns = [
+        transaction.c.user_id,
+        sa.extract("year", transaction.c.transaction_date),
+        sa.extract("month", transaction.c.transaction_date),
+        sa.extract("day", transaction.c.transaction_date),
+        transaction.c.transaction_type,
+        transaction.c.affects_balance,
+    ]
+    stmt = sa.select(
+        *group_columns,
+        sa.func.sum(transaction.c.amount),
+        sa.func.count(transaction.c.id),
+    ).group_by(*group_columns)
+
+    bind = op.get_bind()
+    values = [
+        {
+            "user_id": user_id,
+            "day": datetime.date(int(year), int(month), int(day)),
+            "transaction_type": t_type,
+            "affects_balance": bool(affects),
+            "amount": total,
+            "transaction_count": count,
+        }
+        for user_id, year, month, day, t_type, affects, total, count in bind.execute(
+            stmt
+        )
+    ]
+    for start in range(0, len(values), BACKFILL_BATCH_SIZE):
+        bind.execute(sa.insert(rollup), values[start : start + BACKFILL_BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_table("daily_rollup")
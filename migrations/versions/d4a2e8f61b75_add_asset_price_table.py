@@ -0,0 +1,32 @@
+"""Add asset_price table
+
+Revision ID: d4a2e8f61b75
+Revises: c91f5a27e4b3
+Create Date: 2026-10-18 10:03:51.680342
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d4a2e8f61b75"
+down_revision = "c91f5a27e4b3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "asset_price",
+        sa.Column("ticker", sa.String(length=20), nullable=False),
+        sa.Column("price", sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column("fetched_at", sa.DateTime(), nullable=False),
+        sa.Column("source", sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint("ticker"),
+    )
+
+
+def downgrade():
+    op.drop_table("asset_price")
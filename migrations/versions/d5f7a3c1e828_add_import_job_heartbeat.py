@@ -0,0 +1,27 @@
+"""Add import_job.heartbeat_at
+
+Revision ID: d5f7a3c1e828
+Revises: c8f1e6b2d094
+Create Date: 2026-10-18 16:07:42.318640
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d5f7a3c1e828"
+down_revision = "c8f1e6b2d094"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("import_job", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("import_job", schema=None) as batch_op:
+        batch_op.drop_column("heartbeat_at")
@@ -0,0 +1,29 @@
+"""Add user data_version for cache invalidation
+
+Revision ID: e5b19c3d7a82
+Revises: d2a86e4f1c37
+Create Date: 2026-10-17 14:22:37.518204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e5b19c3d7a82"
+down_revision = "d2a86e4f1c37"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("data_version", sa.Integer(), nullable=False, server_default="0")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.drop_column("data_version")
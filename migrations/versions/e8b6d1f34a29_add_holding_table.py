@@ -0,0 +1,96 @@
+"""Add holding table
+
+Positions are replayed from the existing investment transactions as part of
+the upgrade.
+
+Revision ID: e8b6d1f34a29
+Revises: d4a2e8f61b75
+Create Date: 2026-10-18 11:26:14.903177
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from finance_tracker.holdings import ZERO, apply_trade
+
+
+# revision identifiers, used by Alembic.
+revision = "e8b6d1f34a29"
+down_revision = "d4a2e8f61b75"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "holding",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("asset_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("cost_basis", sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column("realized_pnl", sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.ForeignKeyConstraint(["asset_id"], ["asset.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("user_id", "asset_id"),
+    )
+    _backfill()
+
+
+def _backfill():
+    trade = sa.table(
+        "investment_transaction",
+        sa.column("id", sa.Integer),
+        sa.column("user_id", sa.Integer),
+        sa.column("asset_id", sa.Integer),
+        sa.column("transaction_type", sa.String),
+        sa.column("quantity", sa.Numeric),
+        sa.column("price_per_unit", sa.Numeric),
+        sa.column("transaction_date", sa.DateTime),
+    )
+    holding = sa.table(
+        "holding",
+        sa.column("user_id", sa.Integer),
+        sa.column("asset_id", sa.Integer),
+        sa.column("quantity", sa.Numeric),
+        sa.column("cost_basis", sa.Numeric),
+        sa.column("realized_pnl", sa.Numeric),
+    )
+    stmt = sa.select(
+        trade.c.user_id,
+        trade.c.asset_id,
+        trade.c.transaction_type,
+        trade.c.quantity,
+        trade.c.price_per_unit,
+    ).order_by(trade.c.transaction_date, trade.c.id)
+
+    bind = op.get_bind()
+    positions = {}
+    for row in bind.execute(stmt):
+        key = (row.user_id, row.asset_id)
+        positions[key] = apply_trade(
+            positions.get(key, (ZERO, ZERO, ZERO)),
+            row.transaction_type,
+            row.quantity,
+            row.price_per_unit,
+        )
+    if positions:
+        bind.execute(
+            sa.insert(holding),
+            [
+                {
+                    "user_id": user_id,
+                    "asset_id": asset_id,
+                    "quantity": quantity,
+                    "cost_basis": cost_basis,
+                    "realized_pnl": realized_pnl,
+                }
+                for (user_id, asset_id), (quantity, cost_basis, realized_pnl) in (
+                    positions.items()
+                )
+            ],
+        )
+
+
+def downgrade():
+    op.drop_table("holding")
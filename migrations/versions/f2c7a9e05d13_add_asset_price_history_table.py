@@ -0,0 +1,32 @@
+"""Add asset_price_history table
+
+Revision ID: f2c7a9e05d13
+Revises: e8b6d1f34a29
+Create Date: 2026-10-18 12:04:51.220418
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f2c7a9e05d13"
+down_revision = "e8b6d1f34a29"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "asset_price_history",
+        sa.Column("ticker", sa.String(length=20), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("close", sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column("source", sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint("ticker", "day"),
+    )
+
+
+def downgrade():
+    op.drop_table("asset_price_history")
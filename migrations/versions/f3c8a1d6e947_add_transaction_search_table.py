@@ -0,0 +1,170 @@
+"""Add transaction_search table and full-text index
+
+Existing transactions are indexed as part of the upgrade, in batches of
+transaction ids.
+
+Revision ID: f3c8a1d6e947
+Revises: e5b19c3d7a82
+Create Date: 2026-10-17 15:41:09.736215
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from finance_tracker.search import document_for
+
+
+# revision identifiers, used by Alembic.
+revision = "f3c8a1d6e947"
+down_revision = "e5b19c3d7a82"
+branch_labels = None
+depends_on = None
+
+FTS_TABLE = "transaction_search_fts"
+BACKFILL_BATCH_SIZE = 500
+
+SQLITE_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "document, content='transaction_search', content_rowid='transaction_id')",
+    f"CREATE TRIGGER IF NOT EXISTS transaction_search_ai AFTER INSERT ON "
+    f"transaction_search BEGIN INSERT INTO {FTS_TABLE}(rowid, document) "
+    f"VALUES (new.transaction_id, new.document); END",
+    f"CREATE TRIGGER IF NOT EXISTS transaction_search_ad AFTER DELETE ON "
+    f"transaction_search BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) "
+    f"VALUES ('delete', old.transaction_id, old.document); END",
+    f"CREATE TRIGGER IF NOT EXISTS transaction_search_au AFTER UPDATE ON "
+    f"transaction_search BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) "
+    f"VALUES ('delete', old.transaction_id, old.document); "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) "
+    f"VALUES (new.transaction_id, new.document); END",
+]
+
+# Full-text DDL cannot run inside a user transaction, and is skipped when the
+# full-text feature is not installed (the app then falls back to LIKE).
+MSSQL_FULLTEXT_DDL = """
+IF FULLTEXTSERVICEPROPERTY('IsFullTextInstalled') = 1
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'ftc_finance')
+        EXEC('CREATE FULLTEXT CATALOG ftc_finance');
+    EXEC('CREATE FULLTEXT INDEX ON [transaction_search] ([document])
+          KEY INDEX pk_transaction_search ON ftc_finance
+          WITH CHANGE_TRACKING AUTO');
+END
+"""
+
+
+def upgrade():
+    op.create_table(
+        "transaction_search",
+        sa.Column("transaction_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("document", sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(["transaction_id"], ["transaction.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("transaction_id", name="pk_transaction_search"),
+    )
+    with op.batch_alter_table("transaction_search", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_transaction_search_user_id", ["user_id"], unique=False
+        )
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+    elif dialect == "mssql":
+        with op.get_context().autocommit_block():
+            op.execute(MSSQL_FULLTEXT_DDL)
+
+    _backfill()
+
+
+def _backfill():
+    transaction = sa.table(
+        "transaction",
+        sa.column("id", sa.Integer),
+        sa.column("user_id", sa.Integer),
+        sa.column("description", sa.String),
+        sa.column("notes", sa.Text),
+    )
+    category_links = sa.table(
+        "transaction_categories",
+        sa.column("transaction_id", sa.Integer),
+        sa.column("category_id", sa.Integer),
+    )
+    category = sa.table("category", sa.column("id", sa.Integer), sa.column("name"))
+    tag_links = sa.table(
+        "transaction_tags",
+        sa.column("transaction_id", sa.Integer),
+        sa.column("tag_id", sa.Integer),
+    )
+    tag = sa.table("tag", sa.column("id", sa.Integer), sa.column("name"))
+    search = sa.table(
+        "transaction_search",
+        sa.column("transaction_id", sa.Integer),
+        sa.column("user_id", sa.Integer),
+        sa.column("document", sa.Text),
+    )
+
+    page = (
+        sa.select(
+            transaction.c.id,
+            transaction.c.user_id,
+            transaction.c.description,
+            transaction.c.notes,
+        )
+        .order_by(transaction.c.id)
+        .limit(BACKFILL_BATCH_SIZE)
+    )
+    category_names = sa.select(category_links.c.transaction_id, category.c.name).join(
+        category, category.c.id == category_links.c.category_id
+    )
+    tag_names = sa.select(tag_links.c.transaction_id, tag.c.name).join(
+        tag, tag.c.id == tag_links.c.tag_id
+    )
+
+    # Walk the table by id so no cursor stays open while inserting
+    bind = op.get_bind()
+    last_id = 0
+    while rows := bind.execute(page.where(transaction.c.id > last_id)).all():
+        first_id, last_id = rows[0].id, rows[-1].id
+        names = {row.id: ([], []) for row in rows}
+        for index, (links, stmt) in enumerate(
+            ((category_links, category_names), (tag_links, tag_names))
+        ):
+            for transaction_id, name in bind.execute(
+                stmt.where(links.c.transaction_id.between(first_id, last_id))
+            ):
+                names[transaction_id][index].append(name)
+        bind.execute(
+            sa.insert(search),
+            [
+                {
+                    "transaction_id": row.id,
+                    "user_id": row.user_id,
+                    "document": document_for(
+                        row.description, row.notes, *names[row.id]
+                    ),
+                }
+                for row in rows
+            ],
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif dialect == "mssql":
+        with op.get_context().autocommit_block():
+            op.execute(
+                "IF EXISTS (SELECT 1 FROM sys.fulltext_indexes "
+                "WHERE object_id = OBJECT_ID('transaction_search')) "
+                "EXEC('DROP FULLTEXT INDEX ON [transaction_search]')"
+            )
+
+    with op.batch_alter_table("transaction_search", schema=None) as batch_op:
+        batch_op.drop_index("ix_transaction_search_user_id")
+
+    op.drop_table("transaction_search")
@@ -1,9 +1,29 @@
 # run.py
-from finance_tracker import create_app, db
+import click
+from datetime import datetime, timezone
+from finance_tracker import (
+    create_app,
+    db,
+    duplicates,
+    holdings,
+    import_jobs,
+    price_history,
+    recurring,
+    rollups,
+    search,
+    services,
+)
 
 # Corrected import: We now import Transaction, not Expense.
 # It's also good practice to import all models that might be used in CLI commands.
-from finance_tracker.models import Transaction, User, Account
+from finance_tracker.models import (
+    Account,
+    DailyRollup,
+    MonthlyRollup,
+    Transaction,
+    TransactionSearch,
+    User,
+)
 from flask_migrate import upgrade
 
 # The create_app function handles all application setup
@@ -29,6 +49,10 @@ def clear_transactions_command():
     with app.app_context():
         try:
             # The query now targets the Transaction model.
+            # The derived search documents and rollups go with them
+            db.session.query(TransactionSearch).delete()
+            db.session.query(MonthlyRollup).delete()
+            db.session.query(DailyRollup).delete()
             num_deleted = db.session.query(Transaction).delete()
             db.session.commit()
             print(f"Success: Deleted {num_deleted} old transaction(s).")
@@ -37,6 +61,134 @@ def clear_transactions_command():
             print(f"Error clearing transactions: {e}")
 
 
+@app.cli.command("rebuild-rollups")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user.")
+def rebuild_rollups_command(user_id):
+    """Recomputes the monthly and daily rollup tables from the raw transactions."""
+    with app.app_context():
+        try:
+            row_count = rollups.rebuild(user_id=user_id)
+            db.session.commit()
+            print(f"Success: Rebuilt {row_count} rollup row(s).")
+        except Exception as e:
+            db.session.rollback()
+            raise click.ClickException(f"Could not rebuild the rollups: {e}") from e
+
+
+@app.cli.command("rebuild-search-index")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user.")
+def rebuild_search_index_command(user_id):
+    """Rebuilds the transaction search documents from the raw transactions."""
+    with app.app_context():
+        try:
+            document_count = search.rebuild(user_id=user_id)
+            db.session.commit()
+            print(f"Success: Indexed {document_count} transaction(s).")
+        except Exception as e:
+            db.session.rollback()
+            raise click.ClickException(
+                f"Could not rebuild the search index: {e}"
+            ) from e
+
+
+@app.cli.command("rebuild-content-hashes")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user.")
+def rebuild_content_hashes_command(user_id):
+    """Recomputes the duplicate-detection hashes of existing transactions."""
+    with app.app_context():
+        try:
+            transaction_count = duplicates.rebuild(user_id=user_id)
+            db.session.commit()
+            print(f"Success: Hashed {transaction_count} transaction(s).")
+        except Exception as e:
+            db.session.rollback()
+            raise click.ClickException(
+                f"Could not rebuild the content hashes: {e}"
+            ) from e
+
+
+@app.cli.command("reconcile-holdings")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user.")
+def reconcile_holdings_command(user_id):
+    """Rebuilds the holding table from the investment transactions."""
+    with app.app_context():
+        try:
+            holding_count = holdings.rebuild(user_id=user_id)
+            db.session.commit()
+            print(f"Success: Rebuilt {holding_count} holding(s).")
+        except Exception as e:
+            db.session.rollback()
+            raise click.ClickException(f"Could not reconcile the holdings: {e}") from e
+
+
+@app.cli.command("purge-staged-imports")
+def purge_staged_imports_command():
+    """Deletes validated imports that were not committed within IMPORT_STAGING_TTL."""
+    with app.app_context():
+        try:
+            job_count = import_jobs.purge_expired_staged_jobs()
+            db.session.commit()
+            print(f"Success: Purged {job_count} expired staged import(s).")
+        except Exception as e:
+            db.session.rollback()
+            raise click.ClickException(f"Could not purge staged imports: {e}") from e
+
+
+@app.cli.command("refresh-prices")
+def refresh_prices_command():
+    """Fetches fresh quotes for every held ticker whose stored price is stale."""
+    with app.app_context():
+        try:
+            result = services.refresh_prices()
+            print(
+                f"Success: Refreshed {len(result['refreshed'])} of "
+                f"{result['tickers']} held ticker(s)."
+            )
+            if result["failed"]:
+                print(f"Could not refresh: {', '.join(result['failed'])}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error refreshing prices: {e}")
+
+
+@app.cli.command("load-price-history")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def load_price_history_command(path):
+    """Loads daily closing prices from a CSV file with ticker, date and close columns."""
+    with app.app_context():
+        try:
+            loaded = price_history.load_csv(path)
+            db.session.commit()
+            print(f"Success: Loaded {loaded} daily price(s) from {path}.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error loading the price history: {e}")
+
+
+@app.cli.command("generate-recurring")
+@click.option("--shard", default="0/1", help="Only handle shard i of n, given as i/n.")
+def generate_recurring_command(shard):
+    """Generates the due recurring transactions, resuming an interrupted run."""
+    with app.app_context():
+        try:
+            shard_index, shard_count = recurring.parse_shard(shard)
+            report = recurring.run_job(
+                datetime.now(timezone.utc).date(), shard_index, shard_count
+            )
+            print(
+                f"Success: Generated {report['transactions_created']} transaction(s) "
+                f"for shard {report['shard']}."
+            )
+            if report["failed_rule_ids"]:
+                print(f"Failed rules: {report['failed_rule_ids']}")
+        except Exception as e:
+            db.session.rollback()
+            # Exit non-zero so the scheduled job retries and resumes the shard
+            raise click.ClickException(
+                f"Could not generate recurring transactions: {e}"
+            ) from e
+
+
 # This block runs the app for local development
 if __name__ == "__main__":
     # We do not run migrations automatically on startup.
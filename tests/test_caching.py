@@ -0,0 +1,138 @@
+# tests/test_caching.py
+
+from finance_tracker import db
+from finance_tracker.caching import cache, MemoryCache, _MISSING
+from finance_tracker.models import User, Account, Category
+from sqlalchemy import select
+import pytest
+
+
+@pytest.fixture(scope="function")
+def memory_cache():
+    """Swaps the testing NullCache for a real in-process cache."""
+    original_backend = cache.backend
+    cache.backend = MemoryCache(max_entries=16)
+    yield cache.backend
+    cache.backend = original_backend
+
+
+@pytest.mark.unit
+def test_memory_cache_evicts_least_recently_used_and_expired_entries():
+    """
+    GIVEN a MemoryCache with room for two entries
+    WHEN a third entry is stored, and an entry outlives its timeout
+    THEN the least recently used entry is evicted and the expired one is a miss
+    """
+    backend = MemoryCache(max_entries=2)
+    backend.set("a", 1, timeout=60)
+    backend.set("b", 2, timeout=60)
+    assert backend.get("a") == 1  # "a" is now the most recently used
+    backend.set("c", 3, timeout=60)
+
+    assert backend.get("b") is _MISSING
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+
+    backend.set("stale", None, timeout=-1)
+    assert backend.get("stale") is _MISSING
+
+
+@pytest.mark.feature
+def test_cached_chart_is_invalidated_by_a_new_transaction(
+    auth_client, test_app, memory_cache
+):
+    """
+    GIVEN a user whose monthly spending chart has been served from the cache
+    WHEN the user adds a transaction
+    THEN the data version is bumped and the next request returns fresh data
+    """
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(name="Cache Bank", account_type="Checking", user_id=user.id)
+        category = Category(name="Coffee", user_id=user.id)
+        db.session.add_all([account, category])
+        db.session.commit()
+        version_before = user.data_version
+        chart_url = f"/api/monthly_spending?category_id={category.id}&year=2025"
+
+        first = auth_client.get(chart_url).get_json()
+        assert first == auth_client.get(chart_url).get_json()
+        assert len(memory_cache._entries) == 1
+
+        response = auth_client.post(
+            "/add_transaction",
+            data={
+                "description": "Cached Coffee",
+                "amount": "12.00",
+                "transaction_type": "expense",
+                "account": account.id,
+                "category": category.id,
+                "transaction_date": "2025-05-05T08:00",
+                "affects_balance": "y",
+            },
+        )
+        assert response.status_code == 302
+
+        db.session.refresh(user)
+        assert user.data_version == version_before + 1
+        second = auth_client.get(chart_url).get_json()
+        assert first["data"][4] == 0
+        assert second["data"][4] == 12.0
+
+
+@pytest.mark.feature
+def test_cached_net_worth_follows_price_refreshes(auth_client, test_app, memory_cache):
+    """
+    GIVEN a net worth report cached with the stored quote of a holding
+    WHEN a newer quote is stored for the ticker
+    THEN the next report values the holding at the new price
+    """
+    from datetime import datetime, timedelta
+    from decimal import Decimal
+    from finance_tracker import services
+    from finance_tracker.models import Asset, AssetPrice, Holding
+
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        asset = Asset(name="Cache Co", ticker_symbol="CCO", asset_type="Stock")
+        db.session.add(asset)
+        db.session.flush()
+        fetched_at = datetime(2025, 3, 1, 12, 0)
+        db.session.add_all(
+            [
+                Holding(
+                    user_id=user.id,
+                    asset_id=asset.id,
+                    quantity=Decimal("10"),
+                    cost_basis=Decimal("50"),
+                    realized_pnl=Decimal("0"),
+                ),
+                AssetPrice(
+                    ticker="CCO", price=Decimal("10"), fetched_at=fetched_at, source="t"
+                ),
+            ]
+        )
+        db.session.commit()
+        user_id, asset_id = user.id, asset.id
+
+    services.price_cache.clear()
+    assert "₹100.00" in auth_client.get("/report/net_worth").get_data(as_text=True)
+
+    with test_app.app_context():
+        quote = db.session.get(AssetPrice, "CCO")
+        quote.price = Decimal("12")
+        quote.fetched_at = fetched_at + timedelta(minutes=15)
+        db.session.commit()
+    services.price_cache.clear()
+    assert "₹120.00" in auth_client.get("/report/net_worth").get_data(as_text=True)
+
+    with test_app.app_context():
+        db.session.delete(db.session.get(AssetPrice, "CCO"))
+        db.session.delete(db.session.get(Holding, (user_id, asset_id)))
+        db.session.delete(db.session.get(Asset, asset_id))
+        db.session.commit()
+    services.price_cache.clear()
@@ -1,8 +1,18 @@
 # tests/test_features.py
-from finance_tracker.models import ActivityLog, Account, Category, Transaction
+from finance_tracker.models import (
+    ActivityLog,
+    Account,
+    Category,
+    Tag,
+    Transaction,
+    User,
+)
 from finance_tracker import db
 from sqlalchemy import select
+from datetime import datetime
 import decimal
+import csv
+import io
 import pytest
 
 
@@ -50,3 +60,68 @@ def test_add_transaction_creates_activity_log(auth_client, test_app):
         assert latest_log is not None
         assert latest_log.user_id == 1
         assert "Added transaction: 'Coffee Shop'" in latest_log.description
+
+
+@pytest.mark.feature
+def test_export_transactions_streams_rows_in_batches(
+    auth_client, test_app, monkeypatch
+):
+    """
+    GIVEN a user with more transactions than one export batch
+    WHEN they export their transactions to CSV
+    THEN the response is streamed page by page and contains every row exactly
+    once, newest first, with its categories and tags
+    """
+    monkeypatch.setattr("finance_tracker.routes.EXPORT_BATCH_SIZE", 2)
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(name="Export Bank", account_type="Savings", user_id=user.id)
+        category = Category(name="Utilities", user_id=user.id)
+        tag = Tag(name="monthly", user_id=user.id)
+        db.session.add_all([account, category, tag])
+        db.session.flush()
+        for day in range(1, 6):
+            txn = Transaction(
+                description=f"Bill {day}",
+                amount=decimal.Decimal("10.00"),
+                transaction_type="expense",
+                transaction_date=datetime(2025, 2, day, 9, 0),
+                user_id=user.id,
+                account_id=account.id,
+            )
+            txn.categories.append(category)
+            txn.tags.append(tag)
+            db.session.add(txn)
+        # Shares its timestamp with "Bill 4", across a page boundary
+        late = Transaction(
+            description="Bill 4 (late fee)",
+            amount=decimal.Decimal("10.00"),
+            transaction_type="expense",
+            transaction_date=datetime(2025, 2, 4, 9, 0),
+            user_id=user.id,
+            account_id=account.id,
+        )
+        late.categories.append(category)
+        late.tags.append(tag)
+        db.session.add(late)
+        db.session.commit()
+
+    response = auth_client.get("/export-transactions")
+    assert response.status_code == 200
+    assert response.is_streamed
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][:3] == ["Date", "Time", "Description"]
+    assert [row[2] for row in rows[1:]] == [
+        "Bill 5",
+        "Bill 4 (late fee)",
+        "Bill 4",
+        "Bill 3",
+        "Bill 2",
+        "Bill 1",
+    ]
+    assert all(
+        row[5:9] == ["Export Bank (Savings)", "Yes", "Utilities", "monthly"]
+        for row in rows[1:]
+    )
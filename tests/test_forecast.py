@@ -0,0 +1,127 @@
+# tests/test_forecast.py
+
+from finance_tracker import db, forecast, recurring
+from finance_tracker.models import Account, RecurringTransaction, User
+from datetime import date, datetime, timezone
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, select
+import decimal
+import numpy as np
+import pytest
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "first_due, interval",
+    [
+        (date(2025, 1, 31), "monthly"),
+        (date(2024, 2, 29), "yearly"),
+        (date(2025, 3, 3), "weekly"),
+        (date(2025, 12, 30), "daily"),
+    ],
+)
+def test_occurrence_days_match_the_recurring_job(first_due, interval):
+    """
+    GIVEN a rule first due on an awkward date
+    WHEN it is expanded with NumPy date arithmetic
+    THEN the dates are exactly those the recurring job would generate
+    """
+    until = date(2029, 3, 1) if interval == "yearly" else date(2026, 2, 15)
+    expected = recurring.occurrences(first_due, interval, until)
+    days = forecast.occurrence_days(first_due, interval, until)
+    assert days.astype(object).tolist() == expected
+    assert forecast.occurrence_days(until, interval, first_due).size == 0
+
+    # Resuming part way, as from a rule's next_due_date, keeps the same dates
+    since = date(2025, 6, 1)
+    resumed = forecast.occurrence_days(first_due, interval, until, since=since)
+    assert resumed.astype(object).tolist() == [day for day in expected if day >= since]
+    assert recurring.occurrences(first_due, interval, until, since=since) == [
+        day for day in expected if day >= since
+    ]
+
+
+@pytest.mark.feature
+def test_cashflow_forecast_projects_balances_per_account(auth_client, test_app):
+    """
+    GIVEN two accounts, a monthly salary, a weekly expense and an overdue bill
+    WHEN the forecast for two months is computed
+    THEN each account's balance moves on its own due dates, overdue amounts
+    count on the first day, and the API serves the same projection
+    """
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        checking = Account(
+            name="Checking",
+            account_type="Checking",
+            balance=decimal.Decimal("1000.00"),
+            user_id=user.id,
+        )
+        card = Account(name="Card", account_type="Credit Card", user_id=user.id)
+        db.session.add_all([checking, card])
+        db.session.flush()
+
+        def rule(description, amount, transaction_type, interval, due, account):
+            return RecurringTransaction(
+                description=description,
+                amount=decimal.Decimal(amount),
+                transaction_type=transaction_type,
+                recurrence_interval=interval,
+                start_date=due,
+                next_due_date=due,
+                user_id=user.id,
+                account_id=account.id,
+            )
+
+        db.session.add_all(
+            [
+                rule(
+                    "Salary", "500.00", "income", "monthly", date(2025, 1, 31), checking
+                ),
+                rule("Coffee", "10.25", "expense", "weekly", date(2025, 1, 6), card),
+                rule(
+                    "Overdue",
+                    "100.00",
+                    "expense",
+                    "monthly",
+                    date(2024, 12, 1),
+                    checking,
+                ),
+            ]
+        )
+        db.session.commit()
+
+        days, accounts, balances = forecast.cashflow_forecast(
+            user.id, date(2025, 1, 1), months=2
+        )
+        assert str(days[0]) == "2025-01-01" and str(days[-1]) == "2025-02-28"
+        assert [account.name for account in accounts] == ["Card", "Checking"]
+        by_day = dict(zip(days.astype(str), balances.tolist()))
+        # The overdue December bill lands on day one, January's on the 1st too
+        assert by_day["2025-01-01"] == [0.0, 800.0]
+        assert by_day["2025-01-06"] == [-10.25, 800.0]
+        assert by_day["2025-01-31"] == [-41.0, 1300.0]
+        assert by_day["2025-02-28"] == [-82.0, 1700.0]
+
+        response = auth_client.get("/api/cashflow_forecast?months=2")
+        assert response.status_code == 200
+        data = response.get_json()
+        today = datetime.now(timezone.utc).date()
+        assert len(data["labels"]) == (today + relativedelta(months=2) - today).days
+        assert [account["name"] for account in data["accounts"]] == ["Card", "Checking"]
+        assert np.allclose(
+            data["total"],
+            [
+                sum(account["data"][i] for account in data["accounts"])
+                for i in range(len(data["labels"]))
+            ],
+        )
+
+        for query in ("months=0", "months=25", "months=soon"):
+            assert auth_client.get(f"/api/cashflow_forecast?{query}").status_code == 400
+
+        db.session.execute(delete(RecurringTransaction).filter_by(user_id=user.id))
+        db.session.execute(delete(Account).filter_by(user_id=user.id))
+        db.session.commit()
@@ -0,0 +1,429 @@
+# tests/test_import.py
+
+from finance_tracker import db, duplicates, rollups, search
+from finance_tracker.import_parser import ImportRowError, ParsedRow, parse_row
+from finance_tracker.models import (
+    User,
+    Account,
+    Category,
+    ImportJob,
+    Tag,
+    Transaction,
+)
+from sqlalchemy import select, update
+from datetime import datetime
+import decimal
+import io
+import pytest
+
+CSV_HEADER = (
+    "Date,Time,Description,Amount,DR/CR,Account,Is Expense?,Categories,Tags,Notes\n"
+)
+
+
+@pytest.fixture(scope="function")
+def import_accounts(auth_client, test_app):
+    """Creates two accounts and an existing category for the test user."""
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        db.session.add_all(
+            [
+                Account(
+                    name="Main",
+                    account_type="Checking",
+                    balance=decimal.Decimal("100.00"),
+                    user_id=user.id,
+                ),
+                Account(name="Card", account_type="Credit Card", user_id=user.id),
+                Category(name="Food", user_id=user.id),
+            ]
+        )
+        db.session.commit()
+        yield user
+
+
+@pytest.mark.feature
+def test_csv_import_bulk_inserts_rows_links_and_balances(
+    auth_client, test_app, import_accounts
+):
+    """
+    GIVEN a user with two accounts and one existing category
+    WHEN a CSV with new and existing categories/tags and one bad row is imported
+    THEN the valid rows, their links, balances, rollups and search documents are written
+    """
+    csv_data = CSV_HEADER + (
+        "2025-07-01,09:00 AM,Salary,1000.00,CR,Main (Checking),,Income,work,\n"
+        "2025-07-02,01:30 PM,Lunch,25.50,DR,Main (Checking),Yes,food;Dining,work;Work,spicy\n"
+        "2025-07-03,08:00 PM,Groceries,40.00,DR,Card (Credit Card),Yes,Food,,\n"
+        "2025-07-04,10:00 AM,Refund,5.00,DR,Card (Credit Card),No,,,\n"
+        "2025-07-05,10:00 AM,Ghost,1.00,DR,Missing (Checking),Yes,,,\n"
+    )
+    response = auth_client.post(
+        "/import",
+        data={"transaction_file": (io.BytesIO(csv_data.encode()), "statement.csv")},
+        content_type="multipart/form-data",
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+    assert b"Successfully imported 4 transactions." in response.data
+    assert b"Account &#39;Missing&#39; (Checking) not found." in response.data
+
+    with test_app.app_context():
+        user_id = import_accounts.id
+        accounts = {
+            account.name: account
+            for account in db.session.execute(
+                select(Account).filter_by(user_id=user_id)
+            ).scalars()
+        }
+        assert accounts["Main"].balance == decimal.Decimal("1074.50")
+        assert accounts["Card"].balance == decimal.Decimal("-40.00")
+
+        lunch = db.session.execute(
+            select(Transaction).filter_by(description="Lunch")
+        ).scalar_one()
+        assert sorted(c.name for c in lunch.categories) == ["Dining", "Food"]
+        assert [tag.name for tag in lunch.tags] == ["work"]
+        assert lunch.notes == "spicy"
+        refund = db.session.execute(
+            select(Transaction).filter_by(description="Refund")
+        ).scalar_one()
+        assert refund.affects_balance is False
+
+        # Existing names are reused case-insensitively, new ones created once
+        category_names = db.session.execute(
+            select(Category.name).filter_by(user_id=user_id)
+        ).scalars()
+        assert sorted(category_names) == ["Dining", "Food", "Income"]
+        assert db.session.execute(
+            select(Tag.name).filter_by(user_id=user_id)
+        ).scalars().all() == ["work"]
+
+        stmt = search.apply_filter(select(Transaction.description), user_id, "dining")
+        assert db.session.execute(stmt).scalars().all() == ["Lunch"]
+
+        expense_by_category = rollups.category_spending(user_id, 2025, 7)
+        food_id = db.session.execute(
+            select(Category.id).filter_by(user_id=user_id, name="Food")
+        ).scalar_one()
+        assert expense_by_category[food_id] == decimal.Decimal("65.50")
+
+
+@pytest.mark.feature
+def test_commit_import_data_uses_the_bulk_path(auth_client, test_app, import_accounts):
+    """
+    GIVEN validated rows posted as JSON to the commit endpoint
+    WHEN the import is committed
+    THEN the transactions are created and the account balance is adjusted once
+    """
+    rows = [
+        ["2025-08-01", "09:00 AM", "Rent", "300.00", "DR", "Main (Checking)"]
+        + ["Yes", "Housing", "", ""],
+        ["2025-08-02", "09:00 AM", "Bonus", "50.00", "CR", "Main (Checking)"]
+        + ["", "", "", ""],
+    ]
+    response = auth_client.post("/api/import/commit", json={"transactions": rows})
+    assert response.status_code == 200
+
+    with test_app.app_context():
+        main = db.session.execute(select(Account).filter_by(name="Main")).scalar_one()
+        assert main.balance == decimal.Decimal("-150.00")
+        rent = db.session.execute(
+            select(Transaction).filter_by(description="Rent")
+        ).scalar_one()
+        assert [c.name for c in rent.categories] == ["Housing"]
+
+
+@pytest.mark.feature
+def test_background_import_job_commits_chunks_and_reports_progress(
+    auth_client, test_app, import_accounts, tmp_path, monkeypatch
+):
+    """
+    GIVEN a CSV larger than one import chunk, with one invalid row
+    WHEN it is imported as a background job
+    THEN every valid row is committed and the status endpoint reports the progress
+    """
+    monkeypatch.setitem(test_app.config, "IMPORT_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setitem(test_app.config, "IMPORT_CHUNK_SIZE", 2)
+    csv_data = CSV_HEADER + "".join(
+        f"2025-09-0{day},10:00 AM,Item {day},10.00,DR,Main (Checking),Yes,,,\n"
+        for day in range(1, 6)
+    )
+    csv_data += "2025-09-06,10:00 AM,Broken,abc,DR,Main (Checking),Yes,,,\n"
+
+    response = auth_client.post(
+        "/api/import/jobs",
+        data={"transaction_file": (io.BytesIO(csv_data.encode()), "big.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+
+    status = auth_client.get(status_url).get_json()
+    assert status["status"] == "completed"
+    assert status["rows_processed"] == 6
+    assert status["rows_imported"] == 5
+    assert status["error_count"] == 1
+    assert "Row 7: Invalid date/time" in status["errors"][0]
+    assert status["finished_at"] is not None
+    assert list(tmp_path.iterdir()) == []  # the spooled upload is removed
+
+    with test_app.app_context():
+        main = db.session.execute(select(Account).filter_by(name="Main")).scalar_one()
+        assert main.balance == decimal.Decimal("50.00")
+
+    # The status endpoint requires a login
+    auth_client.get("/logout")
+    assert auth_client.get(status_url).status_code in (302, 401)
+
+
+@pytest.mark.feature
+def test_import_job_without_heartbeat_is_reported_failed(
+    auth_client, test_app, import_accounts, tmp_path, monkeypatch
+):
+    """
+    GIVEN a background import whose worker stopped while the job was running
+    WHEN its status is polled after IMPORT_JOB_STALE_AFTER has passed
+    THEN the job is reported as failed and its spooled upload is removed
+    """
+    monkeypatch.setitem(test_app.config, "IMPORT_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr("finance_tracker.import_jobs.start_job", lambda job_id: None)
+    csv_data = CSV_HEADER + "2025-09-01,10:00 AM,Item,10.00,DR,Main (Checking),Yes,,,\n"
+    response = auth_client.post(
+        "/api/import/jobs",
+        data={"transaction_file": (io.BytesIO(csv_data.encode()), "lost.csv")},
+        content_type="multipart/form-data",
+    )
+    job_id = response.get_json()["job_id"]
+    status_url = response.get_json()["status_url"]
+
+    with test_app.app_context():
+        db.session.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id)
+            .values(status="running", started_at=datetime.now())
+        )
+        db.session.commit()
+    assert auth_client.get(status_url).get_json()["status"] == "running"
+
+    with test_app.app_context():
+        db.session.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id)
+            .values(heartbeat_at=datetime(2020, 1, 1))
+        )
+        db.session.commit()
+    status = auth_client.get(status_url).get_json()
+    assert status["status"] == "failed"
+    assert status["errors"] == ["Import stopped responding after 0 rows."]
+    assert status["finished_at"] is not None
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.unit
+def test_parse_row_collects_every_error_and_round_trips():
+    """
+    GIVEN the shared import row parser
+    WHEN a valid and an invalid row are parsed
+    THEN the valid row survives serialization and the invalid one lists each problem
+    """
+    account_ids = {("main", "checking"): 7}
+    parsed = parse_row(
+        ["2025-07-02", "01:30 PM", " Lunch ", "25.50", "dr", "Main (Checking)"]
+        + ["No", "Food; Dining", "", " note "],
+        2,
+        account_ids,
+    )
+    assert parsed.account_id == 7
+    assert parsed.transaction_type == "expense"
+    assert parsed.affects_balance is False
+    assert parsed.category_names == ["Food", "Dining"]
+    assert (parsed.description, parsed.notes) == ("Lunch", "note")
+
+    restored = ParsedRow.from_list(parsed.to_list())
+    assert restored.transaction_date == parsed.transaction_date
+    assert restored.amount == decimal.Decimal("25.50")
+
+    with pytest.raises(ImportRowError) as excinfo:
+        parse_row(
+            ["2025-13-01", "09:00 AM", "Bad", "1", "XX", "Nowhere"] + ["", "", "", ""],
+            3,
+            account_ids,
+        )
+    assert excinfo.value.row_num == 3
+    assert len(excinfo.value.errors) == 3
+    assert str(excinfo.value).startswith("Row 3: DR/CR column must be")
+
+
+@pytest.mark.feature
+def test_validated_rows_are_staged_and_committed_once(
+    auth_client, test_app, import_accounts
+):
+    """
+    GIVEN a CSV file validated through the import API
+    WHEN the staging token it returns is committed twice
+    THEN the staged rows are imported once and the reused token is rejected
+    """
+    csv_data = CSV_HEADER + (
+        "2025-08-01,09:00 AM,Rent,300.00,DR,Main (Checking),Yes,Housing,,\n"
+        ",,,,,,,,,\n"
+        "2025-08-02,09:00 AM,Bonus,50.00,CR,Main (Checking),,,,\n"
+        "2025-08-03,09:00 AM,Typo,1.00,DR,Main (Checking),Maybe,,,\n"
+    )
+    response = auth_client.post(
+        "/api/import/validate",
+        data={"transaction_file": (io.BytesIO(csv_data.encode()), "statement.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["summary"] == {
+        "total_rows": 4,
+        "valid_count": 2,
+        "invalid_count": 1,
+        "duplicate_count": 0,
+    }
+    assert report["invalid_rows"][0]["row_number"] == 5
+    token = report["staging_token"]
+    assert token
+
+    response = auth_client.post("/api/import/commit", json={"staging_tokens": [token]})
+    assert response.status_code == 200
+    assert response.get_json()["message"] == "Successfully imported 2 transactions."
+
+    response = auth_client.post("/api/import/commit", json={"staging_tokens": [token]})
+    assert response.status_code == 409
+
+    with test_app.app_context():
+        main = db.session.execute(select(Account).filter_by(name="Main")).scalar_one()
+        assert main.balance == decimal.Decimal("-150.00")
+
+
+@pytest.mark.feature
+def test_staged_rows_are_dropped_once_claimed_or_expired(
+    auth_client, test_app, import_accounts, monkeypatch
+):
+    """
+    GIVEN two validated uploads, one of which is left past IMPORT_STAGING_TTL
+    WHEN both staging tokens are committed
+    THEN the fresh job keeps no staged rows after its import, and the expired
+    job is rejected and deleted
+    """
+    monkeypatch.setitem(test_app.config, "IMPORT_STAGING_TTL", 60)
+    csv_data = CSV_HEADER + (
+        "2025-09-01,09:00 AM,Gym,40.00,DR,Main (Checking),Yes,,,\n"
+    )
+
+    def validate():
+        response = auth_client.post(
+            "/api/import/validate",
+            data={"transaction_file": (io.BytesIO(csv_data.encode()), "gym.csv")},
+            content_type="multipart/form-data",
+        )
+        return response.get_json()["staging_token"]
+
+    stale_token, fresh_token = validate(), validate()
+    with test_app.app_context():
+        db.session.execute(
+            update(ImportJob)
+            .where(ImportJob.id == stale_token)
+            .values(created_at=datetime(2020, 1, 1))
+        )
+        db.session.commit()
+
+    response = auth_client.post(
+        "/api/import/commit", json={"staging_tokens": [fresh_token]}
+    )
+    assert response.status_code == 200
+    response = auth_client.post(
+        "/api/import/commit", json={"staging_tokens": [stale_token]}
+    )
+    assert response.status_code == 409
+
+    with test_app.app_context():
+        fresh = db.session.get(ImportJob, fresh_token)
+        assert (fresh.status, fresh.staged_rows) == ("completed", None)
+        assert db.session.get(ImportJob, stale_token) is None
+
+
+@pytest.mark.unit
+def test_content_hash_normalizes_description_and_ignores_time():
+    """
+    GIVEN two statement lines for the same payment
+    WHEN their content hashes are computed
+    THEN case, spacing and time of day do not matter, but the sign does
+    """
+    first = duplicates.content_hash(
+        1, 2, datetime(2025, 7, 1, 9, 0), "25.5", "expense", "Coffee  Shop"
+    )
+    second = duplicates.content_hash(
+        1, 2, datetime(2025, 7, 1, 17, 30), "25.50", "expense", " coffee shop "
+    )
+    refund = duplicates.content_hash(
+        1, 2, datetime(2025, 7, 1, 9, 0), "25.50", "income", "Coffee Shop"
+    )
+    assert first == second
+    assert refund != first
+
+
+@pytest.mark.feature
+def test_overlapping_import_reports_and_skips_duplicates(
+    auth_client, test_app, import_accounts
+):
+    """
+    GIVEN transactions imported from a first statement
+    WHEN an overlapping statement is validated and committed
+    THEN the overlap is reported and skipped, while repeats within one file are kept
+    """
+    first = [
+        ["2025-08-01", "09:00 AM", "Coffee", "3.00", "DR", "Main (Checking)"]
+        + ["Yes", "", "", ""],
+        ["2025-08-01", "09:00 AM", "Coffee", "3.00", "DR", "Main (Checking)"]
+        + ["Yes", "", "", ""],
+    ]
+    response = auth_client.post("/api/import/commit", json={"transactions": first})
+    assert response.get_json()["message"] == "Successfully imported 2 transactions."
+
+    csv_data = CSV_HEADER + (
+        "2025-08-01,10:15 AM,COFFEE,3.00,DR,Main (Checking),Yes,,,\n"
+        "2025-08-02,09:00 AM,Lunch,12.00,DR,Main (Checking),Yes,,,\n"
+    )
+    response = auth_client.post(
+        "/api/import/validate",
+        data={"transaction_file": (io.BytesIO(csv_data.encode()), "overlap.csv")},
+        content_type="multipart/form-data",
+    )
+    report = response.get_json()
+    assert report["summary"]["duplicate_count"] == 1
+    assert [row["row_number"] for row in report["duplicate_rows"]] == [2]
+
+    response = auth_client.post(
+        "/api/import/commit", json={"staging_token": report["staging_token"]}
+    )
+    assert response.get_json() == {
+        "message": "Successfully imported 1 transactions.",
+        "duplicates_skipped": 1,
+    }
+
+    with test_app.app_context():
+        user_id = import_accounts.id
+        descriptions = db.session.execute(
+            select(Transaction.description)
+            .filter_by(user_id=user_id)
+            .order_by(Transaction.id)
+        ).scalars()
+        assert list(descriptions) == ["Coffee", "Coffee", "Lunch"]
+
+        # The staged job counts the inserted row, not the skipped duplicate
+        job = db.session.get(ImportJob, report["staging_token"])
+        assert (job.rows_imported, job.duplicate_count) == (1, 1)
+
+        # Hashes of older rows are restored by the rebuild command's helper
+        db.session.execute(update(Transaction).values(content_hash=None))
+        assert duplicates.rebuild(user_id=user_id) == 3
+        db.session.commit()
+        assert db.session.execute(
+            select(Transaction.content_hash).filter_by(description="Lunch")
+        ).scalar_one()
@@ -1,8 +1,14 @@
 # tests/test_investments.py
 
-from finance_tracker import db, bcrypt
-from finance_tracker.models import User, Asset, InvestmentTransaction, ActivityLog
-from sqlalchemy import select
+from finance_tracker import db, bcrypt, holdings
+from finance_tracker.models import (
+    User,
+    Asset,
+    Holding,
+    InvestmentTransaction,
+    ActivityLog,
+)
+from sqlalchemy import delete, select
 import decimal
 from datetime import datetime
 import pytest
@@ -156,3 +162,109 @@ def test_investment_authorization(client, test_app):
         # Assert that both attempts were forbidden
         assert edit_response.status_code == 403
         assert delete_response.status_code == 403
+
+
+@pytest.mark.unit
+def test_apply_trade_uses_average_cost():
+    """
+    GIVEN two buys at different prices
+    WHEN part of the position is sold
+    THEN the sale removes the average cost and realizes the difference
+    """
+    position = (decimal.Decimal(0),) * 3
+    position = holdings.apply_trade(position, "buy", 10, 100)
+    position = holdings.apply_trade(position, "buy", 10, 200)
+    position = holdings.apply_trade(position, "sell", 5, 210)
+    assert position == (
+        decimal.Decimal("15"),
+        decimal.Decimal("2250.0000"),
+        decimal.Decimal("300.0000"),
+    )
+
+
+@pytest.mark.feature
+def test_holdings_follow_investment_add_edit_and_delete(auth_client, test_app):
+    """
+    GIVEN an authenticated user trading one ticker
+    WHEN trades are added (one backdated), edited and deleted through the routes
+    THEN the holding row always matches a full rebuild from the transactions
+    """
+
+    def add(trans_type, quantity, price, when):
+        return auth_client.post(
+            "/portfolio/add",
+            data={
+                "ticker_symbol": "hold",
+                "transaction_type": trans_type,
+                "quantity": quantity,
+                "price_per_unit": price,
+                "transaction_date": when,
+            },
+        )
+
+    def position():
+        holding = db.session.execute(
+            select(Holding).join(Holding.asset).filter(Asset.ticker_symbol == "HOLD")
+        ).scalar_one_or_none()
+        if holding is None:
+            return None
+        db.session.refresh(holding)
+        return holding.quantity, holding.cost_basis, holding.realized_pnl
+
+    # The shared client may still be logged in as another test's user
+    auth_client.get("/logout")
+    auth_client.post(
+        "/login", data={"email": "client@test.com", "password": "password123"}
+    )
+
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+
+        add("buy", "10", "100", "2025-01-01T10:00")
+        add("sell", "4", "150", "2025-03-01T10:00")
+        assert position() == (
+            decimal.Decimal("6"),
+            decimal.Decimal("600.0000"),
+            decimal.Decimal("200.0000"),
+        )
+
+        # A backdated buy changes the average cost of the later sale
+        add("buy", "10", "200", "2025-02-01T10:00")
+        assert position() == (
+            decimal.Decimal("16"),
+            decimal.Decimal("2400.0000"),
+            decimal.Decimal("0.0000"),
+        )
+
+        sale = db.session.execute(
+            select(InvestmentTransaction).filter_by(
+                user_id=user.id, transaction_type="sell"
+            )
+        ).scalar_one()
+        auth_client.post(
+            f"/portfolio/edit/{sale.id}",
+            data={
+                "ticker_symbol": "HOLD",
+                "transaction_type": "sell",
+                "quantity": "20",
+                "price_per_unit": "160",
+                "transaction_date": "2025-03-01T10:00",
+            },
+        )
+        assert position()[:2] == (decimal.Decimal("0"), decimal.Decimal("0"))
+
+        incremental = position()
+        holdings.rebuild(user_id=user.id)
+        db.session.commit()
+        assert position() == incremental
+
+        for trade in db.session.execute(
+            select(InvestmentTransaction).filter_by(user_id=user.id)
+        ).scalars():
+            auth_client.post(f"/portfolio/delete/{trade.id}")
+        assert position() is None
+
+        db.session.execute(delete(Asset).filter_by(ticker_symbol="HOLD"))
+        db.session.commit()
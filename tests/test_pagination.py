@@ -0,0 +1,99 @@
+# tests/test_pagination.py
+
+from finance_tracker import db
+from finance_tracker.models import User, Account, Transaction
+from finance_tracker.pagination import encode_cursor, decode_cursor, keyset_paginate
+from sqlalchemy import select
+from datetime import datetime
+import decimal
+import pytest
+
+
+@pytest.fixture(scope="function")
+def paged_transactions(auth_client, test_app):
+    """Creates seven transactions, two of which share the same timestamp."""
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(name="Paging Bank", account_type="Checking", user_id=user.id)
+        db.session.add(account)
+        db.session.flush()
+
+        dates = [datetime(2025, 1, day, 12, 0) for day in (1, 2, 3, 3, 4, 5, 6)]
+        for index, transaction_date in enumerate(dates):
+            db.session.add(
+                Transaction(
+                    description=f"Paged {index}",
+                    amount=decimal.Decimal("1.00"),
+                    transaction_type="expense",
+                    transaction_date=transaction_date,
+                    user_id=user.id,
+                    account_id=account.id,
+                )
+            )
+        db.session.commit()
+        yield user
+
+
+@pytest.mark.unit
+def test_cursor_round_trip_and_invalid_tokens():
+    """
+    GIVEN a (transaction_date, id) position
+    WHEN it is encoded and decoded, or a malformed token is decoded
+    THEN the position is recovered, and malformed tokens decode to None
+    """
+    position = (datetime(2025, 1, 3, 12, 0, 5), 42)
+    assert decode_cursor(encode_cursor(*position)) == position
+    assert decode_cursor("not-a-cursor") is None
+    assert decode_cursor("") is None
+
+
+@pytest.mark.feature
+def test_keyset_pages_walk_forwards_and_backwards(test_app, paged_transactions):
+    """
+    GIVEN seven transactions, including a tie on transaction_date
+    WHEN they are paged three at a time with next and then prev cursors
+    THEN every transaction is visited exactly once, newest first, in both directions
+    """
+    with test_app.app_context():
+        stmt = select(Transaction).filter_by(user_id=paged_transactions.id)
+        expected = [
+            txn.id
+            for txn in db.session.execute(
+                stmt.order_by(
+                    Transaction.transaction_date.desc(), Transaction.id.desc()
+                )
+            ).scalars()
+        ]
+
+        pages = [keyset_paginate(stmt, Transaction, per_page=3)]
+        while pages[-1].has_next:
+            cursor = decode_cursor(pages[-1].next_cursor)
+            pages.append(keyset_paginate(stmt, Transaction, after=cursor, per_page=3))
+
+        assert [len(page.items) for page in pages] == [3, 3, 1]
+        assert [txn.id for page in pages for txn in page.items] == expected
+        assert not pages[0].has_prev and pages[-1].has_prev
+
+        # Walking back from the last page returns the same pages in reverse
+        page = pages[-1]
+        for previous in reversed(pages[:-1]):
+            page = keyset_paginate(
+                stmt, Transaction, before=decode_cursor(page.prev_cursor), per_page=3
+            )
+            assert [txn.id for txn in page.items] == [txn.id for txn in previous.items]
+        assert not page.has_prev
+
+
+@pytest.mark.feature
+def test_transactions_page_in_cursor_mode(auth_client, paged_transactions):
+    """
+    GIVEN a user with transactions
+    WHEN the transactions list is requested in cursor mode
+    THEN the page renders with the cached total count
+    """
+    response = auth_client.get("/transactions?paging=cursor")
+    assert response.status_code == 200
+    assert b"Paged 6" in response.data
+    assert b"7 transactions" in response.data
@@ -0,0 +1,518 @@
+# tests/test_recurring.py
+
+from finance_tracker import db, recurring
+from finance_tracker.models import (
+    Account,
+    Category,
+    RecurringJobRun,
+    RecurringSchedule,
+    RecurringTransaction,
+    Transaction,
+    TransactionSearch,
+    User,
+    transaction_categories,
+)
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.dialects import mssql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
+import decimal
+import pytest
+
+
+@pytest.fixture(scope="function")
+def recurring_rules(auth_client, test_app, monkeypatch):
+    """Creates an account with a monthly bill and a daily income rule."""
+    monkeypatch.setitem(test_app.config, "TASK_SECRET_KEY", "task-secret")
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(
+            name="Main",
+            account_type="Checking",
+            balance=decimal.Decimal("1000.00"),
+            user_id=user.id,
+        )
+        category = Category(name="Rent", user_id=user.id)
+        db.session.add_all([account, category])
+        db.session.flush()
+        db.session.add_all(
+            [
+                RecurringTransaction(
+                    description="Rent",
+                    amount=decimal.Decimal("300.00"),
+                    transaction_type="expense",
+                    recurrence_interval="monthly",
+                    start_date=date(2025, 1, 31),
+                    next_due_date=date(2025, 1, 31),
+                    user_id=user.id,
+                    account_id=account.id,
+                    category_id=category.id,
+                ),
+                RecurringTransaction(
+                    description="Interest",
+                    amount=decimal.Decimal("1.50"),
+                    transaction_type="income",
+                    recurrence_interval="daily",
+                    start_date=date(2025, 3, 30),
+                    next_due_date=date(2025, 3, 30),
+                    user_id=user.id,
+                    account_id=account.id,
+                ),
+            ]
+        )
+        recurring.schedule(date(2025, 1, 31))
+        db.session.commit()
+        account_id = account.id
+        yield user, account_id
+
+        transaction_ids = select(Transaction.id).filter_by(user_id=user.id)
+        db.session.execute(
+            delete(transaction_categories).where(
+                transaction_categories.c.transaction_id.in_(transaction_ids)
+            )
+        )
+        db.session.execute(delete(TransactionSearch).filter_by(user_id=user.id))
+        db.session.execute(delete(Transaction).filter_by(user_id=user.id))
+        db.session.execute(delete(RecurringTransaction).filter_by(user_id=user.id))
+        db.session.execute(delete(Account).filter_by(id=account_id))
+        db.session.execute(delete(RecurringSchedule))
+        db.session.commit()
+
+
+@pytest.mark.unit
+def test_monthly_occurrences_keep_the_day_of_month():
+    """
+    GIVEN a monthly rule first due on January 31st
+    WHEN its occurrences up to April 30th are expanded
+    THEN February is clamped to its last day and later months return to the 31st
+    """
+    assert recurring.occurrences(date(2025, 1, 31), "monthly", date(2025, 4, 30)) == [
+        date(2025, 1, 31),
+        date(2025, 2, 28),
+        date(2025, 3, 31),
+        date(2025, 4, 30),
+    ]
+    assert recurring.occurrences(date(2025, 5, 1), "weekly", date(2025, 4, 30)) == []
+
+
+@pytest.mark.feature
+@pytest.mark.parametrize(
+    "start, interval",
+    [(date(2025, 1, 31), "monthly"), (date(2024, 2, 29), "yearly")],
+)
+def test_daily_runs_and_one_catch_up_run_agree(
+    test_app, recurring_rules, start, interval
+):
+    """
+    GIVEN two identical month-end rules
+    WHEN one is generated every day and the other once at the end
+    THEN both produce the same occurrence dates and next due date, with no
+    drift after shorter months
+    """
+    user, account_id = recurring_rules
+    until = date(2025, 6, 30) if interval == "monthly" else date(2029, 3, 1)
+    with test_app.app_context():
+        stepwise, catch_up = (
+            RecurringTransaction(
+                description=description,
+                amount=decimal.Decimal("1.00"),
+                transaction_type="expense",
+                recurrence_interval=interval,
+                start_date=start,
+                next_due_date=start,
+                user_id=user.id,
+                account_id=account_id,
+            )
+            for description in ("Stepwise", "Catch-up")
+        )
+        db.session.add_all([stepwise, catch_up])
+        db.session.commit()
+
+        day = start
+        while day <= until:
+            # As in the scheduled job, only due rules are passed in
+            if stepwise.next_due_date <= day:
+                recurring.generate([stepwise], day)
+            day += timedelta(days=1)
+        recurring.generate([catch_up], until)
+        db.session.commit()
+
+        def occurrence_dates(rule):
+            return (
+                db.session.execute(
+                    select(Transaction.occurrence_date)
+                    .filter_by(recurring_transaction_id=rule.id)
+                    .order_by(Transaction.occurrence_date)
+                )
+                .scalars()
+                .all()
+            )
+
+        assert occurrence_dates(stepwise) == occurrence_dates(catch_up)
+        assert occurrence_dates(catch_up) == recurring.occurrences(
+            start, interval, until
+        )
+        assert stepwise.next_due_date == catch_up.next_due_date
+        if interval == "monthly":
+            assert occurrence_dates(stepwise)[2:4] == [
+                date(2025, 3, 31),
+                date(2025, 4, 30),
+            ]
+            assert stepwise.next_due_date == date(2025, 7, 31)
+        else:
+            assert stepwise.next_due_date == date(2030, 2, 28)
+
+
+@pytest.mark.feature
+def test_recurring_job_catches_up_on_missed_occurrences(
+    auth_client, test_app, recurring_rules, monkeypatch
+):
+    """
+    GIVEN a monthly rule three occurrences behind and a daily rule three days behind
+    WHEN the recurring task runs once, and then again on the same day
+    THEN every missed occurrence is created with its category and search
+    document, the balance moves once per transaction, and the second run
+    creates nothing
+    """
+    user, account_id = recurring_rules
+    today = datetime(2025, 4, 1, 5, 0, tzinfo=timezone.utc)
+
+    class FrozenDateTime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return today
+
+    monkeypatch.setattr("finance_tracker.routes.datetime", FrozenDateTime)
+    headers = {"X-App-Key": "task-secret"}
+
+    assert auth_client.post("/tasks/generate_recurring").status_code == 403
+    response = auth_client.post("/tasks/generate_recurring", headers=headers)
+    assert response.status_code == 200
+    assert "generated 6 transaction(s)" in response.get_json()["message"]
+
+    with test_app.app_context():
+        generated = (
+            db.session.execute(
+                select(Transaction)
+                .filter_by(user_id=user.id)
+                .order_by(Transaction.transaction_date, Transaction.description)
+            )
+            .scalars()
+            .all()
+        )
+        assert [
+            (t.transaction_date.date(), t.description, t.amount) for t in generated
+        ] == [
+            (date(2025, 1, 31), "Rent", decimal.Decimal("300.00")),
+            (date(2025, 2, 28), "Rent", decimal.Decimal("300.00")),
+            (date(2025, 3, 30), "Interest", decimal.Decimal("1.50")),
+            (date(2025, 3, 31), "Interest", decimal.Decimal("1.50")),
+            (date(2025, 3, 31), "Rent", decimal.Decimal("300.00")),
+            (date(2025, 4, 1), "Interest", decimal.Decimal("1.50")),
+        ]
+        assert all(t.recurring_transaction_id for t in generated)
+        assert [c.name for c in generated[0].categories] == ["Rent"]
+        assert (
+            db.session.execute(
+                select(TransactionSearch.document).filter_by(
+                    transaction_id=generated[0].id
+                )
+            ).scalar_one()
+            == "rent rent"
+        )
+
+        assert db.session.get(Account, account_id).balance == decimal.Decimal("104.50")
+        rules = {
+            rule.description: rule
+            for rule in db.session.execute(
+                select(RecurringTransaction).filter_by(user_id=user.id)
+            ).scalars()
+        }
+        assert rules["Rent"].next_due_date == date(2025, 4, 30)
+        assert rules["Rent"].last_processed_date == date(2025, 3, 31)
+        assert rules["Interest"].next_due_date == date(2025, 4, 2)
+
+    response = auth_client.post("/tasks/generate_recurring", headers=headers)
+    assert response.get_json()["message"] == "No transactions to generate."
+    with test_app.app_context():
+        assert (
+            db.session.execute(
+                select(func.count(Transaction.id)).filter_by(user_id=user.id)
+            ).scalar_one()
+            == 6
+        )
+
+
+@pytest.mark.feature
+def test_recurring_job_is_sharded_batched_and_resumable(
+    auth_client, test_app, recurring_rules, monkeypatch
+):
+    """
+    GIVEN two due rules of one user, a checkpoint past the first of them, and
+    a broken rule of a second user
+    WHEN each of two shards runs in batches of one rule
+    THEN each shard handles only its own users, the first shard resumes after
+    its checkpoint, and the broken rule is skipped without undoing the others
+    """
+    user, account_id = recurring_rules
+    monkeypatch.setitem(test_app.config, "RECURRING_BATCH_SIZE", 1)
+    today = date.today()
+    headers = {"X-App-Key": "task-secret"}
+
+    with test_app.app_context():
+        other = User(username="other", email="other@test.com", password_hash="x")
+        db.session.add(other)
+        db.session.flush()
+        user_id, other_id = user.id, other.id
+        db.session.add(
+            RecurringTransaction(
+                description="Broken",
+                amount=decimal.Decimal("5.00"),
+                transaction_type="expense",
+                recurrence_interval="monthly",
+                start_date=today,
+                next_due_date=today,
+                user_id=other_id,
+                account_id=account_id,
+            )
+        )
+        recurring.schedule(today)
+        rule_ids = {
+            rule.description: rule.id
+            for rule in db.session.execute(select(RecurringTransaction)).scalars()
+        }
+        # Consecutive user ids land on different shards
+        assert user_id % 2 != other_id % 2
+        db.session.add(
+            RecurringJobRun(
+                run_date=today,
+                shard_index=user_id % 2,
+                shard_count=2,
+                last_rule_id=rule_ids["Rent"],
+                rules_processed=1,
+                transactions_created=0,
+                failed_rules=0,
+            )
+        )
+        db.session.commit()
+
+    generate = recurring.generate
+
+    def failing_generate(rules, today):
+        if any(rule.description == "Broken" for rule in rules):
+            raise ValueError("bad rule")
+        return generate(rules, today)
+
+    monkeypatch.setattr(recurring, "generate", failing_generate)
+
+    assert (
+        auth_client.post(
+            "/tasks/generate_recurring?shard=2/2", headers=headers
+        ).status_code
+        == 400
+    )
+
+    report = auth_client.post(
+        f"/tasks/generate_recurring?shard={user_id % 2}/2", headers=headers
+    ).get_json()
+    assert report["resumed_from"] == rule_ids["Rent"]
+    assert report["failed_rule_ids"] == []
+    assert report["transactions_created"] > 0
+
+    report = auth_client.post(
+        f"/tasks/generate_recurring?shard={other_id % 2}/2", headers=headers
+    ).get_json()
+    assert report["failed_rule_ids"] == [rule_ids["Broken"]]
+    assert report["transactions_created"] == 0
+
+    with test_app.app_context():
+        descriptions = set(
+            db.session.execute(
+                select(Transaction.description).where(
+                    Transaction.user_id.in_([user_id, other_id])
+                )
+            ).scalars()
+        )
+        assert descriptions == {"Interest"}
+        runs = db.session.execute(
+            select(RecurringJobRun).filter_by(run_date=today, shard_count=2)
+        ).scalars()
+        assert {run.status for run in runs} == {"completed"}
+        assert db.session.get(
+            RecurringTransaction, rule_ids["Rent"]
+        ).next_due_date == date(2025, 1, 31)
+
+        db.session.execute(delete(RecurringJobRun))
+        db.session.execute(
+            delete(RecurringTransaction).where(
+                RecurringTransaction.user_id.in_([user_id, other_id])
+            )
+        )
+        db.session.execute(delete(User).filter_by(id=other_id))
+        db.session.commit()
+
+
+@pytest.mark.feature
+def test_recurring_generation_skips_occurrences_that_already_exist(
+    test_app, recurring_rules
+):
+    """
+    GIVEN a rule whose first missed occurrence was already generated by an
+    overlapping run that has not advanced the rule yet
+    WHEN the rule is generated again
+    THEN only the missing occurrences are inserted and charged to the balance,
+    and the unique index rejects a second copy of an occurrence
+    """
+    user, account_id = recurring_rules
+    with test_app.app_context():
+        rule = db.session.execute(
+            select(RecurringTransaction).filter_by(user_id=user.id, description="Rent")
+        ).scalar_one()
+        db.session.add(
+            Transaction(
+                description="Rent",
+                amount=decimal.Decimal("300.00"),
+                transaction_type="expense",
+                transaction_date=datetime(2025, 1, 31),
+                user_id=user.id,
+                account_id=account_id,
+                recurring_transaction_id=rule.id,
+                occurrence_date=date(2025, 1, 31),
+            )
+        )
+        db.session.commit()
+
+        assert recurring.generate([rule], date(2025, 2, 28)) == 1
+        db.session.commit()
+        assert rule.next_due_date == date(2025, 3, 31)
+        assert db.session.get(Account, account_id).balance == decimal.Decimal("700.00")
+
+        db.session.add(
+            Transaction(
+                description="Rent again",
+                amount=decimal.Decimal("300.00"),
+                transaction_type="expense",
+                user_id=user.id,
+                account_id=account_id,
+                recurring_transaction_id=rule.id,
+                occurrence_date=date(2025, 2, 28),
+            )
+        )
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+
+@pytest.mark.feature
+def test_manual_run_uses_up_the_next_due_occurrence(
+    auth_client, test_app, recurring_rules
+):
+    """
+    GIVEN a monthly rule due on Jan 31
+    WHEN it is run manually and the scheduled job runs on Feb 28
+    THEN the manual transaction is keyed to Jan 31, the rule moves on to
+    Feb 28, and the job only generates the Feb 28 occurrence
+    """
+    user, account_id = recurring_rules
+    with test_app.app_context():
+        rule_id = db.session.execute(
+            select(RecurringTransaction.id).filter_by(
+                user_id=user.id, description="Rent"
+            )
+        ).scalar_one()
+
+    response = auth_client.post(f"/recurring/run/{rule_id}")
+    assert response.status_code == 302
+
+    with test_app.app_context():
+        rule = db.session.get(RecurringTransaction, rule_id)
+        assert (rule.last_processed_date, rule.next_due_date) == (
+            date(2025, 1, 31),
+            date(2025, 2, 28),
+        )
+        manual = db.session.execute(
+            select(Transaction).filter_by(recurring_transaction_id=rule_id)
+        ).scalar_one()
+        assert manual.occurrence_date == date(2025, 1, 31)
+
+        assert recurring.generate([rule], date(2025, 2, 28)) == 1
+        db.session.commit()
+        occurrences = db.session.execute(
+            select(Transaction.occurrence_date)
+            .filter_by(recurring_transaction_id=rule_id)
+            .order_by(Transaction.occurrence_date)
+        ).scalars()
+        assert list(occurrences) == [date(2025, 1, 31), date(2025, 2, 28)]
+        assert db.session.get(Account, account_id).balance == decimal.Decimal("400.00")
+
+
+@pytest.mark.feature
+def test_recurring_job_sleeps_until_the_next_wakeup(
+    auth_client, test_app, recurring_rules
+):
+    """
+    GIVEN a completed run that has recorded the earliest next due date
+    WHEN the job runs again before that date, and after a new rule is added
+    THEN the first run returns without reading the rules, and the new rule
+    brings the wakeup forward so the next run processes it
+    """
+    user, account_id = recurring_rules
+    with test_app.app_context():
+        recurring.run_job(date(2025, 4, 1))
+        assert db.session.get(RecurringSchedule, 1).next_wakeup == date(2025, 4, 2)
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            report = recurring.run_job(date(2025, 4, 1))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        assert report["skipped"] is True
+        assert not any("FROM recurring_transaction" in sql for sql in statements)
+
+    response = auth_client.post(
+        "/recurring",
+        data={
+            "description": "Gym",
+            "amount": "20.00",
+            "transaction_type": "expense",
+            "recurrence_interval": "monthly",
+            "start_date": "2025-03-15",
+            "account_id": account_id,
+        },
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+    with test_app.app_context():
+        db.session.expire_all()
+        assert db.session.get(RecurringSchedule, 1).next_wakeup == date(2025, 3, 15)
+        report = recurring.run_job(date(2025, 4, 1))
+        assert report["skipped"] is False
+        assert report["transactions_created"] == 1
+
+
+@pytest.mark.unit
+def test_occurrence_index_ignores_detached_transactions():
+    """
+    GIVEN the unique occurrence index as created on SQL Server
+    WHEN its DDL is compiled
+    THEN it only covers transactions still linked to a rule, since deleting
+    rules leaves many detached rows with a NULL rule id and the same date
+    """
+    index = next(
+        index
+        for index in Transaction.__table__.indexes
+        if index.name == "ux_transaction_recurring_occurrence"
+    )
+    ddl = str(CreateIndex(index).compile(dialect=mssql.dialect()))
+    assert ddl.endswith(
+        "WHERE recurring_transaction_id IS NOT NULL AND occurrence_date IS NOT NULL"
+    )
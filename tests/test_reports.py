@@ -0,0 +1,86 @@
+# tests/test_reports.py
+
+from finance_tracker import db, rollups
+from finance_tracker.models import User, Account, Category, Transaction
+from sqlalchemy import select
+from datetime import datetime
+import decimal
+import pytest
+
+
+@pytest.fixture(scope="function")
+def report_data(auth_client, test_app):
+    """Creates an account with a categorized and an uncategorized expense."""
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(name="Report Bank", account_type="Checking", user_id=user.id)
+        groceries = Category(name="Groceries", user_id=user.id)
+        db.session.add_all([account, groceries])
+        db.session.flush()
+
+        categorized = Transaction(
+            description="Market",
+            amount=decimal.Decimal("40.25"),
+            transaction_type="expense",
+            transaction_date=datetime(2025, 3, 14, 10, 0),
+            user_id=user.id,
+            account_id=account.id,
+        )
+        categorized.categories.append(groceries)
+        uncategorized = Transaction(
+            description="Mystery",
+            amount=decimal.Decimal("9.75"),
+            transaction_type="expense",
+            transaction_date=datetime(2025, 3, 20, 18, 30),
+            user_id=user.id,
+            account_id=account.id,
+        )
+        db.session.add_all([categorized, uncategorized])
+        rollups.record_many([categorized, uncategorized])
+        db.session.commit()
+
+        yield user
+
+        rollups.unrecord(categorized)
+        rollups.unrecord(uncategorized)
+        db.session.delete(categorized)
+        db.session.delete(uncategorized)
+        db.session.delete(groceries)
+        db.session.delete(account)
+        db.session.commit()
+
+
+@pytest.mark.feature
+def test_reports_groups_expenses_by_month_and_category(auth_client, report_data):
+    """
+    GIVEN a user with a categorized and an uncategorized expense in the same month
+    WHEN the '/reports' page is requested
+    THEN both the category total and the 'Uncategorized' bucket are listed for that month
+    """
+    response = auth_client.get("/reports")
+    assert response.status_code == 200
+    assert b"March 2025" in response.data
+    assert b"Groceries: <strong>\xe2\x82\xb940.25</strong>" in response.data
+    assert b"Uncategorized: <strong>\xe2\x82\xb99.75</strong>" in response.data
+
+
+@pytest.mark.feature
+def test_dashboard_data_returns_all_chart_series(auth_client, report_data):
+    """
+    GIVEN a user with expenses in March 2025
+    WHEN '/api/dashboard_data' is requested for that month
+    THEN the category breakdown and both daily series are returned together
+    """
+    response = auth_client.get(
+        "/api/dashboard_data?start_date=2025-03-01&end_date=2025-03-31"
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert data["category_breakdown"] == {"labels": ["Groceries"], "data": [40.25]}
+    assert len(data["daily_expense"]["labels"]) == 31
+    assert sum(data["daily_expense"]["data"]) == 50.0
+    assert data["financial_trend"]["labels"] == data["daily_expense"]["labels"]
+    assert sum(data["financial_trend"]["income_data"]) == 0
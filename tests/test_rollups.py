@@ -0,0 +1,208 @@
+# tests/test_rollups.py
+
+from finance_tracker import db, rollups
+from finance_tracker.models import (
+    User,
+    Account,
+    Category,
+    Transaction,
+    MonthlyRollup,
+    DailyRollup,
+)
+from sqlalchemy import select
+import pytest
+
+
+def rollup_snapshot(user_id):
+    """Returns the user's monthly rollup rows as a comparable set of tuples."""
+    rows = db.session.execute(
+        select(MonthlyRollup).filter_by(user_id=user_id)
+    ).scalars()
+    return {
+        (
+            row.year,
+            row.month,
+            row.account_id,
+            row.category_id,
+            row.transaction_type,
+            row.affects_balance,
+            row.amount,
+            row.distinct_amount,
+            row.transaction_count,
+        )
+        for row in rows
+    }
+
+
+def daily_snapshot(user_id):
+    """Returns the user's daily rollup rows as a comparable set of tuples."""
+    rows = db.session.execute(select(DailyRollup).filter_by(user_id=user_id)).scalars()
+    return {
+        (
+            row.day,
+            row.transaction_type,
+            row.affects_balance,
+            row.amount,
+            row.transaction_count,
+        )
+        for row in rows
+    }
+
+
+@pytest.mark.feature
+def test_rollups_follow_add_edit_and_delete(auth_client, test_app):
+    """
+    GIVEN an authenticated user with an account and a category
+    WHEN transactions are added, edited (moved to another month) and deleted
+    THEN the incrementally maintained rollups match a full rebuild
+    """
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(name="Rollup Bank", account_type="Checking", user_id=user.id)
+        category = Category(name="Rent", user_id=user.id)
+        db.session.add_all([account, category])
+        db.session.commit()
+
+        for description, amount, date in [
+            ("Rent March", "500.00", "2025-03-01T09:00"),
+            ("Rent April", "500.00", "2025-04-01T09:00"),
+            ("Snack", "3.50", "2025-04-02T16:00"),
+        ]:
+            response = auth_client.post(
+                "/add_transaction",
+                data={
+                    "description": description,
+                    "amount": amount,
+                    "transaction_type": "expense",
+                    "account": account.id,
+                    "category": category.id,
+                    "transaction_date": date,
+                    "affects_balance": "y",
+                },
+            )
+            assert response.status_code == 302
+
+        snack = db.session.execute(
+            select(Transaction).filter_by(description="Snack")
+        ).scalar_one()
+        rent_april = db.session.execute(
+            select(Transaction).filter_by(description="Rent April")
+        ).scalar_one()
+
+        # Move the snack into March without a category and with a new amount
+        auth_client.post(
+            f"/edit_transaction/{snack.id}",
+            data={
+                "description": "Snack",
+                "amount": "4.00",
+                "transaction_type": "expense",
+                "account": account.id,
+                "transaction_date": "2025-03-15T16:00",
+                "affects_balance": "y",
+            },
+        )
+        auth_client.post(f"/delete_transaction/{rent_april.id}")
+
+        incremental = rollup_snapshot(user.id)
+        incremental_daily = daily_snapshot(user.id)
+        rollups.rebuild(user_id=user.id)
+        db.session.commit()
+        assert incremental == rollup_snapshot(user.id)
+        assert incremental_daily == daily_snapshot(user.id)
+        # April no longer has any transactions, so its rows are gone entirely
+        assert {row[1] for row in incremental} == {3}
+        assert {row[0].month for row in incremental_daily} == {3}
+
+
+@pytest.mark.unit
+def test_unrecording_a_transaction_without_rollups(auth_client, test_app):
+    """
+    GIVEN a transaction written before the rollup tables were filled
+    WHEN it is removed from the rollups
+    THEN no rollup rows are created and the session commits cleanly
+    """
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(name="Old Bank", account_type="Checking", user_id=user.id)
+        db.session.add(account)
+        db.session.flush()
+        old = Transaction(
+            description="Legacy",
+            amount=10,
+            transaction_type="expense",
+            user_id=user.id,
+            account_id=account.id,
+        )
+        db.session.add(old)
+        db.session.commit()
+
+        rollups.unrecord(old)
+        db.session.delete(old)
+        db.session.commit()
+        assert rollup_snapshot(user.id) == set()
+        assert daily_snapshot(user.id) == set()
+
+
+@pytest.mark.unit
+def test_applying_deltas_increments_rows_in_place(auth_client, test_app):
+    """
+    GIVEN an uncategorized rollup row that was changed outside the session
+    WHEN further deltas for the same key are applied and then removed
+    THEN they add to the stored values instead of overwriting them, and the
+    row is deleted once its count reaches zero
+    """
+    from datetime import date
+    from decimal import Decimal
+    from sqlalchemy import update
+
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(name="Atomic Bank", account_type="Checking", user_id=user.id)
+        db.session.add(account)
+        db.session.commit()
+
+        def delta(amount, sign=1):
+            d = rollups.RollupDelta()
+            d.add(
+                user.id, account.id, date(2024, 3, 5), "expense", True, amount, [], sign
+            )
+            return d
+
+        rollups.apply(delta(10))
+        db.session.commit()
+        # Another writer adds its own transaction to the same row
+        db.session.execute(
+            update(MonthlyRollup)
+            .where(MonthlyRollup.account_id == account.id)
+            .values(
+                amount=MonthlyRollup.amount + 5,
+                distinct_amount=MonthlyRollup.distinct_amount + 5,
+                transaction_count=MonthlyRollup.transaction_count + 1,
+            )
+        )
+        rollups.apply(delta(7))
+        db.session.commit()
+
+        row = db.session.execute(
+            select(MonthlyRollup).filter_by(account_id=account.id)
+        ).scalar_one()
+        assert (row.category_id, row.amount, row.transaction_count) == (
+            None,
+            Decimal("22.00"),
+            3,
+        )
+
+        for amount in (10, 7, 5):
+            rollups.apply(delta(amount, sign=-1))
+        db.session.commit()
+        assert rollup_snapshot(user.id) == set()
+        assert daily_snapshot(user.id) == set()
+
+        db.session.delete(account)
+        db.session.commit()
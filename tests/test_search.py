@@ -0,0 +1,101 @@
+# tests/test_search.py
+
+from finance_tracker import db, search
+from finance_tracker.models import (
+    User,
+    Account,
+    Category,
+    Transaction,
+    TransactionSearch,
+)
+from sqlalchemy import select
+import pytest
+
+
+def search_descriptions(user_id, query):
+    """Returns the descriptions of the user's transactions matching a query."""
+    stmt = search.apply_filter(select(Transaction), user_id, query)
+    return sorted(txn.description for txn in db.session.execute(stmt).scalars())
+
+
+@pytest.mark.unit
+def test_parse_terms_splits_and_lowercases_words():
+    """
+    GIVEN raw search box input with punctuation and mixed case
+    WHEN it is parsed into search terms
+    THEN only the lowercase words remain, which are safe to embed in a MATCH query
+    """
+    assert search.parse_terms('  Uber "Eats"* -lunch ') == ["uber", "eats", "lunch"]
+    assert search.parse_terms("!!!") == []
+
+
+@pytest.mark.feature
+def test_search_documents_follow_add_edit_and_delete(auth_client, test_app):
+    """
+    GIVEN an authenticated user with an account and a category
+    WHEN transactions are added, edited and deleted through the routes
+    THEN the search matches on description, notes, category and tag names throughout
+    """
+    with test_app.app_context():
+        assert search.backend() == "fts5"
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        account = Account(name="Search Bank", account_type="Checking", user_id=user.id)
+        category = Category(name="Groceries", user_id=user.id)
+        db.session.add_all([account, category])
+        db.session.commit()
+
+        for description, notes, tags in [
+            ("Weekly shop", "organic vegetables", "family"),
+            ("Cinema", "", "weekend, family"),
+        ]:
+            auth_client.post(
+                "/add_transaction",
+                data={
+                    "description": description,
+                    "amount": "20.00",
+                    "transaction_type": "expense",
+                    "account": account.id,
+                    "category": category.id if description == "Weekly shop" else "",
+                    "transaction_date": "2025-06-01T10:00",
+                    "notes": notes,
+                    "tags": tags,
+                    "affects_balance": "y",
+                },
+            )
+
+        assert search_descriptions(user.id, "groc") == ["Weekly shop"]
+        assert search_descriptions(user.id, "organic") == ["Weekly shop"]
+        assert search_descriptions(user.id, "family") == ["Cinema", "Weekly shop"]
+        assert search_descriptions(user.id, "family weekend") == ["Cinema"]
+
+        cinema = db.session.execute(
+            select(Transaction).filter_by(description="Cinema")
+        ).scalar_one()
+        auth_client.post(
+            f"/edit_transaction/{cinema.id}",
+            data={
+                "description": "Theatre",
+                "amount": "20.00",
+                "transaction_type": "expense",
+                "account": account.id,
+                "transaction_date": "2025-06-01T10:00",
+                "tags": "culture",
+                "affects_balance": "y",
+            },
+        )
+        assert search_descriptions(user.id, "weekend") == []
+        assert search_descriptions(user.id, "cult") == ["Theatre"]
+
+        auth_client.post(f"/delete_transaction/{cinema.id}")
+        assert search_descriptions(user.id, "theatre") == []
+        assert db.session.get(TransactionSearch, cinema.id) is None
+
+        # A rebuild produces the same results as the incremental maintenance
+        assert search.rebuild(user_id=user.id) == 1
+        db.session.commit()
+        assert search_descriptions(user.id, "veg") == ["Weekly shop"]
+
+        response = auth_client.get("/transactions?q=organic")
+        assert b"Weekly shop" in response.data
@@ -0,0 +1,321 @@
+# tests/test_services.py
+
+from finance_tracker import db, holdings, services
+from prometheus_client import REGISTRY
+from finance_tracker.models import (
+    Asset,
+    AssetPrice,
+    AssetPriceHistory,
+    Holding,
+    InvestmentTransaction,
+    User,
+)
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from zoneinfo import ZoneInfo
+import decimal
+import threading
+import time
+import pytest
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+class FakeQuoteResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeQuoteSession:
+    """
+    Stands in for the pooled requests.Session. Every ticker is priced at its
+    length plus 0.50, unless a queued reply for that ticker is waiting.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.replies = {}
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params, timeout):
+        symbol = params["symbol"]
+        with self.lock:
+            self.calls.append(symbol)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        if self.replies.get(symbol):
+            return self.replies[symbol].pop(0)
+        return FakeQuoteResponse({"Global Quote": {"05. price": f"{len(symbol)}.50"}})
+
+
+@pytest.fixture(scope="function")
+def quote_api(test_app, monkeypatch):
+    """Replaces the Alpha Vantage HTTP session with a slow, recording fake."""
+    session = FakeQuoteSession()
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "test-key")
+    monkeypatch.setattr(services, "_http_session", session)
+    monkeypatch.setattr(services, "_rate_limiter", None)
+    monkeypatch.setattr(services, "_circuit_breaker", None)
+    monkeypatch.setitem(test_app.config, "QUOTE_BACKOFF_BASE", 0.01)
+    services.price_cache.clear()
+    yield session
+    services.price_cache.clear()
+    with test_app.app_context():
+        db.session.execute(delete(AssetPrice))
+        db.session.execute(delete(AssetPriceHistory))
+        db.session.commit()
+
+
+@pytest.mark.unit
+def test_token_bucket_allows_a_burst_then_times_out():
+    """
+    GIVEN a token bucket with a burst of two and a slow refill
+    WHEN three tokens are requested with a short timeout
+    THEN the first two succeed at once and the third gives up
+    """
+    bucket = services.TokenBucket(rate=0.1, capacity=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.05)
+
+
+@pytest.mark.unit
+def test_get_stock_prices_fetches_in_parallel_and_deduplicates(
+    test_app, quote_api, monkeypatch
+):
+    """
+    GIVEN a generous rate limit and a slow quote API
+    WHEN the prices of several tickers, one repeated, are requested at once
+    THEN each ticker is fetched once, concurrently, and a second call is served from the cache
+    """
+    monkeypatch.setitem(test_app.config, "QUOTE_RATE_LIMIT_PER_MINUTE", 600)
+    monkeypatch.setitem(test_app.config, "QUOTE_RATE_LIMIT_BURST", 10)
+
+    with test_app.app_context():
+        prices = services.get_stock_prices(["AAPL", "MSFT", "GOOG", "AAPL", "BRK.B"])
+        assert prices == {"AAPL": 4.5, "MSFT": 4.5, "GOOG": 4.5, "BRK.B": 5.5}
+        assert sorted(quote_api.calls) == ["AAPL", "BRK.B", "GOOG", "MSFT"]
+        assert quote_api.peak > 1
+
+        assert services.get_stock_price("MSFT") == 4.5
+        assert len(quote_api.calls) == 4
+
+
+@pytest.mark.unit
+def test_get_stock_prices_skips_tickers_beyond_the_rate_limit(
+    test_app, quote_api, monkeypatch
+):
+    """
+    GIVEN a rate limit with a burst of two requests
+    WHEN three uncached tickers are requested with a short maximum wait
+    THEN two prices are fetched and the third is reported as unavailable
+    """
+    monkeypatch.setitem(test_app.config, "QUOTE_RATE_LIMIT_PER_MINUTE", 1)
+    monkeypatch.setitem(test_app.config, "QUOTE_RATE_LIMIT_BURST", 2)
+    monkeypatch.setitem(test_app.config, "QUOTE_MAX_WAIT", 0.1)
+
+    with test_app.app_context():
+        prices = services.get_stock_prices(["AAPL", "MSFT", "GOOG"])
+
+    assert len(quote_api.calls) == 2
+    assert sorted(prices, key=str) == ["AAPL", "GOOG", "MSFT"]
+    assert list(prices.values()).count(None) == 1
+
+
+@pytest.mark.unit
+def test_quote_expiry_follows_market_hours(test_app):
+    """
+    GIVEN quotes fetched during, near the end of, and after a trading session
+    WHEN their expiry is computed
+    THEN intraday quotes live 15 minutes up to the close, and the closing
+    quote lasts until the next weekday open
+    """
+    with test_app.app_context():
+        tuesday_noon = datetime(2025, 7, 8, 12, 0, tzinfo=NEW_YORK)
+        assert services.quote_expires_at(tuesday_noon) == tuesday_noon + timedelta(
+            minutes=15
+        )
+
+        near_close = datetime(2025, 7, 8, 15, 55, tzinfo=NEW_YORK)
+        assert services.quote_expires_at(near_close) == datetime(
+            2025, 7, 8, 16, 0, tzinfo=NEW_YORK
+        )
+
+        friday_evening = datetime(2025, 7, 11, 17, 0, tzinfo=NEW_YORK)
+        assert services.quote_expires_at(friday_evening) == datetime(
+            2025, 7, 14, 9, 30, tzinfo=NEW_YORK
+        )
+
+
+@pytest.mark.feature
+def test_prices_are_shared_through_the_asset_price_table(
+    test_app, quote_api, monkeypatch
+):
+    """
+    GIVEN one fresh and one stale stored quote
+    WHEN prices are requested, with the API failing for the stale ticker
+    THEN the fresh quote is served without a fetch, the stale one is kept
+    as a fallback, and a new ticker is fetched and stored for other workers
+    """
+    monkeypatch.setitem(test_app.config, "QUOTE_RATE_LIMIT_BURST", 10)
+    quote_api.replies["OLD"] = [FakeQuoteResponse({})]
+    now = datetime.now(timezone.utc)
+
+    with test_app.app_context():
+        db.session.add_all(
+            [
+                AssetPrice(
+                    ticker="FRESH",
+                    price=decimal.Decimal("10.0000"),
+                    fetched_at=now,
+                    source="alpha_vantage",
+                ),
+                AssetPrice(
+                    ticker="OLD",
+                    price=decimal.Decimal("7.0000"),
+                    fetched_at=now - timedelta(days=7),
+                    source="alpha_vantage",
+                ),
+            ]
+        )
+        db.session.commit()
+
+        prices = services.get_stock_prices(["FRESH", "OLD", "NEW"])
+        assert prices == {"FRESH": 10.0, "OLD": 7.0, "NEW": 3.5}
+        assert sorted(quote_api.calls) == ["NEW", "OLD"]
+        stored = db.session.execute(
+            select(AssetPrice).filter_by(ticker="NEW")
+        ).scalar_one()
+        assert stored.price == decimal.Decimal("3.5")
+
+        # Another worker, with an empty in-process cache, reads the table
+        services.price_cache.clear()
+        assert services.get_stock_prices(["NEW"]) == {"NEW": 3.5}
+        assert len(quote_api.calls) == 2
+
+
+@pytest.mark.feature
+def test_refresh_task_stores_held_prices_for_the_portfolio_page(
+    auth_client, test_app, quote_api, monkeypatch
+):
+    """
+    GIVEN a user holding one ticker and having sold out of another
+    WHEN the price refresh task runs, and the portfolio page is then viewed
+    THEN only the held ticker is fetched and the page shows its stored price
+    without calling the API again
+    """
+    monkeypatch.setitem(test_app.config, "TASK_SECRET_KEY", "task-secret")
+    with test_app.app_context():
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        held = Asset(name="Held Corp", ticker_symbol="HELD", asset_type="Stock")
+        sold = Asset(name="Sold Corp", ticker_symbol="SOLDOUT", asset_type="Stock")
+        db.session.add_all(
+            [
+                InvestmentTransaction(
+                    user_id=user.id,
+                    asset=held,
+                    transaction_type="buy",
+                    quantity=2,
+                    price_per_unit=3,
+                ),
+                InvestmentTransaction(
+                    user_id=user.id,
+                    asset=sold,
+                    transaction_type="buy",
+                    quantity=1,
+                    price_per_unit=5,
+                ),
+                InvestmentTransaction(
+                    user_id=user.id,
+                    asset=sold,
+                    transaction_type="sell",
+                    quantity=1,
+                    price_per_unit=6,
+                ),
+            ]
+        )
+        db.session.commit()
+        holdings.rebuild(user_id=user.id)
+        db.session.commit()
+
+        assert auth_client.post("/tasks/refresh_prices").status_code == 403
+        response = auth_client.post(
+            "/tasks/refresh_prices", headers={"X-App-Key": "task-secret"}
+        )
+        assert response.status_code == 200
+        assert response.get_json()["refreshed"] == ["HELD"]
+        assert quote_api.calls == ["HELD"]
+
+        services.price_cache.clear()
+        response = auth_client.get("/portfolio")
+        assert b"4.50" in response.data
+        assert quote_api.calls == ["HELD"]
+
+        db.session.execute(delete(Holding).filter_by(user_id=user.id))
+        db.session.execute(delete(InvestmentTransaction).filter_by(user_id=user.id))
+        db.session.execute(delete(Asset).where(Asset.id.in_([held.id, sold.id])))
+        db.session.commit()
+
+
+@pytest.mark.unit
+def test_rate_limited_quotes_are_retried_with_backoff(test_app, quote_api):
+    """
+    GIVEN a provider that answers with a 429 and then a rate-limit note
+    WHEN the quote is requested
+    THEN the call is retried until the price arrives
+    """
+    quote_api.replies["AAPL"] = [
+        FakeQuoteResponse({}, status_code=429),
+        FakeQuoteResponse({"Note": "Thank you for using Alpha Vantage!"}),
+    ]
+    with test_app.app_context():
+        assert services.get_stock_prices(["AAPL"]) == {"AAPL": 4.5}
+    assert quote_api.calls == ["AAPL", "AAPL", "AAPL"]
+    assert services._circuit_breaker.state == "closed"
+
+
+@pytest.mark.unit
+def test_circuit_breaker_opens_after_repeated_failures(
+    test_app, quote_api, monkeypatch
+):
+    """
+    GIVEN a provider that keeps failing
+    WHEN quotes are requested past the failure threshold
+    THEN the circuit opens and calls are refused, until a trial call after
+    the cool-off window succeeds and closes it again
+    """
+    monkeypatch.setitem(test_app.config, "QUOTE_RETRY_ATTEMPTS", 0)
+    monkeypatch.setitem(test_app.config, "QUOTE_BREAKER_THRESHOLD", 2)
+    monkeypatch.setitem(test_app.config, "QUOTE_BREAKER_COOL_OFF", 0.2)
+    monkeypatch.setitem(test_app.config, "QUOTE_FAILURE_TTL", 0)
+    quote_api.replies["AAPL"] = [
+        FakeQuoteResponse({"Information": "API rate limit reached."})
+    ] * 2
+
+    with test_app.app_context():
+        assert services.get_stock_prices(["AAPL"]) == {"AAPL": None}
+        assert services.get_stock_prices(["AAPL"]) == {"AAPL": None}
+        assert services._circuit_breaker.state == "open"
+        assert REGISTRY.get_sample_value("market_data_circuit_state") == 2
+
+        assert services.get_stock_prices(["AAPL"]) == {"AAPL": None}
+        assert len(quote_api.calls) == 2  # short-circuited
+
+        time.sleep(0.25)
+        assert services.get_stock_prices(["AAPL"]) == {"AAPL": 4.5}
+        assert services._circuit_breaker.state == "closed"
+        assert REGISTRY.get_sample_value("market_data_circuit_state") == 0
@@ -0,0 +1,27 @@
+# tests/test_utils.py
+
+import pytest
+from datetime import datetime
+from finance_tracker.utils import period_range
+
+
+@pytest.mark.unit
+def test_period_range_for_month():
+    """
+    GIVEN a year and a month
+    WHEN period_range is called
+    THEN check it returns the half-open range covering exactly that month
+    """
+    assert period_range(2025, 2) == (datetime(2025, 2, 1), datetime(2025, 3, 1))
+    # December must roll over into January of the following year
+    assert period_range(2025, 12) == (datetime(2025, 12, 1), datetime(2026, 1, 1))
+
+
+@pytest.mark.unit
+def test_period_range_for_year():
+    """
+    GIVEN only a year
+    WHEN period_range is called
+    THEN check it returns the half-open range covering the whole year
+    """
+    assert period_range(2024) == (datetime(2024, 1, 1), datetime(2025, 1, 1))
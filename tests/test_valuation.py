@@ -0,0 +1,123 @@
+# tests/test_valuation.py
+
+from finance_tracker import db, price_history
+from finance_tracker.models import (
+    Asset,
+    AssetPriceHistory,
+    InvestmentTransaction,
+    User,
+)
+from datetime import datetime
+from sqlalchemy import delete, select
+import pytest
+
+
+@pytest.mark.unit
+def test_load_csv_rejects_a_malformed_row(test_app, tmp_path):
+    """
+    GIVEN a price history file with a bad date on its second data row
+    WHEN it is loaded
+    THEN a ValueError names the line and nothing is stored
+    """
+    path = tmp_path / "prices.csv"
+    path.write_text("ticker,date,close\nAAA,2025-01-02,10\nAAA,02/01/2025,11\n")
+    with test_app.app_context():
+        with pytest.raises(ValueError, match="Line 3"):
+            price_history.load_csv(path)
+        db.session.rollback()
+        assert db.session.execute(select(AssetPriceHistory)).first() is None
+
+
+@pytest.mark.feature
+def test_portfolio_value_trend_multiplies_quantities_by_prices(
+    auth_client, test_app, tmp_path
+):
+    """
+    GIVEN trades in two tickers, one bought before the range, and a price
+    history with a weekend gap and no prices at all for a third ticker
+    WHEN the portfolio value trend is requested
+    THEN every day is valued at the quantity held times the latest close,
+    and the unpriced ticker is reported
+    """
+    path = tmp_path / "prices.csv"
+    path.write_text(
+        "ticker,date,close\n"
+        "AAA,2025-01-02,10\n"
+        "AAA,2025-01-03,12\n"
+        "AAA,2025-01-06,11\n"
+        "BBB,2025-01-03,100\n"
+        "BBB,2025-01-06,110\n"
+    )
+    with test_app.app_context():
+        assert price_history.load_csv(path) == 5
+        # Reloading replaces a day instead of duplicating it
+        path.write_text("ticker,date,close\nAAA,2025-01-06,13\n")
+        assert price_history.load_csv(path) == 1
+        db.session.commit()
+
+        user = db.session.execute(
+            select(User).filter_by(username="testclient")
+        ).scalar_one()
+        aaa = Asset(name="A Corp", ticker_symbol="AAA", asset_type="Stock")
+        bbb = Asset(name="B Corp", ticker_symbol="BBB", asset_type="Stock")
+        ccc = Asset(name="C Corp", ticker_symbol="CCC", asset_type="Stock")
+        trades = [
+            (aaa, "buy", 10, datetime(2024, 12, 30)),
+            (bbb, "buy", 2, datetime(2025, 1, 4, 15, 30)),
+            (aaa, "sell", 4, datetime(2025, 1, 6)),
+            (ccc, "buy", 1, datetime(2025, 1, 6)),
+            (aaa, "buy", 100, datetime(2025, 1, 7)),
+        ]
+        db.session.add_all(
+            InvestmentTransaction(
+                user_id=user.id,
+                asset=asset,
+                transaction_type=transaction_type,
+                quantity=quantity,
+                price_per_unit=1,
+                transaction_date=transaction_date,
+            )
+            for asset, transaction_type, quantity, transaction_date in trades
+        )
+        db.session.commit()
+
+        response = auth_client.get(
+            "/api/portfolio_value_trend?start_date=2025-01-02&end_date=2025-01-06"
+        )
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["labels"] == [
+            "2025-01-02",
+            "2025-01-03",
+            "2025-01-04",
+            "2025-01-05",
+            "2025-01-06",
+        ]
+        assert data["data"] == [100.0, 120.0, 320.0, 320.0, 298.0]
+        assert data["unpriced_tickers"] == ["CCC"]
+
+        db.session.execute(delete(InvestmentTransaction).filter_by(user_id=user.id))
+        db.session.execute(delete(Asset).where(Asset.id.in_([aaa.id, bbb.id, ccc.id])))
+        db.session.execute(delete(AssetPriceHistory))
+        db.session.commit()
+
+
+@pytest.mark.feature
+@pytest.mark.parametrize(
+    "query",
+    [
+        "start_date=2025-01-02",
+        "start_date=2025-13-01&end_date=2025-12-31",
+        "start_date=2025-02-01&end_date=2025-01-01",
+        "start_date=2000-01-01&end_date=2025-01-01",
+    ],
+)
+def test_portfolio_value_trend_rejects_bad_ranges(auth_client, query):
+    """
+    GIVEN a missing, malformed, reversed or too long date range
+    WHEN the portfolio value trend is requested
+    THEN a 400 error is returned
+    """
+    response = auth_client.get(f"/api/portfolio_value_trend?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()